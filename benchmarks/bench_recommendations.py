@@ -0,0 +1,308 @@
+"""
+Benchmark the recommendation engine on synthetic product catalogs
+
+Catalogs are generated from the scraped products under collecting-dataset/data:
+ingredient lists keep the co-occurrence of real formulas, with a share of the
+ingredients resampled from the catalog-wide ingredient frequencies, and
+descriptions, prices and images are drawn from real products. The index is
+built from the generated DataFrame, so no MySQL server is needed.
+
+Each catalog size runs in its own process so build time and peak memory are
+measured in isolation.
+
+With --mode lsa the index is built in the low-rank embedding mode and the
+recall@k of its results against the exact sparse path is reported.
+
+Usage (from the repository root):
+    python benchmarks/bench_recommendations.py --sizes 10000 100000 1000000
+    python benchmarks/bench_recommendations.py --sizes 100000 --mode lsa
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import subprocess
+import tempfile
+from collections import Counter
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from seed_db import RAW_CSV_PATTERNS, clean_extracted_text, extract_ingredients_section, find_raw_csv_files
+from helper.inci import tokenize_ingredients
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# Share of a sampled formula's ingredients replaced by catalog-wide draws
+RESAMPLE_RATE = 0.3
+
+# Share of ingredients replaced by a new rare ingredient, so the vocabulary
+# keeps growing with the catalog like it does for real imports
+RARE_INGREDIENT_RATE = 0.02
+
+SKIN_TYPES = ["oily", "dry", "normal", "acne", "sensitive"]
+
+# Result depth the recall of the "lsa" mode is measured at
+RECALL_K = 10
+
+
+def load_seed_catalog() -> pd.DataFrame:
+    """
+    Load the scraped products the synthetic catalogs are sampled from
+
+    Returns:
+        DataFrame with the same columns seed_db uploads to the products table
+    """
+    # The same files seed_db ingests, so the vocabulary matches production
+    files = find_raw_csv_files(ROOT_DIR)
+    if not files:
+        raise FileNotFoundError(f"No raw product CSVs found under {ROOT_DIR} ({', '.join(RAW_CSV_PATTERNS)})")
+
+    df = pd.concat([pd.read_csv(f) for f in files], ignore_index=True)
+    df['Description'] = df['Description'].apply(clean_extracted_text)
+    df['Ingredients'] = df['Description'].apply(extract_ingredients_section)
+    df.columns = [col.lower().replace(' ', '_') for col in df.columns]
+    return df
+
+
+def generate_catalog(seed_df: pd.DataFrame, size: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Generate a synthetic catalog with the ingredient distribution of the seed catalog
+
+    Args:
+        seed_df: Scraped products (see load_seed_catalog)
+        size: Number of products to generate
+        seed: Random seed
+
+    Returns:
+        DataFrame with title, price, link, image_url, description and ingredients columns
+    """
+    rng = np.random.default_rng(seed)
+
+    formulas = [tokenize_ingredients(str(text).lower()) for text in seed_df['ingredients']]
+    with_ingredients = np.array([i for i, formula in enumerate(formulas) if formula])
+    missing_rate = 1 - len(with_ingredients) / len(formulas)
+
+    frequencies = Counter(token for formula in formulas for token in formula)
+    vocabulary = np.array(list(frequencies))
+    weights = np.array([frequencies[token] for token in vocabulary], dtype=np.float64)
+    weights /= weights.sum()
+
+    bases = rng.integers(0, len(seed_df), size)
+    formula_bases = rng.choice(with_ingredients, size)
+    has_ingredients = rng.random(size) >= missing_rate
+
+    ingredients = []
+    rare_count = 0
+    for i in range(size):
+        if not has_ingredients[i]:
+            ingredients.append("Ingredients tidak ditemukan.")
+            continue
+
+        formula = list(formulas[formula_bases[i]])
+        resample = rng.random(len(formula)) < RESAMPLE_RATE
+        draws = rng.choice(vocabulary, int(resample.sum()), p=weights)
+        for position, token in zip(np.flatnonzero(resample), draws):
+            formula[position] = token
+
+        for position in np.flatnonzero(rng.random(len(formula)) < RARE_INGREDIENT_RATE):
+            # Each rare ingredient is shared by three products, so it survives min_df
+            formula[position] = f"rare botanical extract {rare_count // 3}"
+            rare_count += 1
+
+        ingredients.append(", ".join(dict.fromkeys(formula)))
+
+    base_rows = seed_df.iloc[bases].reset_index(drop=True)
+    return pd.DataFrame({
+        'title': [f"{title} #{i}" for i, title in enumerate(base_rows['title'].astype(str))],
+        'price': base_rows['price'].values,
+        'link': [f"https://example.com/products/{i}" for i in range(size)],
+        'image_url': base_rows['image_url'].values,
+        'description': base_rows['description'].values,
+        'ingredients': ingredients,
+    })
+
+
+def sample_queries(catalog: pd.DataFrame, count: int, seed: int = 7) -> List[List[str]]:
+    """Sample scanned-product ingredient lists from products of the catalog"""
+    rng = random.Random(seed)
+    texts = [text for text in catalog['ingredients'] if "tidak ditemukan" not in text]
+    queries = []
+    for text in rng.sample(texts, min(count, len(texts))):
+        ingredients = text.split(", ")
+        # Scans often miss a few ingredients
+        keep = max(1, int(len(ingredients) * rng.uniform(0.6, 1.0)))
+        queries.append(rng.sample(ingredients, keep))
+    return queries
+
+
+def measure_latency(function, calls: List[tuple]) -> Dict[str, float]:
+    """Call function once per argument tuple and summarize latencies in milliseconds"""
+    latencies = []
+    for args in calls:
+        start = time.perf_counter()
+        function(*args)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies = np.array(latencies)
+    return {
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'mean_ms': round(float(latencies.mean()), 3),
+    }
+
+
+def get_directory_size(path: str) -> int:
+    """Get the total size of the files in a directory in bytes"""
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def get_peak_rss_mb() -> float:
+    """Get the peak resident set size of this process in MB"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_benchmark(size: int, queries: int, seed: int, mode: str = "sparse") -> Dict:
+    """
+    Build the index for one synthetic catalog size and measure query latencies
+
+    Args:
+        size: Number of products in the catalog
+        queries: Number of timed calls per operation
+        seed: Random seed for the catalog
+        mode: Similarity scoring mode of the recommendation system
+
+    Returns:
+        Dictionary of measurements
+    """
+    from helper.recommendations import SkinCareRecommendationSystem, recommendation_cache
+    from helper.retrieval import recall_at_k
+
+    catalog = generate_catalog(load_seed_catalog(), size, seed)
+    query_ingredients = sample_queries(catalog, queries)
+    rng = random.Random(seed)
+    skin_types = [rng.choice(SKIN_TYPES) for _ in query_ingredients]
+
+    with tempfile.TemporaryDirectory(prefix="bench-index-") as index_dir:
+        start = time.perf_counter()
+        system = SkinCareRecommendationSystem(table_name="products", index_dir=index_dir, df=catalog, mode=mode)
+        build_seconds = time.perf_counter() - start
+        index_bytes = get_directory_size(index_dir)
+        del catalog
+
+        # What every other worker pays at startup: mapping the finished artifact
+        start = time.perf_counter()
+        system.load_index(system.get_artifact_path())
+        load_seconds = time.perf_counter() - start
+
+        recall = None
+        if system.lsa_index is not None:
+            query_matrix = system.tfidf_vectorizer.transform([
+                system.build_query_text(ingredients) for ingredients in query_ingredients
+            ])
+            recall = round(recall_at_k(system.exact_index, system.lsa_index, query_matrix, RECALL_K), 4)
+
+        def uncached_recommendations(ingredients, skin_type):
+            recommendation_cache.clear()
+            system.get_ingredient_based_recommendations(ingredients, skin_type, 5)
+
+        rankings = {skin_type: len(system.skin_type_rankings.get(skin_type, [])) for skin_type in SKIN_TYPES}
+        skin_type_calls = [
+            (skin_type, 10, rng.randrange(0, max(1, rankings[skin_type] - 10)))
+            for skin_type in skin_types
+        ]
+
+        return {
+            'size': size,
+            'mode': mode,
+            f'recall_at_{RECALL_K}': recall,
+            'n_terms': int(system.tfidf_matrix.shape[1]),
+            'build_s': round(build_seconds, 2),
+            'load_s': round(load_seconds, 2),
+            'index_mb': round(index_bytes / 1024 / 1024, 1),
+            'peak_rss_mb': round(get_peak_rss_mb(), 1),
+            'find_similar_products': measure_latency(
+                system.find_similar_products,
+                [(ingredients, 10, skin_type) for ingredients, skin_type in zip(query_ingredients, skin_types)]
+            ),
+            'get_ingredient_based_recommendations': measure_latency(
+                uncached_recommendations,
+                list(zip(query_ingredients, skin_types))
+            ),
+            'get_skin_type_recommendations': measure_latency(
+                system.get_skin_type_recommendations,
+                skin_type_calls
+            ),
+        }
+
+
+def print_report(results: List[Dict]):
+    """Print benchmark results as a table"""
+    operations = ['find_similar_products', 'get_ingredient_based_recommendations', 'get_skin_type_recommendations']
+
+    recall_column = f'recall_at_{RECALL_K}'
+
+    print(f"\n{'products':>10} {'mode':>7} {'terms':>8} {'build s':>9} {'load s':>8} {'index MB':>9} "
+          f"{'peak RSS MB':>12} {'recall@' + str(RECALL_K):>10}")
+    for result in results:
+        recall = result[recall_column] if result[recall_column] is not None else '-'
+        print(f"{result['size']:>10} {result['mode']:>7} {result['n_terms']:>8} {result['build_s']:>9} "
+              f"{result['load_s']:>8} {result['index_mb']:>9} {result['peak_rss_mb']:>12} {recall:>10}")
+
+    for operation in operations:
+        print(f"\n{operation}")
+        print(f"{'products':>10} {'p50 ms':>9} {'p99 ms':>9} {'mean ms':>9}")
+        for result in results:
+            latency = result[operation]
+            print(f"{result['size']:>10} {latency['p50_ms']:>9} {latency['p99_ms']:>9} {latency['mean_ms']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the recommendation engine on synthetic catalogs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Catalog sizes to benchmark")
+    parser.add_argument("--queries", type=int, default=200, help="Timed calls per operation")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the synthetic catalogs")
+    parser.add_argument("--mode", choices=["sparse", "lsa"], default="sparse", help="Similarity scoring mode")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        # Child process: benchmark one size and hand the result back as JSON
+        print("BENCH_RESULT " + json.dumps(run_benchmark(args.single, args.queries, args.seed, args.mode)))
+        return
+
+    results = []
+    for size in args.sizes:
+        print(f"Benchmarking {size} products...")
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--single", str(size),
+             "--queries", str(args.queries), "--seed", str(args.seed), "--mode", args.mode],
+            capture_output=True, text=True
+        )
+        lines = [line for line in process.stdout.splitlines() if line.startswith("BENCH_RESULT ")]
+        if process.returncode != 0 or not lines:
+            print(f"Benchmark for {size} products failed:\n{process.stderr[-2000:]}")
+            continue
+        results.append(json.loads(lines[-1][len("BENCH_RESULT "):]))
+
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,32 @@
 from .functions import (
-    get_image_from_url, get_image_from_path, convert_image_to_base64, 
-    extract_text_from_image, clean_extracted_text, extract_ingredients_section, 
-    find_harmful_ingredients_with_details, parse_ingredients_to_list, 
+    get_image_from_url, get_image_from_url_async, get_image_from_path, convert_image_to_base64, 
+    extract_ingredients_from_image_async, clean_extracted_text, extract_ingredients_section, 
+    find_harmful_ingredients_with_details, find_harmful_ingredients_for_all_skin_types, parse_ingredients_to_list, 
     get_ingredients_to_avoid, load_resnet_skin_classifier, 
     get_skin_type_label_mapping, predict_skin_type_from_image,
     detect_face_in_image,
     enhanced_face_detection,
     fetching_content
 )
-from .ingredients import ingredients_avoid_oily, ingredients_avoid_dry, ingredients_avoid_normal, ingredients_avoid_acne, ingredients_avoid_sensitive   
+from .ingredients import get_ingredients_avoid, get_ingredient_aliases
 from .news import get_news, get_news_list
 from .educations import get_educations_list, get_educations_details
 
 __all__ = [
     # Image processing functions
     'get_image_from_url',
+    'get_image_from_url_async',
     'get_image_from_path',
     'convert_image_to_base64',
     
     # Text extraction and processing
-    'extract_text_from_image',
+    'extract_ingredients_from_image_async',
     'clean_extracted_text',
     'extract_ingredients_section',
     
     # Ingredients analysis
     'find_harmful_ingredients_with_details',
+    'find_harmful_ingredients_for_all_skin_types',
     'parse_ingredients_to_list',
     'get_ingredients_to_avoid',
     
@@ -40,11 +42,8 @@ __all__ = [
     'predict_skin_type_from_image',
     
     # Ingredients data
-    'ingredients_avoid_oily',
-    'ingredients_avoid_dry',
-    'ingredients_avoid_normal',
-    'ingredients_avoid_acne',
-    'ingredients_avoid_sensitive',
+    'get_ingredients_avoid',
+    'get_ingredient_aliases',
     
     # News functions
     'get_news',
@@ -0,0 +1,585 @@
+import os
+import re
+import json
+import base64
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+from io import BytesIO
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+from pydantic import BaseModel, Field, field_validator
+
+from helper.gemini import GeminiClient
+
+try:
+    import pytesseract
+except ImportError:  # Optional: only needed for the "tesseract" and "auto" backends
+    pytesseract = None
+
+# Text extraction backend: "gemini", "tesseract" (local OCR) or "auto" (local OCR
+# for clear, high-contrast labels, Gemini for the rest)
+EXTRACTION_BACKENDS = ("gemini", "tesseract", "auto")
+EXTRACTION_BACKEND = os.getenv("EXTRACTION_BACKEND", "gemini").lower()
+
+# Longest side, in pixels, of the image sent for extraction; keeps small label print legible
+EXTRACTION_MAX_DIMENSION = int(os.getenv("EXTRACTION_MAX_DIMENSION", "1600"))
+
+# JPEG quality of the re-encoded image
+EXTRACTION_JPEG_QUALITY = int(os.getenv("EXTRACTION_JPEG_QUALITY", "85"))
+
+# Send the image in grayscale; label text does not need color
+EXTRACTION_GRAYSCALE = os.getenv("EXTRACTION_GRAYSCALE", "true").lower() in ("1", "true", "yes")
+
+# Formats sent as uploaded when re-encoding would not make them smaller
+EXTRACTION_PASSTHROUGH_FORMATS = {"JPEG", "PNG", "WEBP"}
+
+# Model and prompt of the Gemini extraction; the answer is constrained to the ExtractedIngredients schema
+EXTRACTION_MODEL = "gemini-3.5-flash"
+EXTRACTION_PROMPT = "cari ingredients/bahan/komposisi dalam gambar ini. masukkan setiap bahan sebagai satu elemen ingredients sesuai urutan pada label, tanpa nama brand, nama produk, ukuran/volume, atau informasi lain yang tidak berkaitan dengan bahan. jika tidak terdapat ingredients sama sekali, isi found dengan false dan ingredients kosong."
+
+# Tesseract languages and page segmentation mode (6: a single uniform block of text)
+TESSERACT_LANG = os.getenv("TESSERACT_LANG", "eng")
+TESSERACT_PSM = int(os.getenv("TESSERACT_PSM", "6"))
+
+# OCR runs at once per worker; each one keeps a CPU busy
+TESSERACT_MAX_CONCURRENCY = int(os.getenv("TESSERACT_MAX_CONCURRENCY", str(os.cpu_count() or 1)))
+
+# Mean word confidence (0-100) below which a local OCR result is not trusted
+EXTRACTION_OCR_MIN_CONFIDENCE = float(os.getenv("EXTRACTION_OCR_MIN_CONFIDENCE", "75"))
+
+# Minimum grayscale standard deviation and Laplacian variance of a label the
+# "auto" backend reads locally
+EXTRACTION_ROUTER_MIN_CONTRAST = float(os.getenv("EXTRACTION_ROUTER_MIN_CONTRAST", "25"))
+EXTRACTION_ROUTER_MIN_SHARPNESS = float(os.getenv("EXTRACTION_ROUTER_MIN_SHARPNESS", "150"))
+
+# Photos of one product (e.g. front and back label) accepted in a single scan
+SCAN_MAX_IMAGES = int(os.getenv("SCAN_MAX_IMAGES", "4"))
+
+# Text of a label without an ingredients list, as reported to clients
+INGREDIENTS_NOT_FOUND = "ingredients not found"
+
+# Start of the ingredients list on a label, and headers of the sections that may follow it
+INGREDIENTS_HEADER_PATTERN = re.compile(r"\b(?:ingredients|komposisi|bahan-bahan|bahan)\s*[:：]", re.IGNORECASE)
+NEXT_SECTION_PATTERN = re.compile(
+    r"\b(?:directions?|how\s+to\s+use|cara\s+(?:pakai|penggunaan)|caution|warnings?|peringatan|"
+    r"perhatian|netto|net\s+wt|exp(?:iry)?|bpom|made\s+in|diproduksi|distributed)\b",
+    re.IGNORECASE
+)
+
+
+class ExtractedIngredients(BaseModel):
+    """Ingredients read from a product label, as returned by every extraction backend"""
+
+    found: bool = Field(..., description="Apakah gambar memuat daftar ingredients/bahan/komposisi")
+    ingredients: List[str] = Field(default=[], description="Daftar bahan sesuai urutan pada label, satu bahan per elemen")
+
+    @field_validator("ingredients")
+    @classmethod
+    def normalize_ingredients(cls, ingredients: List[str]) -> List[str]:
+        """Strip the entries, drop empty ones and title-case them like parse_ingredients_to_list"""
+        return [ingredient.strip().title() for ingredient in ingredients if ingredient and ingredient.strip()]
+
+    @property
+    def text(self) -> str:
+        """Comma-separated ingredients, the text form scanned by the harmful ingredient matcher"""
+        return ", ".join(self.ingredients)
+
+
+# Generation config asking Gemini for JSON matching ExtractedIngredients
+EXTRACTION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": ExtractedIngredients,
+}
+
+# Cached results of every backend have this shape; changing it invalidates them
+EXTRACTION_RESULT_SCHEMA = json.dumps(ExtractedIngredients.model_json_schema(), sort_keys=True)
+
+
+def get_namespace(*parts) -> str:
+    """Get a short cache namespace identifying an extraction configuration"""
+    return hashlib.sha256("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:16]
+
+
+# Gemini results depend on the model, the prompt, the schema and the preprocessing
+GEMINI_EXTRACTION_NAMESPACE = get_namespace(
+    EXTRACTION_MODEL, EXTRACTION_PROMPT, EXTRACTION_RESULT_SCHEMA,
+    f"{EXTRACTION_MAX_DIMENSION}:{EXTRACTION_JPEG_QUALITY}:{EXTRACTION_GRAYSCALE}"
+)
+
+
+def prepare_image_for_extraction(image_bytes: bytes) -> tuple:
+    """
+    Decode an image once and re-encode it at the size needed to read its label
+
+    EXIF orientation is applied, the image is converted to grayscale and
+    downscaled so its longest side is at most EXTRACTION_MAX_DIMENSION, then
+    re-encoded as JPEG. JPEGs are decoded directly at a reduced scale. If the
+    upload is already small and upright it is sent as is, with its real MIME
+    type.
+
+    Args:
+        image_bytes: Uploaded image
+
+    Returns:
+        Tuple of (image bytes, MIME type)
+    """
+    try:
+        image = Image.open(BytesIO(image_bytes))
+        image_format = image.format
+        mime_type = Image.MIME.get(image_format, "image/jpeg")
+
+        # Let the JPEG decoder downscale by a power of two while decoding
+        mode = "L" if EXTRACTION_GRAYSCALE else "RGB"
+        image.draft(mode, (EXTRACTION_MAX_DIMENSION, EXTRACTION_MAX_DIMENSION))
+
+        upright = image.getexif().get(0x0112, 1) == 1  # EXIF Orientation tag
+        image = ImageOps.exif_transpose(image)
+
+        needs_resize = max(image.size) > EXTRACTION_MAX_DIMENSION
+        if needs_resize:
+            image.thumbnail((EXTRACTION_MAX_DIMENSION, EXTRACTION_MAX_DIMENSION), Image.LANCZOS)
+
+        image = flatten_to_mode(image, mode)
+
+        output = BytesIO()
+        image.save(output, format="JPEG", quality=EXTRACTION_JPEG_QUALITY, optimize=True)
+        prepared = output.getvalue()
+    except Exception as e:
+        # Undecodable here; let Gemini try the original bytes
+        print(f"Could not preprocess image for extraction: {e}")
+        return image_bytes, "image/jpeg"
+
+    if (upright and not needs_resize and image_format in EXTRACTION_PASSTHROUGH_FORMATS
+            and len(image_bytes) <= len(prepared)):
+        return image_bytes, mime_type
+    return prepared, "image/jpeg"
+
+
+def flatten_to_mode(image: Image.Image, mode: str) -> Image.Image:
+    """Convert an image to mode, flattening transparency onto white so transparent areas do not turn black"""
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        image = Image.alpha_composite(background, image)
+    return image.convert(mode)
+
+
+def load_label_image(image_bytes: bytes, max_dimension: int = EXTRACTION_MAX_DIMENSION) -> Image.Image:
+    """Decode an image as an upright grayscale label no larger than max_dimension"""
+    image = Image.open(BytesIO(image_bytes))
+    image.draft("L", (max_dimension, max_dimension))
+    image = ImageOps.exif_transpose(image)
+    if max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    return flatten_to_mode(image, "L")
+
+
+def build_extraction_contents(image_bytes: bytes) -> list:
+    """Downscale an image and build the Gemini request contents asking for its ingredients"""
+    prepared_bytes, mime_type = prepare_image_for_extraction(image_bytes)
+    return [
+        {
+            "inline_data": {
+                "mime_type": mime_type,
+                "data": base64.b64encode(prepared_bytes).decode("utf-8"),
+            }
+        },
+        EXTRACTION_PROMPT,
+    ]
+
+
+def isolate_ingredients_section(text: str) -> str:
+    """
+    Cut the ingredients list out of the full text of a label
+
+    The list starts after an "Ingredients:"/"Komposisi:"/"Bahan:" header and
+    ends at the next known section (directions, warnings, netto, BPOM, ...).
+
+    Args:
+        text: OCR text of the whole label
+
+    Returns:
+        The ingredients list, or INGREDIENTS_NOT_FOUND
+    """
+    header = INGREDIENTS_HEADER_PATTERN.search(text)
+    if header is None:
+        return INGREDIENTS_NOT_FOUND
+
+    section = text[header.end():]
+    next_section = NEXT_SECTION_PATTERN.search(section)
+    if next_section is not None:
+        section = section[:next_section.start()]
+
+    section = section.strip(" \n\t.;:")
+    return section if section else INGREDIENTS_NOT_FOUND
+
+
+# funsi untuk membersihkan teks hasil ekstraksi OCR atau AI
+def clean_extracted_text(raw_text: str) -> str:
+    """
+    Membersihkan teks hasil ekstraksi OCR atau AI dari karakter khusus dan formatting markdown.
+
+    Langkah pembersihan:
+    - Hilangkan markdown (e.g., **bold**)
+    - Ganti newline ganda menjadi paragraf
+    - Ganti newline tunggal menjadi spasi
+    - Hilangkan karakter aneh (*, multiple space, dsb.)
+    - Strip spasi awal/akhir
+
+    Args:
+        raw_text (str): Teks asli hasil ekstraksi AI
+
+    Returns:
+        str: Teks yang sudah bersih
+    """
+    # Hapus markdown tebal seperti **text**
+    cleaned = re.sub(r'\*\*(.*?)\*\*', r'\1', raw_text)
+
+    # Ganti newline ganda dengan pemisah paragraf
+    cleaned = re.sub(r'\n\s*\n', '\n\n', cleaned)
+
+    # Ganti newline tunggal dengan spasi
+    cleaned = re.sub(r'\n', ' ', cleaned)
+
+    # Hapus bullet atau bintang tidak penting
+    cleaned = re.sub(r'\*+', '', cleaned)
+
+    # Hilangkan spasi berlebih
+    cleaned = re.sub(r'\s{2,}', ' ', cleaned)
+
+    # Strip spasi awal dan akhir
+    return cleaned.strip()
+
+
+
+def parse_ingredients_to_list(ingredients_text: str) -> list:
+    """Parse ingredients text into a clean list, handling special cases like '1,2-hexanediol'"""
+    if not ingredients_text:
+        return []
+    
+    # First, protect chemical compounds with numbers and commas (like 1,2-hexanediol)
+    # Replace pattern like "number,number-" with "number.number-"
+    protected_text = re.sub(r'(\d+),(\d+)-', r'\1.\2-', ingredients_text)
+    
+    # Split by comma and clean each ingredient
+    ingredients_list = [
+        ingredient.strip().title() 
+        for ingredient in protected_text.split(',')
+        if ingredient.strip()
+    ]
+    
+    # Remove size/volume information from last ingredient if present
+    if ingredients_list:
+        last_ingredient = ingredients_list[-1]
+        # Remove patterns like "30 ml/1.76 fl.oz"
+        cleaned_last = re.sub(r'\s*\d+.*?(?:ml|oz|g|kg|fl\.oz).*$', '', last_ingredient, flags=re.IGNORECASE)
+        if cleaned_last.strip():
+            ingredients_list[-1] = cleaned_last.strip()
+        else:
+            ingredients_list.pop()  # Remove if nothing left after cleaning
+    
+    return ingredients_list
+
+
+def ingredients_from_text(text: str) -> ExtractedIngredients:
+    """
+    Turn plain ingredients text (OCR output) into an extraction result
+
+    Args:
+        text: Ingredients list text, or INGREDIENTS_NOT_FOUND
+
+    Returns:
+        Extraction result with the parsed ingredients
+    """
+    if not text or text == INGREDIENTS_NOT_FOUND:
+        return ExtractedIngredients(found=False)
+    ingredients = parse_ingredients_to_list(clean_extracted_text(text))
+    return ExtractedIngredients(found=bool(ingredients), ingredients=ingredients)
+
+
+def parse_extraction_response(response) -> ExtractedIngredients:
+    """
+    Read the extraction result out of a Gemini response
+
+    Args:
+        response: GenerateContentResponse of a call made with EXTRACTION_CONFIG
+
+    Returns:
+        Extraction result, not found when the response has no ingredients
+    """
+    result = response.parsed
+    if not isinstance(result, ExtractedIngredients):
+        # The SDK leaves parsed empty when the JSON did not validate; try once more to report why
+        result = ExtractedIngredients.model_validate_json(response.text or "")
+    if result.found and not result.ingredients:
+        return ExtractedIngredients(found=False)
+    return result
+
+
+def merge_extractions(results: List[ExtractedIngredients]) -> ExtractedIngredients:
+    """
+    Merge the extractions of several photos of one product into one ingredients list
+
+    Ingredients keep the order of the photos and of each label; an
+    ingredient visible on more than one photo is kept once, at its first
+    occurrence. Photos without an ingredients list (e.g. the front label)
+    contribute nothing.
+
+    Args:
+        results: Extraction results in photo order
+
+    Returns:
+        Merged extraction result, found if any photo had ingredients
+    """
+    if len(results) == 1:
+        return results[0]
+
+    merged = {}
+    for result in results:
+        if result.found:
+            for ingredient in result.ingredients:
+                merged.setdefault(ingredient.lower(), ingredient)
+
+    return ExtractedIngredients(found=bool(merged), ingredients=list(merged.values()))
+
+
+def assess_label_image(image: Image.Image) -> Dict[str, float]:
+    """
+    Measure how legible a label photo is
+
+    Args:
+        image: Grayscale label image
+
+    Returns:
+        Dictionary with contrast (grayscale standard deviation) and sharpness
+        (variance of the Laplacian) of the image
+    """
+    pixels = np.asarray(image, dtype=np.uint8)
+    return {
+        'contrast': float(pixels.std()),
+        'sharpness': float(cv2.Laplacian(pixels, cv2.CV_64F).var()),
+    }
+
+
+class ExtractionBackend(ABC):
+    """
+    Ingredients text extraction from an image
+
+    Backends return an ExtractedIngredients result, whose ingredients go
+    straight to the harmful ingredient matcher and the recommender. Results
+    are cached per namespace, so each backend configuration has its own.
+    """
+
+    name = "base"
+    label = "backend ekstraksi"
+
+    @property
+    @abstractmethod
+    def namespace(self) -> str:
+        """Cache namespace of the backend's results"""
+
+    @abstractmethod
+    async def extract(self, image_bytes: bytes) -> ExtractedIngredients:
+        """Extract the ingredients of an image"""
+
+    def stats(self) -> Dict:
+        """Get the backend's counters"""
+        return {'backend': self.name}
+
+
+class GeminiBackend(ExtractionBackend):
+    """Extraction by the Gemini model, through the async client with its limits and retries"""
+
+    name = "gemini"
+    label = "Gemini API"
+
+    def __init__(self, gemini: GeminiClient):
+        """
+        Args:
+            gemini: Async Gemini client
+        """
+        self.gemini = gemini
+
+    @property
+    def namespace(self) -> str:
+        return GEMINI_EXTRACTION_NAMESPACE
+
+    async def extract(self, image_bytes: bytes) -> ExtractedIngredients:
+        contents = await asyncio.to_thread(build_extraction_contents, image_bytes)
+        response = await self.gemini.generate_content(
+            model=EXTRACTION_MODEL, contents=contents, config=EXTRACTION_CONFIG
+        )
+        return parse_extraction_response(response)
+
+    def stats(self) -> Dict:
+        return {'backend': self.name, 'circuit': self.gemini.stats()}
+
+
+class TesseractBackend(ExtractionBackend):
+    """Extraction by the local Tesseract OCR engine, run in worker threads"""
+
+    name = "tesseract"
+    label = "OCR lokal"
+
+    def __init__(self, lang: str = TESSERACT_LANG, psm: int = TESSERACT_PSM,
+                 max_concurrency: int = TESSERACT_MAX_CONCURRENCY):
+        """
+        Args:
+            lang: Tesseract language codes, e.g. "eng+ind"
+            psm: Tesseract page segmentation mode
+            max_concurrency: OCR runs at once
+
+        Raises:
+            RuntimeError: If pytesseract is not installed
+        """
+        if pytesseract is None:
+            raise RuntimeError("Backend 'tesseract' membutuhkan paket pytesseract dan Tesseract OCR")
+        self.lang = lang
+        self.psm = psm
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def namespace(self) -> str:
+        return get_namespace("tesseract", self.lang, self.psm, EXTRACTION_MAX_DIMENSION, EXTRACTION_RESULT_SCHEMA)
+
+    def recognize(self, image: Image.Image) -> Tuple[str, float]:
+        """
+        Run OCR on a grayscale label image
+
+        Args:
+            image: Grayscale label image
+
+        Returns:
+            Tuple of (text with one line per OCR line, mean word confidence 0-100)
+        """
+        # Tesseract misses small glyphs, so low-resolution labels are upscaled
+        if max(image.size) < 1000:
+            image = image.resize((image.width * 2, image.height * 2), Image.LANCZOS)
+        image = ImageOps.autocontrast(image)
+
+        data = pytesseract.image_to_data(
+            image, lang=self.lang, config=f"--psm {self.psm}", output_type=pytesseract.Output.DICT
+        )
+
+        lines: Dict[tuple, list] = {}
+        confidences = []
+        for i, word in enumerate(data['text']):
+            confidence = float(data['conf'][i])
+            if not word.strip() or confidence < 0:
+                continue
+            lines.setdefault((data['block_num'][i], data['par_num'][i], data['line_num'][i]), []).append(word)
+            confidences.append(confidence)
+
+        text = "\n".join(" ".join(words) for words in lines.values())
+        return text, (float(np.mean(confidences)) if confidences else 0.0)
+
+    def read_image(self, image: Image.Image) -> Tuple[ExtractedIngredients, float]:
+        """OCR the ingredients list of a decoded label, returning (result, mean confidence)"""
+        text, confidence = self.recognize(image)
+        return ingredients_from_text(isolate_ingredients_section(text)), confidence
+
+    async def read_with_confidence(self, image: Image.Image) -> Tuple[ExtractedIngredients, float]:
+        """OCR the ingredients list of a decoded label in a worker thread"""
+        async with self._semaphore:
+            return await asyncio.to_thread(self.read_image, image)
+
+    async def extract(self, image_bytes: bytes) -> ExtractedIngredients:
+        image = await asyncio.to_thread(load_label_image, image_bytes)
+        result, _ = await self.read_with_confidence(image)
+        return result
+
+
+class AutoBackend(ExtractionBackend):
+    """
+    Router sending clear, high-contrast labels to local OCR and the rest to Gemini
+
+    A label is read locally when its contrast and sharpness clear the
+    router thresholds; the local result is kept only if the OCR confidence
+    is high enough and an ingredients list was found, otherwise the image
+    goes to Gemini after all.
+    """
+
+    name = "auto"
+    label = "backend ekstraksi"
+
+    def __init__(self, local: TesseractBackend, remote: GeminiBackend,
+                 min_contrast: float = EXTRACTION_ROUTER_MIN_CONTRAST,
+                 min_sharpness: float = EXTRACTION_ROUTER_MIN_SHARPNESS,
+                 min_confidence: float = EXTRACTION_OCR_MIN_CONFIDENCE):
+        """
+        Args:
+            local: Local OCR backend
+            remote: Gemini backend
+            min_contrast: Minimum grayscale standard deviation of a label read locally
+            min_sharpness: Minimum Laplacian variance of a label read locally
+            min_confidence: Minimum mean OCR word confidence of a kept local result
+        """
+        self.local = local
+        self.remote = remote
+        self.min_contrast = min_contrast
+        self.min_sharpness = min_sharpness
+        self.min_confidence = min_confidence
+        self.local_results = 0
+        self.fallbacks = 0
+        self.remote_results = 0
+
+    @property
+    def namespace(self) -> str:
+        return get_namespace("auto", self.local.namespace, self.remote.namespace,
+                             self.min_contrast, self.min_sharpness, self.min_confidence)
+
+    def is_clear_label(self, image: Image.Image) -> bool:
+        """Check whether a decoded label is clear enough to be read locally"""
+        metrics = assess_label_image(image)
+        return metrics['contrast'] >= self.min_contrast and metrics['sharpness'] >= self.min_sharpness
+
+    async def extract(self, image_bytes: bytes) -> ExtractedIngredients:
+        try:
+            # Decoded once for both the legibility check and the OCR
+            image = await asyncio.to_thread(load_label_image, image_bytes)
+            if await asyncio.to_thread(self.is_clear_label, image):
+                result, confidence = await self.local.read_with_confidence(image)
+                if result.found and confidence >= self.min_confidence:
+                    self.local_results += 1
+                    return result
+                self.fallbacks += 1
+        except Exception as e:
+            print(f"Local OCR failed, falling back to Gemini: {e}")
+            self.fallbacks += 1
+
+        self.remote_results += 1
+        return await self.remote.extract(image_bytes)
+
+    def stats(self) -> Dict:
+        return {
+            'backend': self.name,
+            'local_results': self.local_results,
+            'fallbacks': self.fallbacks,
+            'remote_results': self.remote_results,
+            'circuit': self.remote.gemini.stats(),
+        }
+
+
+def create_extraction_backend(name: str, gemini: GeminiClient) -> ExtractionBackend:
+    """
+    Create the extraction backend selected by name
+
+    Args:
+        name: One of EXTRACTION_BACKENDS
+        gemini: Async Gemini client for the backends that use Gemini
+
+    Returns:
+        Extraction backend
+    """
+    if name not in EXTRACTION_BACKENDS:
+        raise ValueError(f"Unsupported extraction backend '{name}', expected one of {EXTRACTION_BACKENDS}")
+
+    if name == "tesseract":
+        return TesseractBackend()
+    if name == "auto":
+        return AutoBackend(TesseractBackend(), GeminiBackend(gemini))
+    return GeminiBackend(gemini)
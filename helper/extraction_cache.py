@@ -0,0 +1,336 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from helper.cache import LRUCache
+
+# Directory of the on-disk tier, shared by every worker on the host
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", "models/extraction_cache")
+
+# Seconds an extraction result stays valid
+EXTRACTION_CACHE_TTL = int(os.getenv("EXTRACTION_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Size cap of the on-disk tier; the least recently used results are pruned past it
+EXTRACTION_CACHE_MAX_DISK_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_DISK_BYTES", str(64 * 1024 * 1024)))
+
+# Entry cap of the in-process tier
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "1024"))
+
+# Also match near-identical images by perceptual hash (re-encoded or resized uploads)
+EXTRACTION_CACHE_PERCEPTUAL = os.getenv("EXTRACTION_CACHE_PERCEPTUAL", "false").lower() in ("1", "true", "yes")
+
+# Maximum Hamming distance between the 64-bit perceptual hashes of matching images
+EXTRACTION_CACHE_PERCEPTUAL_DISTANCE = int(os.getenv("EXTRACTION_CACHE_PERCEPTUAL_DISTANCE", "4"))
+
+# Share of the size cap the on-disk tier is pruned down to
+PRUNE_TARGET = 0.9
+
+
+def compute_dhash(image_bytes: bytes) -> Optional[int]:
+    """
+    Compute the 64-bit difference hash of an image
+
+    The image is reduced to a 9x8 grayscale thumbnail and each bit records
+    whether a pixel is brighter than its right neighbor, so re-encoding,
+    resizing and small exposure changes leave most bits unchanged.
+
+    Args:
+        image_bytes: Encoded image
+
+    Returns:
+        Hash as an int, or None if the image cannot be decoded
+    """
+    try:
+        with Image.open(BytesIO(image_bytes)) as image:
+            pixels = np.asarray(image.convert("L").resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    except Exception:
+        return None
+
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+class ExtractionCache:
+    """
+    Two-tier cache of image text extraction results keyed by image content
+
+    Results are addressed by the SHA-256 of the image bytes within a
+    namespace identifying the extraction (model and prompt), so a changed
+    prompt never serves stale results. The in-process LRU answers repeat
+    scans without I/O; the on-disk tier is shared between workers and
+    survives restarts, with a TTL and a size cap. With perceptual matching
+    on, a miss falls back to the entry with the nearest difference hash.
+    """
+
+    def __init__(self, cache_dir: str = EXTRACTION_CACHE_DIR, ttl: int = EXTRACTION_CACHE_TTL,
+                 max_disk_bytes: int = EXTRACTION_CACHE_MAX_DISK_BYTES,
+                 max_entries: int = EXTRACTION_CACHE_MAX_ENTRIES,
+                 perceptual: bool = EXTRACTION_CACHE_PERCEPTUAL,
+                 max_distance: int = EXTRACTION_CACHE_PERCEPTUAL_DISTANCE):
+        """
+        Args:
+            cache_dir: Directory of the on-disk tier ('' disables it)
+            ttl: Seconds a result stays valid
+            max_disk_bytes: Size cap of the on-disk tier
+            max_entries: Entry cap of the in-process tier
+            perceptual: Match near-identical images by perceptual hash
+            max_distance: Maximum Hamming distance of a perceptual match
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+        self.perceptual = perceptual
+        self.max_distance = max_distance
+        self.memory = LRUCache(max_entries=max_entries, max_bytes=max_entries * 16 * 1024,
+                               size_of=lambda entry: len(entry[0]))
+        self.disk_hits = 0
+        self.perceptual_hits = 0
+        self.extractions = 0
+        self._disk_bytes = None  # Counted on the first write
+        self._dhashes: Dict[str, Dict[str, int]] = {}  # Namespace -> key -> dhash, loaded on first use
+        self._lock = threading.Lock()
+
+    def get_entry_path(self, namespace: str, key: str) -> str:
+        """Get the on-disk path of a result"""
+        return os.path.join(self.cache_dir, namespace, key[:2], f"{key}.json")
+
+    def read_entry(self, namespace: str, key: str) -> Optional[Tuple[str, float]]:
+        """Read an unexpired result from the on-disk tier as (text, created)"""
+        if not self.cache_dir:
+            return None
+
+        path = self.get_entry_path(namespace, key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get('created', 0) > self.ttl:
+            self.remove_entry(namespace, key)
+            return None
+
+        # Bump the modification time so pruning drops the least recently used results first
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry['text'], entry['created']
+
+    def write_entry(self, namespace: str, key: str, text: str, created: float, dhash: Optional[int]):
+        """Atomically write a result to the on-disk tier, pruning it when over the size cap"""
+        if not self.cache_dir:
+            return
+
+        path = self.get_entry_path(namespace, key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=os.path.dirname(path))
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'text': text, 'created': created, 'dhash': dhash}, f, ensure_ascii=False)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing extraction cache entry: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self.get_disk_usage()
+            else:
+                self._disk_bytes += size
+            over_cap = self._disk_bytes > self.max_disk_bytes
+        if over_cap:
+            self.prune()
+
+    def remove_entry(self, namespace: str, key: str):
+        """Remove a result from the on-disk tier and the perceptual index"""
+        try:
+            os.remove(self.get_entry_path(namespace, key))
+        except OSError:
+            pass
+        with self._lock:
+            self._dhashes.get(namespace, {}).pop(key, None)
+
+    def list_entries(self):
+        """List the on-disk results as (namespace, key, path, size, mtime)"""
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                namespace = os.path.relpath(root, self.cache_dir).split(os.sep)[0]
+                yield namespace, name[:-len('.json')], path, stat.st_size, stat.st_mtime
+
+    def get_disk_usage(self) -> int:
+        """Get the total size of the on-disk results in bytes"""
+        return sum(size for _, _, _, size, _ in self.list_entries())
+
+    def prune(self):
+        """Drop expired results, then the least recently used ones until under the size cap"""
+        entries = sorted(self.list_entries(), key=lambda entry: entry[4])
+        now = time.time()
+        total = sum(entry[3] for entry in entries)
+        target = self.max_disk_bytes * PRUNE_TARGET
+
+        for namespace, key, _, size, mtime in entries:
+            if total <= target and now - mtime <= self.ttl:
+                continue
+            self.remove_entry(namespace, key)
+            total -= size
+
+        with self._lock:
+            self._disk_bytes = total
+
+    def load_dhashes(self, namespace: str) -> Dict[str, int]:
+        """Get the perceptual hashes of a namespace's results, reading them from disk on first use"""
+        with self._lock:
+            dhashes = self._dhashes.get(namespace)
+        if dhashes is not None:
+            return dhashes
+
+        dhashes = {}
+        for entry_namespace, key, path, _, _ in list(self.list_entries()):
+            if entry_namespace != namespace:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    dhash = json.load(f).get('dhash')
+            except (OSError, ValueError):
+                continue
+            if dhash is not None:
+                dhashes[key] = dhash
+
+        with self._lock:
+            return self._dhashes.setdefault(namespace, dhashes)
+
+    def find_similar_key(self, namespace: str, dhash: int) -> Optional[str]:
+        """Find the cached image with the nearest perceptual hash within max_distance"""
+        dhashes = self.load_dhashes(namespace)
+        with self._lock:
+            keys = list(dhashes)
+            hashes = np.fromiter(dhashes.values(), dtype=np.uint64, count=len(keys))
+        if not keys:
+            return None
+
+        distances = np.unpackbits((hashes ^ np.uint64(dhash)).view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+        nearest = int(np.argmin(distances))
+        return keys[nearest] if distances[nearest] <= self.max_distance else None
+
+    def get(self, namespace: str, key: str, dhash: Optional[int] = None) -> Optional[str]:
+        """
+        Look up a result by image SHA-256, then by perceptual hash
+
+        Args:
+            namespace: Extraction namespace
+            key: SHA-256 hex digest of the image bytes
+            dhash: Perceptual hash of the image, if perceptual matching is on
+
+        Returns:
+            Cached text, or None on a miss
+        """
+        entry = self.memory.get((namespace, key))
+        if entry is not None:
+            if time.time() - entry[1] <= self.ttl:
+                return entry[0]
+
+        entry = self.read_entry(namespace, key)
+        if entry is not None:
+            self.disk_hits += 1
+            self.memory.set((namespace, key), entry)
+            return entry[0]
+
+        if dhash is not None:
+            similar_key = self.find_similar_key(namespace, dhash)
+            entry = None
+            if similar_key is not None:
+                entry = self.memory.get((namespace, similar_key)) or self.read_entry(namespace, similar_key)
+            if entry is not None:
+                self.perceptual_hits += 1
+                self.memory.set((namespace, key), entry)
+                return entry[0]
+
+        return None
+
+    def set(self, namespace: str, key: str, text: str, dhash: Optional[int] = None):
+        """Cache a result in both tiers"""
+        created = time.time()
+        self.memory.set((namespace, key), (text, created))
+        self.write_entry(namespace, key, text, created, dhash)
+
+        if dhash is not None:
+            dhashes = self.load_dhashes(namespace)
+            with self._lock:
+                dhashes[key] = dhash
+
+    def lookup(self, image_bytes: bytes, namespace: str,
+               key: Optional[str] = None) -> Tuple[str, Optional[int], Optional[str]]:
+        """
+        Hash an image and look up its cached extraction result
+
+        Args:
+            image_bytes: Encoded image
+            namespace: Extraction namespace (model and prompt)
+            key: SHA-256 hex digest of image_bytes, if already computed
+
+        Returns:
+            Tuple of (key, perceptual hash or None, cached text or None); pass
+            the key and hash to store() after extracting on a miss
+        """
+        key = key or hashlib.sha256(image_bytes).hexdigest()
+        dhash = compute_dhash(image_bytes) if self.perceptual else None
+        return key, dhash, self.get(namespace, key, dhash)
+
+    def store(self, namespace: str, key: str, text: str, dhash: Optional[int] = None, cache: bool = True):
+        """
+        Record an extraction run for a lookup miss and cache its result
+
+        Args:
+            namespace: Extraction namespace
+            key: Key returned by lookup()
+            text: Extraction result
+            dhash: Perceptual hash returned by lookup()
+            cache: Whether to cache the result; pass False for results that
+                should be retried next time (e.g. nothing found on a blurry shot)
+        """
+        self.extractions += 1
+        # Empty results are usually transient failures, so they are retried next time
+        if cache and text:
+            self.set(namespace, key, text, dhash)
+
+    def clear(self):
+        """Drop every cached result from both tiers"""
+        self.memory.clear()
+        for namespace, key, _, _, _ in list(self.list_entries()):
+            self.remove_entry(namespace, key)
+        with self._lock:
+            self._disk_bytes = 0
+            self._dhashes.clear()
+
+    def stats(self) -> Dict:
+        """
+        Get hit/miss counters of the in-process tier, hits of the other tiers
+        and the number of extractions that had to be run
+        """
+        stats = self.memory.stats()
+        stats['disk_hits'] = self.disk_hits
+        stats['perceptual_hits'] = self.perceptual_hits
+        stats['extractions'] = self.extractions
+        return stats
+
+
+extraction_cache = ExtractionCache()
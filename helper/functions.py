@@ -1,7 +1,9 @@
 from fastapi import HTTPException
 import requests
+import os
+import asyncio
 import base64
-import json
+import hashlib
 import re
 from enum import Enum
 import torch
@@ -12,7 +14,14 @@ from PIL import Image
 from io import BytesIO
 import cv2
 import numpy as np
-from helper.ingredients import ingredients_avoid_oily, ingredients_avoid_dry, ingredients_avoid_normal, ingredients_avoid_acne, ingredients_avoid_sensitive
+from helper.rules import IngredientRules, get_rules
+from helper.extraction_cache import extraction_cache
+from helper.gemini import CircuitOpenError
+# clean_extracted_text and parse_ingredients_to_list moved to helper.extraction; imported here for existing callers
+from helper.extraction import (
+    ExtractionBackend, ExtractedIngredients, clean_extracted_text, parse_ingredients_to_list
+)
+from helper.singleflight import SingleFlight
 
 class SkinType(str, Enum):
     oily = "oily"
@@ -21,10 +30,17 @@ class SkinType(str, Enum):
     acne = "acne"
     sensitive = "sensitive"
 
+# Seconds before an image download is abandoned
+IMAGE_DOWNLOAD_TIMEOUT = float(os.getenv("IMAGE_DOWNLOAD_TIMEOUT", "15"))
+
+# Concurrent identical downloads and extractions share one in-flight run
+image_download_flight = SingleFlight()
+extraction_flight = SingleFlight()
+
 # Fungsi untuk mengambil gambar dari URL
 def get_image_from_url(image_url: str) -> bytes:
     try:
-        response = requests.get(image_url)
+        response = requests.get(image_url, timeout=IMAGE_DOWNLOAD_TIMEOUT)
         response.raise_for_status()
         return response.content
     except Exception as e:
@@ -41,62 +57,64 @@ def get_image_from_path(image_path: str) -> bytes:
 def convert_image_to_base64(image_bytes: bytes) -> str:
     return base64.b64encode(image_bytes).decode("utf-8")
 
-# Fungsi untuk ekstraksi teks menggunakan Gemini
-def extract_text_from_image(image_bytes: bytes, client) -> str:
-    try:
-        base64_image = convert_image_to_base64(image_bytes)
-        response = client.models.generate_content(
-            model="gemini-3.5-flash",
-            contents=[
-                {
-                    "inline_data": {
-                        "mime_type": "image/jpeg",
-                        "data": base64_image,
-                    }
-                },
-                "cari ingredients/bahan/komposisi dalam gambar ini dan berikan hasilnya dalam format teks biasa tanpa markdown atau formatting lainnya. buang teks yang tidak relevan seperti nama brand, nama produk, atau informasi lain yang tidak berkaitan dengan bahan, serta jika tidak terdapat ingredients sama sekali, tampilkan ingredients not found.",
-            ],
-        )
-        return response.text
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error dari Gemini API: {str(e)}")
+def get_image_digest(image_bytes: bytes) -> str:
+    """Get the SHA-256 hex digest identifying an image's content"""
+    return hashlib.sha256(image_bytes).hexdigest()
 
-# funsi untuk membersihkan teks hasil ekstraksi OCR atau AI
-def clean_extracted_text(raw_text: str) -> str:
+async def get_image_from_url_async(image_url: str) -> bytes:
     """
-    Membersihkan teks hasil ekstraksi OCR atau AI dari karakter khusus dan formatting markdown.
-
-    Langkah pembersihan:
-    - Hilangkan markdown (e.g., **bold**)
-    - Ganti newline ganda menjadi paragraf
-    - Ganti newline tunggal menjadi spasi
-    - Hilangkan karakter aneh (*, multiple space, dsb.)
-    - Strip spasi awal/akhir
+    Download an image in a worker thread, sharing the download between
+    concurrent requests for the same URL
+    """
+    return await image_download_flight.do(image_url, lambda: asyncio.to_thread(get_image_from_url, image_url))
 
+async def extract_ingredients_from_image_async(image_bytes: bytes, backend: ExtractionBackend) -> ExtractedIngredients:
+    """
+    Extract the ingredients of an image without blocking the event loop
+    
+    Hashing and cache I/O run in a worker thread and the extraction runs on
+    the configured backend (Gemini, local OCR or the router between them).
+    Concurrent requests for the same image share one extraction.
+    
     Args:
-        raw_text (str): Teks asli hasil ekstraksi AI
-
+        image_bytes: Uploaded image
+        backend: Extraction backend
+        
     Returns:
-        str: Teks yang sudah bersih
+        Extraction result; its ingredients are ready for the matcher and the recommender
+        
+    Raises:
+        HTTPException: 503 while the Gemini circuit breaker is open, 504 when
+            the call keeps timing out, 500 on other extraction errors
     """
-    # Hapus markdown tebal seperti **text**
-    cleaned = re.sub(r'\*\*(.*?)\*\*', r'\1', raw_text)
-
-    # Ganti newline ganda dengan pemisah paragraf
-    cleaned = re.sub(r'\n\s*\n', '\n\n', cleaned)
-
-    # Ganti newline tunggal dengan spasi
-    cleaned = re.sub(r'\n', ' ', cleaned)
-
-    # Hapus bullet atau bintang tidak penting
-    cleaned = re.sub(r'\*+', '', cleaned)
-
-    # Hilangkan spasi berlebih
-    cleaned = re.sub(r'\s{2,}', ' ', cleaned)
-
-    # Strip spasi awal dan akhir
-    return cleaned.strip()
+    digest = await asyncio.to_thread(get_image_digest, image_bytes)
+    return await extraction_flight.do(
+        (backend.namespace, digest),
+        lambda: run_ingredient_extraction(image_bytes, digest, backend)
+    )
 
+async def run_ingredient_extraction(image_bytes: bytes, digest: str, backend: ExtractionBackend) -> ExtractedIngredients:
+    """Extract the ingredients of an image through the cache and the extraction backend"""
+    try:
+        namespace = backend.namespace
+        key, dhash, cached = await asyncio.to_thread(extraction_cache.lookup, image_bytes, namespace, digest)
+        if cached is not None:
+            try:
+                return ExtractedIngredients.model_validate_json(cached)
+            except ValueError as e:
+                print(f"Ignoring unreadable cached extraction {key}: {e}")
+        
+        result = await backend.extract(image_bytes)
+        
+        # Nothing-found results are retried next time instead of being served to a retake
+        await asyncio.to_thread(extraction_cache.store, namespace, key, result.model_dump_json(), dhash, result.found)
+        return result
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Gemini API tidak merespons tepat waktu.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error dari {backend.label}: {str(e)}")
 
 # fungsi untuk mengekstrak bagian Ingredients/Bahan dari teks panjang
 def extract_ingredients_section(text: str) -> str:
@@ -112,82 +130,54 @@ def extract_ingredients_section(text: str) -> str:
         return match.group(1).strip()
     return "Ingredients tidak ditemukan."
 
-# fungsi untuk mendapatkan daftar bahan yang harus dihindari berdasarkan jenis kulit
-def load_ingredients_details():
-    """Load ingredients details from JSON file"""
-    try:
-        with open('utils/details.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
-
 # fing harmful ingredients based on skin type
-ingredients_details = load_ingredients_details()
+def build_harmful_ingredient_details(found: set, avoid_list: list, skin_type: str, rules: IngredientRules) -> list:
+    """Build name/reason details for the avoid-list entries found, in avoid-list order"""
+    return [
+        {"name": ingredient, "reason": rules.get_reason(ingredient, skin_type)}
+        for ingredient in avoid_list
+        if ingredient in found
+    ]
+
 def find_harmful_ingredients_with_details(extracted_ingredients: str, avoid_list: list, skin_type: str) -> list:
     """Find harmful ingredients from extracted text with detailed explanations"""
-    harmful_found = []
-    extracted_lower = extracted_ingredients.lower()
+    # Matcher and explanations come from one snapshot, even if the rules reload meanwhile
+    rules = get_rules()
     
-    # Map skin type to details key
-    skin_type_key_map = {
-        "oily": "oily",
-        "dry": "dry", 
-        "normal": "normal",
-        "acne": "acne_prone",
-        "sensitive": "sensitive"
-    }
+    # One pass of the compiled matcher finds the entries of every skin type
+    matches = rules.matcher.scan(extracted_ingredients)
+    found = {entry for entries in matches.values() for entry in entries}
     
-    details_key = skin_type_key_map.get(skin_type, skin_type)
-    skin_details = ingredients_details.get(details_key, {})
-    
-    for ingredient in avoid_list:
-        if ingredient.lower() in extracted_lower:
-            ingredient_detail = {
-                "name": ingredient,
-                "reason": skin_details.get(ingredient, "Tidak cocok untuk jenis kulit ini berdasarkan penelitian dermatologis.")
-            }
-            harmful_found.append(ingredient_detail)
+    # Entries outside the rule lists get their own (cached) matcher
+    custom_entries = tuple(entry for entry in avoid_list if entry not in rules.matcher.entries)
+    if custom_entries:
+        found.update(rules.get_custom_matcher(custom_entries).scan(extracted_ingredients).get("custom", []))
     
-    return harmful_found
+    return build_harmful_ingredient_details(found, avoid_list, skin_type, rules)
 
-def parse_ingredients_to_list(ingredients_text: str) -> list:
-    """Parse ingredients text into a clean list, handling special cases like '1,2-hexanediol'"""
-    if not ingredients_text:
-        return []
-    
-    # First, protect chemical compounds with numbers and commas (like 1,2-hexanediol)
-    # Replace pattern like "number,number-" with "number.number-"
-    protected_text = re.sub(r'(\d+),(\d+)-', r'\1.\2-', ingredients_text)
-    
-    # Split by comma and clean each ingredient
-    ingredients_list = [
-        ingredient.strip().title() 
-        for ingredient in protected_text.split(',')
-        if ingredient.strip()
-    ]
+def find_harmful_ingredients_for_all_skin_types(extracted_ingredients: str) -> dict:
+    """
+    Find harmful ingredients for every skin type with a single matcher pass
     
-    # Remove size/volume information from last ingredient if present
-    if ingredients_list:
-        last_ingredient = ingredients_list[-1]
-        # Remove patterns like "30 ml/1.76 fl.oz"
-        cleaned_last = re.sub(r'\s*\d+.*?(?:ml|oz|g|kg|fl\.oz).*$', '', last_ingredient, flags=re.IGNORECASE)
-        if cleaned_last.strip():
-            ingredients_list[-1] = cleaned_last.strip()
-        else:
-            ingredients_list.pop()  # Remove if nothing left after cleaning
+    Returns:
+        Dictionary of skin type value -> harmful ingredient details
+    """
+    rules = get_rules()
+    matches = rules.matcher.scan(extracted_ingredients)
     
-    return ingredients_list
+    return {
+        skin_type.value: build_harmful_ingredient_details(
+            set(matches.get(skin_type.value, [])),
+            rules.get_avoid_list(skin_type.value),
+            skin_type.value,
+            rules
+        )
+        for skin_type in SkinType
+    }
 
 def get_ingredients_to_avoid(skin_type: SkinType) -> list:
-    """Get list of ingredients to avoid based on skin type"""
-    skin_type_map = {
-        SkinType.oily: ingredients_avoid_oily,
-        SkinType.dry: ingredients_avoid_dry,
-        SkinType.normal: ingredients_avoid_normal,
-        SkinType.acne: ingredients_avoid_acne,
-        SkinType.sensitive: ingredients_avoid_sensitive
-    }
-    return skin_type_map.get(skin_type, [])
+    """Get list of ingredients to avoid based on skin type, from the active rules"""
+    return get_rules().get_avoid_list(getattr(skin_type, 'value', skin_type))
 
 # Load the pre-trained ResNet50 model + higher level layers
 def load_skin_type_model():
@@ -0,0 +1,193 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from typing import Any, Dict
+
+from google.genai import errors
+
+# Gemini calls in flight at once per worker; further scans wait for a slot
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+
+# Seconds before a single Gemini call is abandoned
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))
+
+# Retries of a call that timed out, was rate limited or hit a server error
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
+
+# Base and cap of the exponential backoff between retries, in seconds
+GEMINI_RETRY_BASE_DELAY = float(os.getenv("GEMINI_RETRY_BASE_DELAY", "0.5"))
+GEMINI_RETRY_MAX_DELAY = float(os.getenv("GEMINI_RETRY_MAX_DELAY", "8"))
+
+# Consecutive failed calls that open the circuit, and seconds it stays open
+GEMINI_BREAKER_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5"))
+GEMINI_BREAKER_COOLDOWN = float(os.getenv("GEMINI_BREAKER_COOLDOWN", "30"))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the circuit breaker is open"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Gemini API sementara tidak tersedia, coba lagi dalam {int(retry_after) + 1} detik")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    After `threshold` failed calls in a row the circuit opens and calls fail
+    immediately for `cooldown` seconds. Then a single trial call is let
+    through: its success closes the circuit, its failure reopens it.
+    """
+
+    def __init__(self, threshold: int = GEMINI_BREAKER_THRESHOLD, cooldown: float = GEMINI_BREAKER_COOLDOWN):
+        """
+        Args:
+            threshold: Consecutive failures that open the circuit
+            cooldown: Seconds the circuit stays open before a trial call
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Get the state of the circuit: closed, open or half_open"""
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            return "open" if time.monotonic() - self.opened_at < self.cooldown else "half_open"
+
+    def before_call(self):
+        """
+        Check that a call may proceed
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half open with a trial call in flight
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return
+
+            remaining = self.cooldown - (time.monotonic() - self.opened_at)
+            if remaining > 0 or self.trial_in_flight:
+                raise CircuitOpenError(max(remaining, 0))
+            self.trial_in_flight = True
+
+    def record_success(self):
+        """Close the circuit after a successful call"""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        """Count a failed call, opening the circuit at the threshold or when a trial call fails"""
+        with self._lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+    def release_trial(self):
+        """End a call that says nothing about Gemini's health, letting the next call run the trial"""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the state and failure count of the circuit"""
+        return {'state': self.state, 'consecutive_failures': self.failures}
+
+
+def is_retryable(error: Exception) -> bool:
+    """Check whether a failed Gemini call may succeed when retried (timeouts, 429 and 5xx)"""
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    if isinstance(error, errors.APIError):
+        return error.code == 429 or (error.code or 0) >= 500
+    return False
+
+
+def get_retry_delay(attempt: int, base_delay: float = GEMINI_RETRY_BASE_DELAY,
+                    max_delay: float = GEMINI_RETRY_MAX_DELAY) -> float:
+    """Get the jittered exponential backoff before a retry ("full jitter")"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class GeminiClient:
+    """
+    Non-blocking Gemini client for the request path
+
+    Calls go through the SDK's async interface, so a slow Gemini response
+    does not block the event loop. A semaphore bounds the calls in flight,
+    each attempt has a timeout, retryable failures are retried with
+    jittered exponential backoff, and a circuit breaker fails fast while
+    Gemini keeps failing.
+    """
+
+    def __init__(self, client, max_concurrency: int = GEMINI_MAX_CONCURRENCY, timeout: float = GEMINI_TIMEOUT,
+                 max_retries: int = GEMINI_MAX_RETRIES, breaker: CircuitBreaker = None):
+        """
+        Args:
+            client: google.genai.Client
+            max_concurrency: Maximum calls in flight at once
+            timeout: Seconds before a single attempt is abandoned
+            max_retries: Retries of a retryable failure
+            breaker: Circuit breaker shared by the calls
+        """
+        self.client = client
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def generate_content(self, **kwargs):
+        """
+        Call client.aio.models.generate_content with limits, retries and the circuit breaker
+
+        Args:
+            **kwargs: Arguments of generate_content (model, contents, config)
+
+        Returns:
+            The SDK's GenerateContentResponse
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            Exception: The last error once retries are exhausted, or a non-retryable error
+        """
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                async with self._semaphore:
+                    response = await asyncio.wait_for(
+                        self.client.aio.models.generate_content(**kwargs), timeout=self.timeout
+                    )
+            except Exception as e:
+                retryable = is_retryable(e)
+                # Client errors (bad request, invalid image) say nothing about Gemini's health
+                if retryable:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.release_trial()
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(get_retry_delay(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                # A cancelled call must not leave the trial slot taken
+                self.breaker.release_trial()
+                raise
+
+            self.breaker.record_success()
+            return response
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the circuit breaker state"""
+        return self.breaker.stats()
@@ -0,0 +1,135 @@
+import re
+from typing import List
+
+# Aliases and spelling variants -> canonical INCI name. Keys are written in the
+# form produced by SkinCareRecommendationSystem.clean_ingredients_text
+# (lowercase, brackets and symbols replaced by spaces).
+INCI_ALIASES = {
+    # Water
+    "water": "aqua",
+    "aqua water": "aqua",
+    "water aqua": "aqua",
+    "aqua water eau": "aqua",
+    "water aqua eau": "aqua",
+    "eau": "aqua",
+    "purified water": "aqua",
+    "deionized water": "aqua",
+    "demineralized water": "aqua",
+
+    # Humectants and solvents
+    "glycerine": "glycerin",
+    "glycerol": "glycerin",
+    "1.2-hexanediol": "1,2-hexanediol",
+    "1 2-hexanediol": "1,2-hexanediol",
+    "1,2 hexanediol": "1,2-hexanediol",
+    "1.2 hexanediol": "1,2-hexanediol",
+    "hyaluronic acid sodium hyaluronate": "sodium hyaluronate",
+    "sodium hyaluronate hyaluronic acid": "sodium hyaluronate",
+
+    # Vitamins
+    "vitamin b3": "niacinamide",
+    "niacinamide vitamin b3": "niacinamide",
+    "vitamin b5": "panthenol",
+    "pro-vitamin b5": "panthenol",
+    "provitamin b5": "panthenol",
+    "d-panthenol": "panthenol",
+    "dexpanthenol": "panthenol",
+    "vitamin e": "tocopherol",
+    "tocopherol vitamin e": "tocopherol",
+    "vitamin e acetate": "tocopheryl acetate",
+    "vitamin c": "ascorbic acid",
+    # No "vitamin a" alias: on labels it also covers retinyl palmitate and other
+    # esters, so it is not the same ingredient as retinol
+
+    # Fragrance
+    "fragrance": "parfum",
+    "perfume": "parfum",
+    "parfum fragrance": "parfum",
+    "fragrance parfum": "parfum",
+
+    # Alcohol
+    "denatured alcohol": "alcohol denat",
+
+    # Ceramides
+    "ceramide 3": "ceramide np",
+    "ceramide 1": "ceramide eop",
+    "ceramide 6 ii": "ceramide ap",
+
+    # Colorants
+    "titanium dioxide ci 77891": "titanium dioxide",
+    "ci 77891 titanium dioxide": "titanium dioxide",
+    "ci 15850 1": "ci 15850",
+    "ci 15850 2": "ci 15850",
+
+    # Botanicals (common name -> INCI name)
+    "cica": "centella asiatica extract",
+    "centella asiaticac extract": "centella asiatica extract",
+    "tea tree oil": "melaleuca alternifolia leaf oil",
+    "melaleuca alternifolia tea tree leaf oil": "melaleuca alternifolia leaf oil",
+    "aloe vera": "aloe barbadensis leaf extract",
+    "aloe vera extract": "aloe barbadensis leaf extract",
+    "green tea extract": "camellia sinensis leaf extract",
+    "camellia sinensis green tea leaf extract": "camellia sinensis leaf extract",
+    "licorice extract": "glycyrrhiza glabra root extract",
+    "glycyrrhiza glabra licorice root extract": "glycyrrhiza glabra root extract",
+    "simmondsia chinensis jojoba seed oil": "simmondsia chinensis seed oil",
+    "jojoba oil": "simmondsia chinensis seed oil",
+    "chamomilla recutita matricaria flower extract": "chamomilla recutita flower extract",
+
+    # Spelling mistakes seen in the catalog
+    "allantion": "allantoin",
+    "phenoxyetanol": "phenoxyethanol",
+    "niacinamid": "niacinamide",
+}
+
+# Placeholder stored for products whose description has no ingredients section
+MISSING_INGREDIENTS_TEXT = "ingredients tidak ditemukan"
+
+# Longer comma-separated chunks are description text swept up after the
+# ingredients section, not ingredient names
+MAX_INGREDIENT_WORDS = 8
+
+
+def canonicalize_ingredient(ingredient: str) -> str:
+    """
+    Map one cleaned ingredient name to its canonical INCI name
+
+    Args:
+        ingredient: Single ingredient, lowercase
+
+    Returns:
+        Canonical INCI name, or '' if the chunk is not an ingredient name
+    """
+    ingredient = re.sub(r'\s+', ' ', ingredient).strip(' .-')
+
+    if not ingredient or ingredient == MISSING_INGREDIENTS_TEXT:
+        return ''
+
+    if len(ingredient.split()) > MAX_INGREDIENT_WORDS:
+        return ''
+
+    return INCI_ALIASES.get(ingredient, ingredient)
+
+
+def tokenize_ingredients(ingredients_text: str) -> List[str]:
+    """
+    Split cleaned ingredients text into canonical INCI names, one token per ingredient
+
+    Commas inside chemical names like '1,2-hexanediol' are kept.
+
+    Args:
+        ingredients_text: Text produced by clean_ingredients_text
+
+    Returns:
+        List of canonical ingredient names
+    """
+    # Protect chemical compounds with numbers and commas (like 1,2-hexanediol)
+    protected_text = re.sub(r'(\d),(\d)', '\\1\x00\\2', ingredients_text)
+
+    tokens = []
+    for chunk in protected_text.split(','):
+        token = canonicalize_ingredient(chunk.replace('\x00', ','))
+        if token:
+            tokens.append(token)
+
+    return tokens
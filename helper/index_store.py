@@ -0,0 +1,421 @@
+import os
+import json
+import glob
+import shutil
+import fcntl
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+# Bump whenever the on-disk layout or the way the index is fitted changes,
+# so workers never load an artifact written by an incompatible build
+INDEX_FORMAT_VERSION = 9
+
+# Directory holding the recommendation index artifacts. Every worker memory-maps
+# the same files, so the index is held once per node in the page cache; point
+# this at /dev/shm to keep it in RAM-backed shared memory.
+RECOMMENDATION_INDEX_DIR = os.getenv("RECOMMENDATION_INDEX_DIR", "models/recommendation_index")
+
+# Artifacts kept per table and scoring variant, newest first. Keeping the previous
+# one lets workers that have not reloaded yet keep using and reopening it.
+RECOMMENDATION_INDEX_KEEP = max(1, int(os.getenv("RECOMMENDATION_INDEX_KEEP", "2")))
+
+# Product columns kept in the artifact for building responses
+METADATA_COLUMNS = ['title', 'image_url', 'price', 'link']
+
+
+class StringColumn:
+    """
+    Read-only column of strings stored as UTF-8 bytes plus row offsets
+
+    Unlike a pandas object column, both arrays can be memory-mapped, so every
+    worker process reads the same physical pages.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        """
+        Args:
+            data: uint8 array with the concatenated UTF-8 encoded values
+            offsets: int64 array of len(column) + 1 value boundaries in data
+        """
+        self.data = data
+        self.offsets = offsets
+
+    @staticmethod
+    def encode(values) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode values (None/NaN stored as empty strings) into (data, offsets) arrays"""
+        encoded = [
+            b'' if value is None or (isinstance(value, float) and np.isnan(value)) else str(value).encode('utf-8')
+            for value in values
+        ]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return data, offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        return self.data[self.offsets[row]:self.offsets[row + 1]].tobytes().decode('utf-8')
+
+
+def hash_link(link: str) -> int:
+    """Hash a product link into a 64-bit key for the link lookup table"""
+    return int.from_bytes(hashlib.blake2b(link.strip().encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def build_link_lookup(links) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build a sorted link hash -> product row lookup table
+
+    Args:
+        links: Product link of each row (empty or missing links are skipped)
+
+    Returns:
+        Tuple of (sorted uint64 link hashes, int32 product row of each hash)
+    """
+    rows = [row for row, link in enumerate(links) if isinstance(link, str) and link.strip()]
+    hashes = np.array([hash_link(links[row]) for row in rows], dtype=np.uint64)
+    rows = np.array(rows, dtype=np.int32)
+
+    # Stable sort keeps the first row of duplicated links first
+    order = np.argsort(hashes, kind='stable')
+    return hashes[order], rows[order]
+
+
+def build_product_id_lookup(product_ids) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build a sorted product id -> product row lookup table
+
+    Args:
+        product_ids: Product id of each row
+
+    Returns:
+        Tuple of (sorted int64 product ids, int32 product row of each id)
+    """
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    order = np.argsort(product_ids, kind='stable')
+    return product_ids[order], order.astype(np.int32)
+
+
+class ProductTable:
+    """Compact product metadata, one StringColumn per column"""
+
+    def __init__(self, columns: Dict[str, StringColumn], n_products: int,
+                 link_hashes: Optional[np.ndarray] = None, link_rows: Optional[np.ndarray] = None,
+                 product_ids: Optional[np.ndarray] = None, product_id_keys: Optional[np.ndarray] = None,
+                 product_id_rows: Optional[np.ndarray] = None):
+        self.columns = columns
+        self.n_products = n_products
+        self.link_hashes = link_hashes
+        self.link_rows = link_rows
+        self.product_ids = product_ids
+        self.product_id_keys = product_id_keys
+        self.product_id_rows = product_id_rows
+
+    def __len__(self) -> int:
+        return self.n_products
+
+    def get(self, row: int, column: str, default: str = 'Unknown') -> str:
+        """Get a product value, or default if the column or value is missing"""
+        values = self.columns.get(column)
+        if values is None:
+            return default
+        value = values[row]
+        return value if value else default
+
+    def get_product_id(self, row: int) -> int:
+        """Get the product id (the products table's product_id) of a row"""
+        if self.product_ids is None:
+            return int(row)
+        return int(self.product_ids[row])
+
+    def find_product_id(self, product_id: int) -> Optional[int]:
+        """Find the product row with the given product id in O(log n), or None"""
+        if self.product_ids is None:
+            return int(product_id) if 0 <= product_id < self.n_products else None
+
+        position = int(np.searchsorted(self.product_id_keys, product_id))
+        if position < len(self.product_id_keys) and self.product_id_keys[position] == product_id:
+            return int(self.product_id_rows[position])
+        return None
+
+    def find_link(self, link: str) -> Optional[int]:
+        """Find the product row with the given link in O(log n), or None"""
+        if self.link_hashes is None or not link or not link.strip():
+            return None
+
+        key = np.uint64(hash_link(link))
+        position = int(np.searchsorted(self.link_hashes, key))
+        while position < len(self.link_hashes) and self.link_hashes[position] == key:
+            row = int(self.link_rows[position])
+            if self.get(row, 'link', '') == link.strip():
+                return row
+            position += 1
+        return None
+
+
+def fingerprint_from_checksum(table_name: str, checksum: str) -> str:
+    """Build an artifact fingerprint from a database table checksum"""
+    return hashlib.sha256(f"{table_name}:{checksum}".encode('utf-8')).hexdigest()
+
+
+def fingerprint_from_dataframe(table_name: str, df: pd.DataFrame) -> str:
+    """Build an artifact fingerprint by hashing the content of a DataFrame"""
+    digest = hashlib.sha256(table_name.encode('utf-8'))
+    digest.update(','.join(map(str, df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def fingerprint_with_variant(fingerprint: str, variant: str) -> str:
+    """Derive the fingerprint of an index built with non-default options from the table fingerprint"""
+    return hashlib.sha256(f"{fingerprint}:{variant}".encode('utf-8')).hexdigest()
+
+
+def get_artifact_path(table_name: str, fingerprint: str,
+                      index_dir: str = RECOMMENDATION_INDEX_DIR) -> str:
+    """Get the versioned artifact directory for a table fingerprint"""
+    return os.path.join(index_dir, f"{table_name}-v{INDEX_FORMAT_VERSION}-{fingerprint[:16]}")
+
+
+@contextmanager
+def build_lock(index_dir: str = RECOMMENDATION_INDEX_DIR):
+    """
+    Hold an exclusive file lock while an artifact is being built
+
+    Workers booting at the same time wait here instead of all refitting the
+    index; once the lock is released they find the finished artifact.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    with open(os.path.join(index_dir, '.build.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def save_index_artifact(path: str, vocabulary: Dict[str, int], idf: np.ndarray,
+                        tfidf_matrix: csr_matrix, postings: csr_matrix, safety_bits: np.ndarray,
+                        skin_type_rankings: Dict[str, np.ndarray],
+                        neighbors: Tuple[np.ndarray, np.ndarray],
+                        products: pd.DataFrame, fingerprint: str,
+                        lsa: Optional[Tuple[np.ndarray, np.ndarray]] = None, variant: str = "sparse"):
+    """
+    Write a fitted recommendation index to a versioned artifact directory
+
+    The artifact is written to a temporary directory first and renamed into
+    place, so readers never see a partially written index.
+
+    Args:
+        path: Target artifact directory (see get_artifact_path)
+        vocabulary: Fitted vectorizer vocabulary (term -> column)
+        idf: Fitted inverse document frequencies
+        tfidf_matrix: Fitted (products x terms) TF-IDF matrix
+        postings: (terms x products) inverted index of tfidf_matrix
+        safety_bits: Per-product bitmask of skin types the product is unsafe for
+        skin_type_rankings: Skin type -> ranked product rows matching its description patterns
+        neighbors: (neighbor rows, neighbor scores) tables from compute_neighbor_table
+        products: Product rows aligned with tfidf_matrix, with their product_id
+        fingerprint: Content fingerprint of the source table
+        lsa: Optional (components, embeddings) of a LowRankIndex
+        variant: Scoring variant the artifact serves (see remove_stale_artifacts)
+    """
+    parent_dir = os.path.dirname(path)
+    os.makedirs(parent_dir, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix='.tmp-', dir=parent_dir)
+
+    try:
+        tfidf_matrix = csr_matrix(tfidf_matrix)
+        np.save(os.path.join(tmp_path, 'idf.npy'), np.asarray(idf))
+        np.save(os.path.join(tmp_path, 'tfidf_data.npy'), tfidf_matrix.data)
+        np.save(os.path.join(tmp_path, 'tfidf_indices.npy'), tfidf_matrix.indices)
+        np.save(os.path.join(tmp_path, 'tfidf_indptr.npy'), tfidf_matrix.indptr)
+        np.save(os.path.join(tmp_path, 'postings_data.npy'), postings.data)
+        np.save(os.path.join(tmp_path, 'postings_indices.npy'), postings.indices)
+        np.save(os.path.join(tmp_path, 'postings_indptr.npy'), postings.indptr)
+        np.save(os.path.join(tmp_path, 'safety_bits.npy'), np.asarray(safety_bits, dtype=np.uint8))
+        for skin_type, ranking in skin_type_rankings.items():
+            np.save(os.path.join(tmp_path, f'ranking_{skin_type}.npy'), np.asarray(ranking, dtype=np.int32))
+        np.save(os.path.join(tmp_path, 'neighbor_rows.npy'), np.asarray(neighbors[0], dtype=np.int32))
+        np.save(os.path.join(tmp_path, 'neighbor_scores.npy'), np.asarray(neighbors[1], dtype=np.float32))
+        if lsa is not None:
+            np.save(os.path.join(tmp_path, 'lsa_components.npy'), np.ascontiguousarray(lsa[0], dtype=np.float32))
+            np.save(os.path.join(tmp_path, 'lsa_embeddings.npy'), np.ascontiguousarray(lsa[1], dtype=np.float32))
+
+        # Store the vocabulary as a list ordered by column index
+        terms = [''] * len(vocabulary)
+        for term, column in vocabulary.items():
+            terms[column] = term
+        with open(os.path.join(tmp_path, 'vocabulary.json'), 'w', encoding='utf-8') as f:
+            json.dump(terms, f, ensure_ascii=False)
+
+        columns = [col for col in METADATA_COLUMNS if col in products.columns]
+        for column in columns:
+            data, offsets = StringColumn.encode(products[column].tolist())
+            np.save(os.path.join(tmp_path, f'product_{column}_data.npy'), data)
+            np.save(os.path.join(tmp_path, f'product_{column}_offsets.npy'), offsets)
+        product_ids = products['product_id'].to_numpy(dtype=np.int64)
+        np.save(os.path.join(tmp_path, 'product_ids.npy'), product_ids)
+        product_id_keys, product_id_rows = build_product_id_lookup(product_ids)
+        np.save(os.path.join(tmp_path, 'product_id_keys.npy'), product_id_keys)
+        np.save(os.path.join(tmp_path, 'product_id_rows.npy'), product_id_rows)
+        if 'link' in products.columns:
+            link_hashes, link_rows = build_link_lookup(products['link'].tolist())
+            np.save(os.path.join(tmp_path, 'link_hashes.npy'), link_hashes)
+            np.save(os.path.join(tmp_path, 'link_rows.npy'), link_rows)
+
+        manifest = {
+            'format_version': INDEX_FORMAT_VERSION,
+            'fingerprint': fingerprint,
+            'variant': variant,
+            'n_products': tfidf_matrix.shape[0],
+            'n_terms': tfidf_matrix.shape[1],
+            'skin_types': list(skin_type_rankings),
+            'product_columns': columns,
+            'lsa_dimensions': int(lsa[1].shape[1]) if lsa is not None else None,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+        }
+        with open(os.path.join(tmp_path, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        os.chmod(tmp_path, 0o755)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.rename(tmp_path, path)
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def load_index_artifact(path: str) -> Optional[Dict]:
+    """
+    Load a recommendation index artifact, memory-mapping every array
+
+    Nothing is copied into the process: matrices, masks, rankings and product
+    metadata are views over the mapped files shared by all workers.
+
+    Args:
+        path: Artifact directory (see get_artifact_path)
+
+    Returns:
+        Dictionary with manifest, vocabulary, idf, tfidf_matrix, postings,
+        safety_bits, skin_type_rankings, neighbor_rows, neighbor_scores, products
+        and lsa_components/lsa_embeddings (None without an LSA projection),
+        or None if no complete artifact exists at path
+    """
+    manifest_path = os.path.join(path, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest.get('format_version') != INDEX_FORMAT_VERSION:
+        return None
+
+    def load_array(name: str) -> np.ndarray:
+        return np.load(os.path.join(path, name), mmap_mode='r')
+
+    tfidf_matrix = csr_matrix(
+        (load_array('tfidf_data.npy'), load_array('tfidf_indices.npy'), load_array('tfidf_indptr.npy')),
+        shape=(manifest['n_products'], manifest['n_terms']),
+        copy=False
+    )
+
+    postings = csr_matrix(
+        (load_array('postings_data.npy'), load_array('postings_indices.npy'), load_array('postings_indptr.npy')),
+        shape=(manifest['n_terms'], manifest['n_products']),
+        copy=False
+    )
+    postings.has_sorted_indices = True
+
+    with open(os.path.join(path, 'vocabulary.json'), 'r', encoding='utf-8') as f:
+        terms: List[str] = json.load(f)
+
+    link_hashes = link_rows = None
+    if 'link' in manifest['product_columns']:
+        link_hashes, link_rows = load_array('link_hashes.npy'), load_array('link_rows.npy')
+
+    products = ProductTable(
+        {
+            column: StringColumn(load_array(f'product_{column}_data.npy'), load_array(f'product_{column}_offsets.npy'))
+            for column in manifest['product_columns']
+        },
+        manifest['n_products'],
+        link_hashes,
+        link_rows,
+        load_array('product_ids.npy'),
+        load_array('product_id_keys.npy'),
+        load_array('product_id_rows.npy')
+    )
+
+    return {
+        'manifest': manifest,
+        'vocabulary': {term: column for column, term in enumerate(terms)},
+        'idf': np.asarray(load_array('idf.npy')),
+        'tfidf_matrix': tfidf_matrix,
+        'postings': postings,
+        'safety_bits': load_array('safety_bits.npy'),
+        'skin_type_rankings': {
+            skin_type: load_array(f'ranking_{skin_type}.npy') for skin_type in manifest['skin_types']
+        },
+        'neighbor_rows': load_array('neighbor_rows.npy'),
+        'neighbor_scores': load_array('neighbor_scores.npy'),
+        'products': products,
+        'lsa_components': load_array('lsa_components.npy') if manifest.get('lsa_dimensions') else None,
+        'lsa_embeddings': load_array('lsa_embeddings.npy') if manifest.get('lsa_dimensions') else None,
+    }
+
+
+def read_artifact_variant(path: str) -> Optional[str]:
+    """Get the scoring variant recorded in an artifact's manifest, or None if it records none"""
+    try:
+        with open(os.path.join(path, 'manifest.json'), 'r', encoding='utf-8') as f:
+            return json.load(f).get('variant')
+    except (OSError, ValueError):
+        return None
+
+
+def remove_stale_artifacts(table_name: str, keep_path: str, variant: str = "sparse",
+                           index_dir: str = RECOMMENDATION_INDEX_DIR,
+                           keep: int = RECOMMENDATION_INDEX_KEEP):
+    """
+    Delete superseded artifacts of a table and scoring variant
+
+    Artifacts of other variants (e.g. the "lsa" index next to the sparse one)
+    are left alone. Of the same variant, keep_path and the newest others up
+    to keep artifacts in total are kept, so workers still serving the
+    previous artifact can reopen it until they reload. Artifacts whose
+    manifest records no variant (older formats) count as the same variant.
+
+    Args:
+        table_name: Name of the products table
+        keep_path: Artifact just written
+        variant: Scoring variant of keep_path
+        index_dir: Directory holding the artifacts
+        keep: Number of artifacts of the variant to keep, keep_path included
+    """
+    candidates = []
+    for path in glob.glob(os.path.join(index_dir, f"{table_name}-v*")):
+        if os.path.abspath(path) == os.path.abspath(keep_path):
+            continue
+        if read_artifact_variant(path) not in (variant, None):
+            continue
+        try:
+            candidates.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+
+    # Newest first; the first keep - 1 stay next to keep_path
+    candidates.sort(reverse=True)
+    for _, path in candidates[max(0, keep - 1):]:
+        shutil.rmtree(path, ignore_errors=True)
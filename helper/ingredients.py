@@ -1,36 +1,16 @@
-ingredients_avoid_oily = [
-    "Mineral Oil", "Lanolin", "Petrolatum", "Coconut Oil", "Isopropyl Myristate",
-    "Isopropyl Palmitate", "Myristyl Myristate", "Stearic Acid", "Beeswax", "Silicone",
-    "Dimethicone", "Sodium Lauryl Sulfate", "Alcohol Denat", "Fragrance", "Cocoa Butter",
-    "PEGs (Polyethylene Glycols)", "Algae Extract", "Butyl Stearate", "Oleyl Alcohol"
-]
+# The avoid lists and aliases live in utils/rules.json and are hot-reloaded by
+# helper.rules, so they are read from the active rules on every call instead
+# of being copied into module-level lists that would go stale after a reload.
+from typing import Dict, List
 
-ingredients_avoid_dry = [
-    "Alcohol Denat", "Ethanol", "SD Alcohol", "Isopropyl Alcohol",
-    "Fragrance", "Menthol", "Camphor", "Witch Hazel", "Sodium Lauryl Sulfate",
-    "Benzoyl Peroxide", "Retinol (tanpa moisturizer)", "Clay", "Charcoal",
-    "Salicylic Acid (dalam kadar tinggi)", "AHA/BHA"
-]
+from helper.rules import get_rules
 
-ingredients_avoid_normal = [
-    "Fragrance", "Essential Oils (Tea Tree, Peppermint, Citrus Oils)",
-    "Alcohol Denat", "Sodium Lauryl Sulfate", "Harsh Exfoliants (Walnut Shells, Apricot Scrub)",
-    "Synthetic Dyes", "Bismuth Oxychloride", "Parabens (bagi yang sensitif)"
-]
 
-ingredients_avoid_acne = [
-    "Coconut Oil", "Lanolin", "Isopropyl Myristate", "Isopropyl Palmitate", "Laureth-4",
-    "Myristyl Myristate", "Butyl Stearate", "Algae Extract", "Silicone", "Fragrance",
-    "Alcohol Denat", "Sodium Lauryl Sulfate", "Benzaldehyde", "Cocoa Butter",
-    "Ethylhexyl Palmitate", "Oxybenzone", "Mineral Oil", "Petrolatum", "D&C Red Dyes"
-]
+def get_ingredients_avoid(skin_type: str) -> List[str]:
+    """Get the avoid list of a skin type (oily, dry, normal, acne, sensitive) from the active rules"""
+    return get_rules().get_avoid_list(getattr(skin_type, 'value', skin_type))
 
-ingredients_avoid_sensitive = [
-    "Fragrance", "Essential Oils (Lavender, Citrus, Peppermint, Eucalyptus)",
-    "Alcohol Denat", "Ethanol", "SD Alcohol", "Menthol", "Camphor",
-    "Witch Hazel", "Benzoyl Peroxide", "Salicylic Acid (konsentrasi tinggi)",
-    "Retinol/Retinoids (tanpa pengawasan dokter)", "AHA/BHA",
-    "Sodium Lauryl Sulfate", "Artificial Colorants", "Methylisothiazolinone",
-    "Formaldehyde Releasers (DMDM Hydantoin, Quaternium-15)", "Phenoxyethanol",
-    "Aluminum Compounds", "Propylene Glycol", "Octinoxate", "Oxybenzone"
-]
+
+def get_ingredient_aliases() -> Dict[str, List[str]]:
+    """Get the ingredient aliases (name -> search terms) of the active rules"""
+    return get_rules().aliases
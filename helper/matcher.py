@@ -0,0 +1,179 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Parenthesized text starting with one of these words qualifies an entry
+# (e.g. "Retinol (tanpa moisturizer)") instead of listing its members
+QUALIFIER_WORDS = ("tanpa", "dalam", "konsentrasi", "bagi", "untuk")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and reduce punctuation to single spaces, keeping '&', '+' and '-'"""
+    return re.sub(r'[^\w&+-]+|_+', ' ', str(text).lower()).strip()
+
+
+def split_entry(entry: str) -> Tuple[str, str]:
+    """
+    Split an avoid-list entry into its name and parenthesized part
+
+    Args:
+        entry: Avoid-list entry, e.g. "PEGs (Polyethylene Glycols)"
+
+    Returns:
+        Tuple of (name, parenthesized text or '')
+    """
+    match = re.match(r'^\s*([^(]*?)\s*(?:\((.*)\))?\s*$', entry)
+    if not match:
+        return entry.strip(), ''
+    return match.group(1), (match.group(2) or '').strip()
+
+
+def get_base_name(entry: str) -> str:
+    """Get the name of an avoid-list entry without its parenthesized part"""
+    return split_entry(entry)[0]
+
+
+def expand_entry(entry: str, aliases: Optional[Dict[str, List[str]]] = None) -> List[str]:
+    """
+    Expand an avoid-list entry into the normalized terms to search for
+
+    The name is split on '/', members listed in parentheses are added
+    (qualifiers like "(tanpa moisturizer)" are dropped) and every name with
+    an alias entry is replaced by its aliases.
+
+    Args:
+        entry: Avoid-list entry
+        aliases: Name -> search terms
+
+    Returns:
+        Unique normalized search terms
+    """
+    aliases = aliases or {}
+    name, parenthesized = split_entry(entry)
+    names = [part.strip() for part in name.split('/') if part.strip()]
+
+    if parenthesized and not parenthesized.lower().startswith(QUALIFIER_WORDS):
+        names.extend(member.strip() for member in parenthesized.split(',') if member.strip())
+
+    terms = []
+    for name in names:
+        for term in aliases.get(name, [name]):
+            normalized = normalize_text(term)
+            if normalized and normalized not in terms:
+                terms.append(normalized)
+    return terms
+
+
+class IngredientMatcher:
+    """
+    Aho-Corasick automaton over the search terms of all avoid lists
+
+    The automaton is compiled once; scanning a text is a single pass over its
+    characters whatever the number of terms. A term only matches as a whole
+    word, so "Silicone" does not match inside "polysilicone-11".
+    """
+
+    def __init__(self, avoid_lists: Dict[str, List[str]],
+                 aliases: Optional[Dict[str, List[str]]] = None):
+        """
+        Args:
+            avoid_lists: Skin type -> avoid-list entries
+            aliases: Name -> search terms used to expand the entries
+        """
+        self.avoid_lists = {skin_type: list(entries) for skin_type, entries in avoid_lists.items()}
+        self.entries = {entry for entries in self.avoid_lists.values() for entry in entries}
+
+        # Term -> (skin type, entry) pairs it reveals
+        self.term_targets: Dict[str, List[Tuple[str, str]]] = {}
+        for skin_type, entries in self.avoid_lists.items():
+            for entry in entries:
+                for term in expand_entry(entry, aliases):
+                    self.term_targets.setdefault(term, []).append((skin_type, entry))
+
+        self.terms = list(self.term_targets)
+        self.build_automaton()
+
+    def build_automaton(self):
+        """Build the trie, failure links and merged outputs of the automaton"""
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.outputs: List[List[int]] = [[]]
+
+        for term_id, term in enumerate(self.terms):
+            state = 0
+            for char in term:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                state = next_state
+            self.outputs[state].append(term_id)
+
+        # Breadth-first so each failure link points to an already finished state
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                if state:
+                    # Longest proper suffix of next_state's path that is also a trie path
+                    fallback = self.fail[state]
+                    while fallback and char not in self.goto[fallback]:
+                        fallback = self.fail[fallback]
+                    self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+                queue.append(next_state)
+
+    def find_terms(self, text: str) -> List[str]:
+        """
+        Find the search terms occurring as whole words in a text
+
+        Args:
+            text: Ingredients text, in any case and punctuation
+
+        Returns:
+            Matched terms, in order of first occurrence
+        """
+        text = normalize_text(text)
+        found = {}
+        state = 0
+        last = len(text) - 1
+
+        for position, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+
+            for term_id in self.outputs[state]:
+                if term_id in found:
+                    continue
+                start = position - len(self.terms[term_id]) + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if position < last and text[position + 1].isalnum():
+                    continue
+                found[term_id] = start
+
+        return [self.terms[term_id] for term_id in found]
+
+    def scan(self, text: str) -> Dict[str, List[str]]:
+        """
+        Find the avoid-list entries present in a text for every skin type
+
+        Args:
+            text: Ingredients text
+
+        Returns:
+            Skin type -> matched entries in avoid-list order (skin types
+            without matches are left out)
+        """
+        matched = set()
+        for term in self.find_terms(text):
+            matched.update(self.term_targets[term])
+
+        return {
+            skin_type: [entry for entry in entries if (skin_type, entry) in matched]
+            for skin_type, entries in self.avoid_lists.items()
+            if any((skin_type, entry) in matched for entry in entries)
+        }
+
@@ -1,31 +1,230 @@
+import numpy as np
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.preprocessing import StandardScaler
 import os
-from typing import List, Dict, Tuple
+import threading
+from typing import List, Dict, Optional, Tuple
 import re
 
-from helper.functions import find_harmful_ingredients_with_details
+from helper.functions import SkinType
+from helper.rules import get_rules
+from helper.safety import PRODUCT_SAFETY_TABLE, catalog_checksum, load_safety_bits
+from helper.retrieval import InvertedIndex, LowRankIndex, select_top_k, compute_neighbor_table
+from helper.cache import LRUCache
+from helper.inci import tokenize_ingredients
+from helper.index_store import (
+    RECOMMENDATION_INDEX_DIR, fingerprint_from_checksum, fingerprint_from_dataframe,
+    fingerprint_with_variant, get_artifact_path, build_lock, save_index_artifact, load_index_artifact,
+    remove_stale_artifacts
+)
 
 
-from utils.database import read_table
+from utils.database import read_table, get_table_checksum
+
+# Skin types in safety bitmask order: bit i is set when a product is unsafe for SKIN_TYPES[i]
+SKIN_TYPES = [skin_type.value for skin_type in SkinType]
+
+# Seconds between checks of the products table for changes (0 disables hot reload)
+RECOMMENDATION_RELOAD_INTERVAL = int(os.getenv("RECOMMENDATION_RELOAD_INTERVAL", "300"))
+
+# Minimum cosine similarity for a product to be recommended (lowered for small dataset)
+MIN_SIMILARITY_SCORE = 0.05
+
+# Similarity scoring mode: "sparse" scores exact TF-IDF cosine similarities over
+# the inverted index, "lsa" scores a dense low-rank (truncated SVD) projection
+RECOMMENDATION_MODES = ("sparse", "lsa")
+RECOMMENDATION_MODE = os.getenv("RECOMMENDATION_MODE", "sparse").lower()
+
+# Latent dimensions of the "lsa" mode projection
+RECOMMENDATION_LSA_DIMENSIONS = int(os.getenv("RECOMMENDATION_LSA_DIMENSIONS", "128"))
+
+# Nearest catalog neighbors precomputed per product for "similar to this product"
+RECOMMENDATION_NEIGHBORS = int(os.getenv("RECOMMENDATION_NEIGHBORS", "50"))
+
+# Worker processes computing the neighbor table (0 for one per CPU)
+RECOMMENDATION_NEIGHBOR_WORKERS = int(os.getenv("RECOMMENDATION_NEIGHBOR_WORKERS", "0"))
+
+# Safe candidates kept per item of a batch before duplicate names are skipped
+RECOMMENDATION_BATCH_CANDIDATES = int(os.getenv("RECOMMENDATION_BATCH_CANDIDATES", "50"))
+
+# Universal patterns - products for all skin types
+UNIVERSAL_SKIN_TYPE_PATTERN = r'\b(?:semua\s+jenis\s+kulit|all\s+skin\s+types?|segala\s+jenis\s+kulit|untuk\s+semua\s+kulit)\b'
+
+# Additional description keywords for each skin type
+SKIN_TYPE_KEYWORD_PATTERNS = {
+    "oily": r'\b(?:berminyak|oily|excess\s+oil|kontrol\s+minyak|oil\s+control)\b',
+    "dry": r'\b(?:kering|dry|dehidrasi|dehydrat|moisturiz|pelembab)\b',
+    "normal": r'\b(?:normal|seimbang|balanced)\b',
+    "acne": r'\b(?:jerawat|acne|breakout|blemish|anti\s+acne)\b',
+    "sensitive": r'\b(?:sensitif|sensitive|gentle|lembut|hypoallergenic)\b',
+}
+
+def with_rules_fingerprint(fingerprint: str) -> str:
+    """Tie a table fingerprint to the ingredient rules the safety bitmasks are computed with"""
+    return fingerprint_with_variant(fingerprint, f"rules-{get_rules().checksum}")
+
+def get_table_fingerprint(table_name: str) -> Tuple[str, pd.DataFrame]:
+    """
+    Get the content fingerprint of a products table
+    
+    Uses the database table checksum when available and falls back to
+    reading the table and hashing its content. The active ingredient rules
+    are part of the fingerprint, so a rule change rebuilds the index.
+    
+    Args:
+        table_name: Name of the database table containing skincare products
+        
+    Returns:
+        Tuple of (fingerprint, DataFrame read for the fallback or None)
+    """
+    checksum = get_table_checksum(table_name)
+    if checksum is not None:
+        return with_rules_fingerprint(fingerprint_from_checksum(table_name, checksum)), None
+    
+    # Fall back to hashing the table content directly
+    df = read_table(table_name)
+    if df is None or df.empty:
+        raise ValueError(f"No data found in table '{table_name}'")
+    return with_rules_fingerprint(fingerprint_from_dataframe(table_name, df)), df
+
 
 class SkinCareRecommendationSystem:
-    def __init__(self, table_name: str = "products"):
+    def __init__(self, table_name: str = "products", index_dir: str = RECOMMENDATION_INDEX_DIR,
+                 rebuild: bool = False, df: pd.DataFrame = None, mode: str = RECOMMENDATION_MODE):
         """
         Initialize the recommendation system using database table
         
         Args:
             table_name: Name of the database table containing skincare products
+            index_dir: Directory holding the persisted index artifacts
+            rebuild: Refit the index even if an artifact for the table exists
+            df: Products to index instead of reading table_name from the database
+            mode: Similarity scoring mode, one of RECOMMENDATION_MODES
         """
+        if mode not in RECOMMENDATION_MODES:
+            raise ValueError(f"Unsupported recommendation mode '{mode}', expected one of {RECOMMENDATION_MODES}")
+        
         self.table_name = table_name
-        self.df = None
+        self.index_dir = index_dir
+        self.mode = mode
+        self.fingerprint = None
+        self.df = None  # Full products table, only held while building the index
+        self.products = None
         self.tfidf_vectorizer = None
         self.tfidf_matrix = None
+        self.exact_index = None
+        self.lsa_index = None
+        self.search_index = None  # Index queries are scored with, depending on mode
+        self.safety_bits = None
+        self.skin_type_rankings = {}
+        self.neighbor_rows = None
+        self.neighbor_scores = None
         self.scaler = StandardScaler()
-        self.load_data_from_db()
-        self.prepare_recommendation_system()
+        self.load_or_build_index(rebuild, df)
+
+    def load_or_build_index(self, rebuild: bool = False, df: pd.DataFrame = None):
+        """
+        Load the index artifact for the current table content, refitting
+        and persisting it only when the table has changed
+        
+        Args:
+            rebuild: Refit the index even if an artifact for the table exists
+            df: Products to index instead of reading the table from the database
+        """
+        if df is not None:
+            self.fingerprint, self.df = with_rules_fingerprint(fingerprint_from_dataframe(self.table_name, df)), df.copy()
+        else:
+            self.fingerprint, self.df = get_table_fingerprint(self.table_name)
+        
+        artifact_path = self.get_artifact_path()
+        if not rebuild and self.load_index(artifact_path):
+            return
+        
+        with build_lock(self.index_dir):
+            # Another worker may have finished the build while we waited for the lock
+            if not rebuild and self.load_index(artifact_path):
+                return
+            
+            if self.df is None:
+                self.load_data_from_db()
+            if self.df is None:
+                raise ValueError(f"No data found in table '{self.table_name}'")
+            
+            self.prepare_recommendation_system()
+            
+            save_index_artifact(
+                artifact_path,
+                self.tfidf_vectorizer.vocabulary_,
+                self.tfidf_vectorizer.idf_,
+                self.tfidf_matrix,
+                self.exact_index.postings,
+                self.safety_bits,
+                self.skin_type_rankings,
+                (self.neighbor_rows, self.neighbor_scores),
+                self.df,
+                self.fingerprint,
+                (self.lsa_index.components, self.lsa_index.embeddings) if self.lsa_index is not None else None,
+                self.get_artifact_variant()
+            )
+            remove_stale_artifacts(self.table_name, artifact_path, self.get_artifact_variant(), self.index_dir)
+            print(f"Saved recommendation index artifact to '{artifact_path}'")
+        
+        # Serve from the memory-mapped artifact like every other worker, so the
+        # fitted in-process copies can be released
+        if not self.load_index(artifact_path):
+            raise ValueError(f"Could not load recommendation index artifact '{artifact_path}'")
+        self.df = None
+
+    def get_artifact_variant(self) -> str:
+        """Get the scoring variant of the artifact: "sparse", or "lsa-<dimensions>" in lsa mode"""
+        return f"lsa-{RECOMMENDATION_LSA_DIMENSIONS}" if self.mode == "lsa" else "sparse"
+    
+    def get_artifact_path(self) -> str:
+        """Get the artifact directory for the current table content and scoring mode"""
+        fingerprint = self.fingerprint
+        if self.mode == "lsa":
+            fingerprint = fingerprint_with_variant(fingerprint, self.get_artifact_variant())
+        return get_artifact_path(self.table_name, fingerprint, self.index_dir)
+
+    def load_index(self, artifact_path: str) -> bool:
+        """
+        Load a persisted index artifact instead of refitting the vectorizer
+        
+        Args:
+            artifact_path: Artifact directory to load
+            
+        Returns:
+            True if the artifact was loaded, False if it is missing or unreadable
+        """
+        try:
+            artifact = load_index_artifact(artifact_path)
+        except Exception as e:
+            print(f"Error loading recommendation index artifact: {e}")
+            return False
+        
+        if artifact is None:
+            return False
+        
+        if self.mode == "lsa" and artifact['lsa_embeddings'] is None:
+            return False
+        
+        self.tfidf_vectorizer = self.create_tfidf_vectorizer(artifact['vocabulary'])
+        self.tfidf_vectorizer.idf_ = artifact['idf']
+        self.tfidf_matrix = artifact['tfidf_matrix']
+        self.products = artifact['products']
+        self.exact_index = InvertedIndex.from_postings(artifact['postings'])
+        self.lsa_index = None
+        if artifact['lsa_embeddings'] is not None:
+            self.lsa_index = LowRankIndex(artifact['lsa_components'], artifact['lsa_embeddings'])
+        self.search_index = self.lsa_index if self.mode == "lsa" else self.exact_index
+        self.safety_bits = artifact['safety_bits']
+        self.skin_type_rankings = artifact['skin_type_rankings']
+        self.neighbor_rows = artifact['neighbor_rows']
+        self.neighbor_scores = artifact['neighbor_scores']
+        
+        print(f"Loaded recommendation index artifact '{artifact_path}' with {len(self.products)} products")
+        return True
 
     def load_data_from_db(self):
         """
@@ -59,12 +258,97 @@ class SkinCareRecommendationSystem:
         
         return ' '.join(words)
     
+    def create_tfidf_vectorizer(self, vocabulary: Dict[str, int] = None) -> TfidfVectorizer:
+        """
+        Create the TF-IDF vectorizer, optionally with an already fitted vocabulary
+        
+        Args:
+            vocabulary: Fitted vocabulary (term -> column) loaded from an artifact
+        """
+        # Each ingredient (canonical INCI name) is one feature, so names like
+        # "sodium hyaluronate" are not split into generic word tokens
+        return TfidfVectorizer(
+            tokenizer=tokenize_ingredients,
+            token_pattern=None,
+            lowercase=False,  # Text is already lowercased by clean_ingredients_text
+            min_df=2,  # Ingredients found in a single product cannot relate products
+            max_df=0.95,  # Ignore terms that appear in more than 95% of documents
+            vocabulary=vocabulary
+        )
+    
+    def compute_safety_bits(self, ingredients: pd.Series) -> np.ndarray:
+        """
+        Compute a per-product safety bitmask over all skin types
+        
+        Bit i of a product's mask is set when the product contains an ingredient
+        to avoid for SKIN_TYPES[i].
+        
+        Args:
+            ingredients: Raw ingredients text of each product
+            
+        Returns:
+            uint8 array with one bitmask per product
+        """
+        safety_bits = np.zeros(len(ingredients), dtype=np.uint8)
+        skin_type_bits = {skin_type: np.uint8(1 << bit) for bit, skin_type in enumerate(SKIN_TYPES)}
+        matcher = get_rules().matcher
+        
+        # One matcher pass per product tags its harmful ingredients with every skin type
+        for row, text in enumerate(ingredients):
+            for skin_type in matcher.scan(str(text)):
+                safety_bits[row] |= skin_type_bits[skin_type]
+        
+        return safety_bits
+    
+    def filter_safe_candidates(self, candidates: np.ndarray, similarity_scores: np.ndarray,
+                               skin_type: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Drop candidates containing ingredients to avoid for the skin type
+        
+        Only the candidates' bitmasks are read, so the cost scales with the
+        number of candidates rather than with the catalog.
+        
+        Args:
+            candidates: Product row indices
+            similarity_scores: Similarity score of each candidate
+            skin_type: User's skin type; unknown skin types filter nothing
+            
+        Returns:
+            Tuple of (safe product row indices, their similarity scores)
+        """
+        if skin_type not in SKIN_TYPES:
+            return candidates, similarity_scores
+        
+        bit = np.uint8(1 << SKIN_TYPES.index(skin_type))
+        is_safe = (self.safety_bits[candidates] & bit) == 0
+        return candidates[is_safe], similarity_scores[is_safe]
+    
+    def get_safe_mask(self, skin_type: str) -> Optional[np.ndarray]:
+        """Get a boolean array over products marking the ones safe for the skin type (None filters nothing)"""
+        if skin_type not in SKIN_TYPES:
+            return None
+        
+        bit = np.uint8(1 << SKIN_TYPES.index(skin_type))
+        return (self.safety_bits & bit) == 0
+    
     def prepare_recommendation_system(self):
         """Prepare TF-IDF vectorizer and similarity matrix"""
         try:
+            # Keep raw ingredients text for harmful-ingredient matching
+            raw_ingredients = self.df['ingredients'].fillna('').astype(str)
+            
             # Clean ingredients text
             self.df['ingredients'] = self.df['ingredients'].apply(self.clean_ingredients_text)
             
+            # Products read from the database carry their product_id; other sources are
+            # numbered by source position, as seed_db does, before rows are dropped
+            has_product_ids = 'product_id' in self.df.columns
+            if not has_product_ids:
+                self.df['product_id'] = np.arange(len(self.df))
+            
+            # Stored verdicts are matched against the whole table, before rows are dropped
+            products_checksum = catalog_checksum(self.df['product_id'], raw_ingredients)
+            
             # Remove products with empty ingredients
             valid_ingredients = self.df['ingredients'] != ''
             print(f"Found {valid_ingredients.sum()} products with valid ingredients out of {len(self.df)} total")
@@ -73,69 +357,131 @@ class SkinCareRecommendationSystem:
                 raise ValueError("No valid ingredients found in dataset")
             
             self.df = self.df[valid_ingredients].reset_index(drop=True)
+            raw_ingredients = raw_ingredients[valid_ingredients].reset_index(drop=True)
             
-            # Create TF-IDF matrix with adjusted parameters
-            self.tfidf_vectorizer = TfidfVectorizer(
-                max_features=3000,
-                stop_words='english',
-                lowercase=True,
-                ngram_range=(1, 2),  # Include bigrams for better matching
-                min_df=1,  # Lower threshold for small dataset
-                max_df=0.95  # Ignore terms that appear in more than 95% of documents
-            )
+            # Create TF-IDF matrix
+            self.tfidf_vectorizer = self.create_tfidf_vectorizer()
             
             self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(self.df['ingredients'])
             print(f"TF-IDF matrix shape: {self.tfidf_matrix.shape}")
             
+            # Build term -> posting list index once so queries only touch matching products
+            self.exact_index = InvertedIndex(self.tfidf_matrix)
+            
+            # Project products into a dense low-rank space for the "lsa" mode
+            if self.mode == "lsa":
+                self.lsa_index = LowRankIndex.fit(self.tfidf_matrix, RECOMMENDATION_LSA_DIMENSIONS)
+            self.search_index = self.lsa_index if self.mode == "lsa" else self.exact_index
+            
+            # Precompute which products are safe for each skin type, reusing the
+            # verdicts materialized by seed_db when they were computed for this catalog under the active rules
+            self.safety_bits = None
+            if has_product_ids:
+                self.safety_bits = load_safety_bits(
+                    self.df['product_id'].to_numpy(), SKIN_TYPES, get_rules().checksum, products_checksum
+                )
+            if self.safety_bits is None:
+                self.safety_bits = self.compute_safety_bits(raw_ingredients)
+            else:
+                print(f"Loaded safety verdicts from table '{PRODUCT_SAFETY_TABLE}'")
+            
+            # Precompute ranked description matches for each skin type
+            descriptions = self.df['description'] if 'description' in self.df.columns else pd.Series('', index=self.df.index)
+            self.skin_type_rankings = self.compute_skin_type_rankings(descriptions)
+            
+            # Precompute each product's nearest neighbors for "similar to this product"
+            self.neighbor_rows, self.neighbor_scores = compute_neighbor_table(
+                self.tfidf_matrix,
+                self.exact_index.postings,
+                n_neighbors=RECOMMENDATION_NEIGHBORS,
+                workers=RECOMMENDATION_NEIGHBOR_WORKERS or None
+            )
+            
         except Exception as e:
             print(f"Error preparing recommendation system: {e}")
             raise
     
-    def find_similar_products(self, input_ingredients: List[str], 
-                                top_k: int = 10) -> List[Dict]:
+    def canonicalize_ingredients(self, input_ingredients: List[str]) -> Tuple[str, ...]:
+        """Normalize input ingredients to a sorted, duplicate-free tuple of canonical INCI names"""
+        canonical = {
+            token
+            for ing in input_ingredients
+            for token in tokenize_ingredients(self.clean_ingredients_text(ing))
+        }
+        return tuple(sorted(canonical))
+    
+    def build_query_text(self, input_ingredients: List[str]) -> str:
         """
-        Find products with similar ingredients
+        Convert a list of input ingredients to the text fed to the vectorizer
+        
+        The text is built from the canonical ingredient set, so the scores only
+        depend on which ingredients are present (which is what the result cache keys on).
+        """
+        return ', '.join(self.canonicalize_ingredients(input_ingredients))
+    
+    def get_cache_key(self, canonical_ingredients: Tuple[str, ...], skin_type: str, top_k: int) -> tuple:
+        """Build the result cache key for a query against the current index"""
+        return (self.fingerprint, canonical_ingredients, getattr(skin_type, 'value', skin_type), top_k)
+    
+    def score_products(self, input_ingredients: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score the products sharing at least one term with the input ingredients
         
         Args:
             input_ingredients: List of ingredients from scanned product
-            skin_type: User's skin type to filter recommendations
+            
+        Returns:
+            Tuple of (product row indices, similarity scores) above the similarity threshold
+        """
+        input_text = self.build_query_text(input_ingredients)
+        
+        if not input_text:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        
+        # Transform input ingredients using fitted TF-IDF vectorizer
+        input_vector = self.tfidf_vectorizer.transform([input_text])
+        
+        # Score only the products sharing at least one term with the input
+        # (or, in "lsa" mode, every product with one matrix-vector product)
+        candidates, similarity_scores = self.search_index.score(input_vector)
+        
+        # Skip if similarity is too low (lowered threshold for small dataset)
+        relevant = similarity_scores >= MIN_SIMILARITY_SCORE
+        return candidates[relevant], similarity_scores[relevant]
+    
+    def select_recommendations(self, candidates: np.ndarray, similarity_scores: np.ndarray,
+                               top_k: int, exclude_names: Optional[set] = None) -> List[Dict]:
+        """
+        Select the top_k scored candidates as unique product recommendations
+        
+        Args:
+            candidates: Product row indices
+            similarity_scores: Similarity score of each candidate
             top_k: Number of recommendations to return
+            exclude_names: Optional product names to leave out
             
         Returns:
             List of recommended products with similarity scores
         """
-        try:
-            # Convert input ingredients to text
-            input_text = ' '.join([self.clean_ingredients_text(ing) for ing in input_ingredients])
-            
-            if not input_text.strip():
-                return []
-            
-            # Transform input ingredients using fitted TF-IDF vectorizer
-            input_vector = self.tfidf_vectorizer.transform([input_text])
-            
-            # Calculate cosine similarity
-            similarity_scores = cosine_similarity(input_vector, self.tfidf_matrix).flatten()
-            
-            # Get top similar products
-            similar_indices = similarity_scores.argsort()[::-1][:top_k * 3]  # Get more to filter for duplicates
-            
-            recommendations = []
-            seen_products = set()  # Track unique products to avoid duplicates
+        recommendations = []
+        seen_products = set(exclude_names or ())  # Track unique products to avoid duplicates
+        
+        # Partially select the best candidates, widening the selection only
+        # when duplicate product names leave fewer than top_k results
+        selected = 0
+        select_count = top_k
+        while len(recommendations) < top_k and selected < len(candidates):
+            order = select_top_k(similarity_scores, select_count)
             
-            for idx in similar_indices:
+            for position in order[selected:]:
                 if len(recommendations) >= top_k:
                     break
-                    
-                product = self.df.iloc[idx]
-                similarity_score = similarity_scores[idx]
                 
-                # Skip if similarity is too low (lowered threshold for small dataset)
-                if similarity_score < 0.05:
-                    continue
+                row = candidates[position]
+                similarity_score = similarity_scores[position]
                 
                 # Extract product name for duplicate checking
-                product_name = str(product['title']) if 'title' in product and pd.notna(product['title']) else 'Unknown'
+                product_name = self.products.get(row, 'title')
                 
                 # Skip if we've already seen this product (avoid duplicates)
                 if product_name in seen_products:
@@ -144,67 +490,48 @@ class SkinCareRecommendationSystem:
                 # Add to seen products set
                 seen_products.add(product_name)
                 
-                # Extract product information - safely access pandas Series
+                # Extract product information
                 recommendation = {
+                    'product_id': self.products.get_product_id(row),
                     'product_name': product_name,
-                    'product_image': str(product['image_url']) if 'image_url' in product and pd.notna(product['image_url']) else 'Unknown',
+                    'product_image': self.products.get(row, 'image_url'),
                     'similarity_score': float(similarity_score),
-                    'price': str(product['price']) if 'price' in product and pd.notna(product['price']) else 'Unknown',
-                    'product_link': str(product['link']) if 'link' in product and pd.notna(product['link']) else 'Unknown',
+                    'price': self.products.get(row, 'price'),
+                    'product_link': self.products.get(row, 'link'),
                 }
                 
                 recommendations.append(recommendation)
             
-            return recommendations
-            
-        except Exception as e:
-            print(f"Error finding similar products: {e}")
-            return []
+            selected = len(order)
+            select_count *= 2
+        
+        return recommendations
     
-    def filter_safe_products(self, recommendations: List[Dict], 
-                            skin_type: str) -> List[Dict]:
+    def find_similar_products(self, input_ingredients: List[str], 
+                                top_k: int = 10,
+                                skin_type: str = None) -> List[Dict]:
         """
-        Filter out products that contain harmful ingredients for the skin type
+        Find products with similar ingredients
         
         Args:
-            recommendations: List of product recommendations
-            skin_type: User's skin type
+            input_ingredients: List of ingredients from scanned product
+            top_k: Number of recommendations to return
+            skin_type: Optional skin type; products unsafe for it are skipped
             
         Returns:
-            Filtered list of safe recommendations (no duplicates)
+            List of recommended products with similarity scores
         """
-        from helper.functions import get_ingredients_to_avoid
-        
-        safe_recommendations = []
-        seen_products = set()  # Track unique products to avoid duplicates
-        
-        # Get ingredients to avoid based on skin type
-        avoid_list = get_ingredients_to_avoid(skin_type)
-        
-        for product in recommendations:
-            product_name = product.get('product_name', 'Unknown')
-            
-            # Skip if we've already seen this product (avoid duplicates)
-            if product_name in seen_products:
-                continue
-            
-            product_ingredients = str(product.get('ingredients', ''))
+        try:
+            candidates, similarity_scores = self.score_products(input_ingredients)
             
-            # Find harmful ingredients in this product's ingredients
-            harmful_ingredients = find_harmful_ingredients_with_details(product_ingredients, avoid_list, skin_type)
+            if skin_type is not None:
+                candidates, similarity_scores = self.filter_safe_candidates(candidates, similarity_scores, skin_type)
             
-            # Check if product is safe (no harmful ingredients found)
-            is_safe = len(harmful_ingredients) == 0
+            return self.select_recommendations(candidates, similarity_scores, top_k)
             
-            if is_safe:
-                seen_products.add(product_name)  # Add to seen products
-                safe_recommendations.append(product)
-            else:
-                # Add information about why product was filtered out (but don't add to safe list)
-                harmful_names = [item['ingredient'] for item in harmful_ingredients if isinstance(item, dict) and 'ingredient' in item]
-                product['filtered_reason'] = f"Contains harmful ingredients: {', '.join(harmful_names)}"
-        
-        return safe_recommendations
+        except Exception as e:
+            print(f"Error finding similar products: {e}")
+            return []
     
     def get_ingredient_based_recommendations(self, 
                                             input_ingredients: List[str],
@@ -213,38 +540,31 @@ class SkinCareRecommendationSystem:
         """
         Get ingredient-based recommendations for safe products
         
+        Unsafe products are removed with the precomputed safety mask before the
+        top-k selection, so the returned products are the exact top_k safe ones.
+        
         Args:
             input_ingredients: ingredients from scanned product
             skin_type: User's skin type
-            harmful_ingredients: List of harmful ingredients to avoid (can be strings or dicts)
             top_k: Number of recommendations to return
             
         Returns:
             Dictionary containing recommendations and metadata
         """
         try:
-            # Find similar products
-            similar_products = self.find_similar_products(
-                input_ingredients, 
-                top_k * 3 
-            )
+            # Serve repeated scans of the same ingredient set from the cache
+            canonical_ingredients = self.canonicalize_ingredients(input_ingredients)
+            cache_key = self.get_cache_key(canonical_ingredients, skin_type, top_k)
+            cached = recommendation_cache.get(cache_key)
+            if cached is not None:
+                return cached
             
-            # Filter out unsafe products if harmful ingredients provided
-            safe_products = self.filter_safe_products(
-                similar_products, 
-                skin_type
-            )
+            # Score similar products
+            candidates, similarity_scores = self.score_products(list(canonical_ingredients))
             
-            # Take top K safe products (use filtered safe products, not original similar_products)
-            final_recommendations = safe_products[:top_k]
-            
-            return {
-                'recommendations': final_recommendations,
-                'total_found': len(similar_products),
-                'total_safe': len(safe_products),
-                'skin_type': skin_type,
-                'recommendation_count': len(final_recommendations)
-            }
+            result = self.recommend_safe_products(candidates, similarity_scores, skin_type, top_k)
+            recommendation_cache.set(cache_key, result)
+            return result
             
         except Exception as e:
             print(f"Error getting recommendations: {e}")
@@ -254,104 +574,255 @@ class SkinCareRecommendationSystem:
                 'error': str(e)
             }
     
-    def get_skin_type_recommendations(self, skin_type: str, top_k: int = 5) -> Dict:
+    def get_recommendations_for_skin_types(self,
+                                           input_ingredients: List[str],
+                                           skin_types: List[str],
+                                           top_k: int = 5) -> Dict[str, Dict]:
         """
-        Get product recommendations based on skin type by searching descriptions
+        Get ingredient-based recommendations for several skin types at once
+        
+        The ingredients are scored once; each skin type only applies its own
+        safety bit to the shared candidates.
+        
+        Args:
+            input_ingredients: ingredients from scanned product
+            skin_types: Skin types to recommend for
+            top_k: Number of recommendations to return per skin type
+            
+        Returns:
+            Dictionary of skin type -> recommendations and metadata
+        """
+        try:
+            canonical_ingredients = self.canonicalize_ingredients(input_ingredients)
+            cache_keys = {
+                skin_type: self.get_cache_key(canonical_ingredients, skin_type, top_k)
+                for skin_type in skin_types
+            }
+            results = {skin_type: recommendation_cache.get(key) for skin_type, key in cache_keys.items()}
+            
+            uncached = [skin_type for skin_type, result in results.items() if result is None]
+            if uncached:
+                candidates, similarity_scores = self.score_products(list(canonical_ingredients))
+                for skin_type in uncached:
+                    results[skin_type] = self.recommend_safe_products(candidates, similarity_scores, skin_type, top_k)
+                    recommendation_cache.set(cache_keys[skin_type], results[skin_type])
+            
+            return results
+            
+        except Exception as e:
+            print(f"Error getting recommendations for skin types: {e}")
+            return {
+                skin_type: {
+                    'recommendations': [],
+                    'recommendation_count': 0,
+                    'error': str(e)
+                }
+                for skin_type in skin_types
+            }
+    
+    def recommend_safe_products(self, candidates: np.ndarray, similarity_scores: np.ndarray,
+                                skin_type: str, top_k: int) -> Dict:
+        """
+        Build the recommendation result for scored candidates of one query
+        
+        Args:
+            candidates: Product row indices above the similarity threshold
+            similarity_scores: Similarity score of each candidate
+            skin_type: User's skin type
+            top_k: Number of recommendations to return
+            
+        Returns:
+            Dictionary containing recommendations and metadata
+        """
+        total_found = len(candidates)
+        
+        # Filter out products unsafe for the skin type before ranking
+        candidates, similarity_scores = self.filter_safe_candidates(candidates, similarity_scores, skin_type)
+        
+        final_recommendations = self.select_recommendations(candidates, similarity_scores, top_k)
+        
+        return self.build_recommendation_result(final_recommendations, total_found, len(candidates), skin_type)
+    
+    def build_recommendation_result(self, recommendations: List[Dict], total_found: int,
+                                    total_safe: int, skin_type: str) -> Dict:
+        """Wrap selected recommendations with their metadata"""
+        return {
+            'recommendations': recommendations,
+            'total_found': int(total_found),
+            'total_safe': int(total_safe),
+            'skin_type': skin_type,
+            'recommendation_count': len(recommendations)
+        }
+    
+    def get_batch_ingredient_based_recommendations(self, items: List[Dict], top_k: int = 5) -> List[Dict]:
+        """
+        Get ingredient-based recommendations for many scanned products at once
+        
+        Ingredient lists are vectorized together and scored against the
+        catalog with one batched product per skin type. The index keeps only
+        the best safe candidates of each item, so memory does not grow with
+        items x catalog size; an item whose shortlist is used up by duplicate
+        product names is rescored in full.
+        
+        Args:
+            items: List of {'ingredients': List[str], 'skin_type': str}
+            top_k: Number of recommendations to return per item
+            
+        Returns:
+            List of recommendation dictionaries, in the same order as items
+        """
+        try:
+            cache_keys = [
+                self.get_cache_key(
+                    self.canonicalize_ingredients(item.get('ingredients', [])),
+                    item.get('skin_type'),
+                    top_k
+                )
+                for item in items
+            ]
+            cached_results = [recommendation_cache.get(key) for key in cache_keys]
+            query_texts = [', '.join(key[1]) for key in cache_keys]
+            
+            # Only score uncached items that have ingredients left after cleaning
+            results = list(cached_results)
+            pending = {}
+            for i, text in enumerate(query_texts):
+                if results[i] is not None:
+                    continue
+                if not text:
+                    results[i] = self.build_recommendation_result([], 0, 0, items[i].get('skin_type'))
+                    recommendation_cache.set(cache_keys[i], results[i])
+                    continue
+                pending.setdefault(items[i].get('skin_type'), []).append(i)
+            
+            candidate_count = max(top_k, RECOMMENDATION_BATCH_CANDIDATES)
+            for skin_type, item_indexes in pending.items():
+                query_matrix = self.tfidf_vectorizer.transform([query_texts[i] for i in item_indexes])
+                similarity, total_found, total_safe = self.search_index.score_batch(
+                    query_matrix, candidate_count, MIN_SIMILARITY_SCORE, self.get_safe_mask(skin_type)
+                )
+                
+                for row, item_index in enumerate(item_indexes):
+                    start, end = similarity.indptr[row], similarity.indptr[row + 1]
+                    candidates = similarity.indices[start:end].astype(np.int64)
+                    recommendations = self.select_recommendations(candidates, similarity.data[start:end], top_k)
+                    
+                    if len(recommendations) < top_k and total_safe[row] > len(candidates):
+                        # Duplicate names used up the shortlist; fall back to scoring this item in full
+                        candidates, similarity_scores = self.score_products(list(cache_keys[item_index][1]))
+                        result = self.recommend_safe_products(candidates, similarity_scores, skin_type, top_k)
+                    else:
+                        result = self.build_recommendation_result(
+                            recommendations, total_found[row], total_safe[row], skin_type
+                        )
+                    
+                    recommendation_cache.set(cache_keys[item_index], result)
+                    results[item_index] = result
+            
+            return results
+            
+        except Exception as e:
+            print(f"Error getting batch recommendations: {e}")
+            return [
+                {
+                    'recommendations': [],
+                    'recommendation_count': 0,
+                    'skin_type': item.get('skin_type'),
+                    'error': str(e)
+                }
+                for item in items
+            ]
+    
+    def compute_skin_type_rankings(self, descriptions: pd.Series) -> Dict[str, np.ndarray]:
+        """
+        Rank the products whose description matches each skin type
+        
+        Matching runs once per skin type with vectorized string operations.
+        Products are ranked by match strength (explicit skin type mention, then
+        skin type keywords, then "all skin types"), keeping table order for ties,
+        and only the first product of each name is kept.
+        
+        Args:
+            descriptions: Product descriptions aligned with self.df
+            
+        Returns:
+            Dictionary of skin type -> ranked product row indices
+        """
+        descriptions = descriptions.fillna('').astype(str).str.lower()
+        product_names = self.df['title'].astype(str) if 'title' in self.df.columns else pd.Series('', index=self.df.index)
+        
+        universal_match = descriptions.str.contains(UNIVERSAL_SKIN_TYPE_PATTERN, flags=re.IGNORECASE, regex=True)
+        
+        rankings = {}
+        for skin_type in SKIN_TYPES:
+            specific_pattern = rf'\b(?:untuk\s+kulit\s+{skin_type}|{skin_type}\s+skin|kulit\s+{skin_type})\b'
+            specific_match = descriptions.str.contains(specific_pattern, flags=re.IGNORECASE, regex=True)
+            keyword_match = descriptions.str.contains(SKIN_TYPE_KEYWORD_PATTERNS[skin_type], flags=re.IGNORECASE, regex=True)
+            
+            match_score = (
+                4 * specific_match.to_numpy(dtype=np.int8)
+                + 2 * keyword_match.to_numpy(dtype=np.int8)
+                + universal_match.to_numpy(dtype=np.int8)
+            )
+            
+            matching = np.flatnonzero(match_score > 0)
+            ranked = matching[np.argsort(-match_score[matching], kind='stable')]
+            
+            # Skip duplicates, keeping the best ranked product of each name
+            unique = ~product_names.iloc[ranked].duplicated().to_numpy()
+            rankings[skin_type] = ranked[unique].astype(np.int32)
+        
+        return rankings
+    
+    def get_skin_type_recommendations(self, skin_type: str, top_k: int = 5, cursor: int = 0) -> Dict:
+        """
+        Get product recommendations based on skin type from the precomputed
+        description match rankings
         
         Args:
             skin_type: User's skin type (oily, dry, normal, acne, sensitive)
             top_k: Number of recommendations to return
+            cursor: Position in the ranking to start from (next_cursor of the previous page)
             
         Returns:
             Dictionary containing recommendations
         """
         try:
-            import re
-            
-            # Create regex patterns for skin type matching
-            skin_type_patterns = [
-                # Universal patterns - products for all skin types
-                r'\b(semua\s+jenis\s+kulit|all\s+skin\s+types?|segala\s+jenis\s+kulit|untuk\s+semua\s+kulit)\b',
-                # Specific skin type patterns
-                rf'\b(untuk\s+kulit\s+{skin_type}|{skin_type}\s+skin|kulit\s+{skin_type})\b'
-            ]
+            ranking = self.skin_type_rankings.get(skin_type)
             
-            # Additional specific patterns based on skin type
-            if skin_type == "oily":
-                skin_type_patterns.extend([
-                    r'\b(berminyak|oily|excess\s+oil|kontrol\s+minyak|oil\s+control)\b'
-                ])
-            elif skin_type == "dry":
-                skin_type_patterns.extend([
-                    r'\b(kering|dry|dehidrasi|dehydrat|moisturiz|pelembab)\b'
-                ])
-            elif skin_type == "sensitive":
-                skin_type_patterns.extend([
-                    r'\b(sensitif|sensitive|gentle|lembut|hypoallergenic)\b'
-                ])
-            elif skin_type == "acne":
-                skin_type_patterns.extend([
-                    r'\b(jerawat|acne|breakout|blemish|anti\s+acne)\b'
-                ])
-            elif skin_type == "normal":
-                skin_type_patterns.extend([
-                    r'\b(normal|seimbang|balanced)\b'
-                ])
-            
-            # Combine all patterns
-            combined_pattern = '|'.join(skin_type_patterns)
-            
-            # Check if description column exists
-            if 'description' not in self.df.columns:
+            if ranking is None:
                 return {
                     'recommendations': [],
                     'total_found': 0,
                     'skin_type': skin_type,
                     'recommendation_count': 0,
-                    'error': 'Description column not found in database'
+                    'next_cursor': None,
+                    'error': f"Unsupported skin type '{skin_type}'"
                 }
             
-            # Filter products based on description matching
+            cursor = max(0, cursor)
+            page = ranking[cursor:cursor + top_k]
+            
             matching_products = []
-            seen_products = set()
+            for idx in page:
+                # Create product recommendation
+                matching_products.append({
+                    'product_id': self.products.get_product_id(idx),
+                    'product_name': self.products.get(idx, 'title'),
+                    'product_image': self.products.get(idx, 'image_url'),
+                    'product_link': self.products.get(idx, 'link'),
+                    'price': self.products.get(idx, 'price'),
+                    'match_reason': f'Suitable for {skin_type} skin type'
+                })
             
-            for idx, row in self.df.iterrows():
-                description = str(row.get('description', '')).lower()
-                
-                # Skip if no description
-                if not description or description == 'nan':
-                    continue
-                
-                # Check if description matches any pattern
-                if re.search(combined_pattern, description, re.IGNORECASE):
-                    product_name = str(row.get('title', 'Unknown'))
-                    
-                    # Skip duplicates
-                    if product_name in seen_products:
-                        continue
-                    
-                    seen_products.add(product_name)
-                    
-                    # Create product recommendation
-                    product_rec = {
-                        'product_name': product_name,
-                        'product_image': str(row.get('image_url', 'Unknown')),
-                        'product_link': str(row.get('link', 'Unknown')),
-                        'price': str(row.get('price', 'Unknown')),
-                        'match_reason': f'Suitable for {skin_type} skin type'
-                    }
-                    
-                    matching_products.append(product_rec)
-                    
-                    # Stop if we have enough products
-                    if len(matching_products) >= top_k:
-                        break
+            next_cursor = cursor + len(page)
             
             return {
                 'recommendations': matching_products,
-                'total_found': len(matching_products),
+                'total_found': len(ranking),
                 'skin_type': skin_type,
-                'recommendation_count': len(matching_products)
+                'recommendation_count': len(matching_products),
+                'next_cursor': next_cursor if next_cursor < len(ranking) else None
             }
             
         except Exception as e:
@@ -361,18 +832,111 @@ class SkinCareRecommendationSystem:
                 'total_found': 0,
                 'skin_type': skin_type,
                 'recommendation_count': 0,
+                'next_cursor': None,
                 'error': str(e)
             }
 
+    def find_product_row(self, product_id: Optional[int] = None, product_link: Optional[str] = None) -> Optional[int]:
+        """
+        Find a catalog product by its product id or its link
+        
+        Args:
+            product_id: Product id as returned in recommendations
+            product_link: Product link
+            
+        Returns:
+            Product row index, or None if no such product exists
+        """
+        if product_id is not None:
+            return self.products.find_product_id(product_id)
+        if product_link:
+            return self.products.find_link(product_link)
+        return None
+    
+    def get_similar_catalog_products(self, product_id: Optional[int] = None,
+                                     product_link: Optional[str] = None,
+                                     skin_type: Optional[str] = None,
+                                     top_k: int = 10) -> Dict:
+        """
+        Get the catalog products most similar to a catalog product
+        
+        Reads the product's precomputed neighbor list, so no similarity has to
+        be computed at request time.
+        
+        Args:
+            product_id: Product id as returned in recommendations
+            product_link: Product link (used when product_id is not given)
+            skin_type: Optional skin type; neighbors unsafe for it are skipped
+            top_k: Number of recommendations to return
+            
+        Returns:
+            Dictionary containing the source product, recommendations and metadata
+        """
+        row = self.find_product_row(product_id, product_link)
+        if row is None:
+            return {
+                'source_product': None,
+                'recommendations': [],
+                'total_found': 0,
+                'total_safe': 0,
+                'skin_type': skin_type,
+                'recommendation_count': 0,
+                'error': 'Product not found'
+            }
+        
+        candidates = np.asarray(self.neighbor_rows[row])
+        similarity_scores = np.asarray(self.neighbor_scores[row], dtype=np.float64)
+        
+        # Neighbor lists are padded with -1 and sorted by descending similarity
+        keep = (candidates >= 0) & (similarity_scores >= MIN_SIMILARITY_SCORE)
+        candidates, similarity_scores = candidates[keep], similarity_scores[keep]
+        total_found = len(candidates)
+        
+        if skin_type is not None:
+            candidates, similarity_scores = self.filter_safe_candidates(candidates, similarity_scores, skin_type)
+        
+        source_name = self.products.get(row, 'title')
+        recommendations = self.select_recommendations(
+            candidates, similarity_scores, top_k,
+            exclude_names={source_name}  # Other listings of the same product
+        )
+        
+        return {
+            'source_product': {
+                'product_id': self.products.get_product_id(row),
+                'product_name': source_name,
+                'product_image': self.products.get(row, 'image_url'),
+                'product_link': self.products.get(row, 'link'),
+                'price': self.products.get(row, 'price'),
+            },
+            'recommendations': recommendations,
+            'total_found': total_found,
+            'total_safe': len(candidates),
+            'skin_type': skin_type,
+            'recommendation_count': len(recommendations)
+        }
+
 # Initialize global recommendation system with better error handling
 recommendation_system = None
 
+# Bounded cache of ingredient-based recommendation results, keyed by index
+# fingerprint, canonical ingredient set, skin type and top_k
+recommendation_cache = LRUCache(
+    max_entries=int(os.getenv("RECOMMENDATION_CACHE_MAX_ENTRIES", "2048")),
+    max_bytes=int(os.getenv("RECOMMENDATION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+)
+
+# Serializes index reloads so at most one rebuild runs at a time
+reload_lock = threading.Lock()
+
 def initialize_recommendation_system():
     """Initialize recommendation system with error handling"""
     global recommendation_system
     
     try:
         recommendation_system = SkinCareRecommendationSystem()
+        # Results computed against a previous index are no longer valid
+        recommendation_cache.clear()
         print("Recommendation system initialized successfully")
         return True
     except Exception as e:
@@ -380,8 +944,119 @@ def initialize_recommendation_system():
         recommendation_system = None
         return False
 
-# Try to initialize
-initialize_recommendation_system()
+def get_recommendation_system():
+    """
+    Get the current recommendation system, initializing it on first use
+    
+    Nothing is built at import time, so importing this module (e.g. from the
+    offline benchmark) does not touch the database. Callers keep the returned
+    instance for the whole request, so a request that is in flight while a
+    reload swaps in a new index finishes on the old one.
+    """
+    system = recommendation_system
+    if system is None:
+        # Concurrent first requests wait for one initialization instead of each building the index
+        with reload_lock:
+            system = recommendation_system
+            if system is None and initialize_recommendation_system():
+                system = recommendation_system
+    return system
+
+def reload_recommendation_system(rebuild: bool = False) -> bool:
+    """
+    Build a new recommendation index and atomically swap it in
+    
+    The current index keeps serving requests while the new one is built; if the
+    build fails the current index stays in place.
+    
+    Args:
+        rebuild: Refit the index even if an artifact for the table exists
+        
+    Returns:
+        True if a new index was swapped in
+    """
+    global recommendation_system
+    
+    with reload_lock:
+        try:
+            new_system = SkinCareRecommendationSystem(rebuild=rebuild)
+        except Exception as e:
+            print(f"Failed to reload recommendation system: {e}")
+            return False
+        
+        # A single reference assignment, so requests see either the old or the new index
+        recommendation_system = new_system
+        recommendation_cache.clear()
+        print(f"Recommendation system reloaded with {len(new_system.products)} products")
+        return True
+
+class RecommendationIndexReloader:
+    """
+    Background thread that polls the products table for changes and reloads
+    the recommendation index when its content fingerprint changes
+    """
+    
+    def __init__(self, interval: int = RECOMMENDATION_RELOAD_INTERVAL, table_name: str = "products"):
+        """
+        Args:
+            interval: Seconds between checks of the products table
+            table_name: Name of the database table containing skincare products
+        """
+        self.interval = interval
+        self.table_name = table_name
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def check_for_changes(self) -> bool:
+        """
+        Reload the index if the products table changed since it was built
+        
+        Returns:
+            True if a new index was swapped in
+        """
+        fingerprint, _ = get_table_fingerprint(self.table_name)
+        
+        system = recommendation_system
+        if system is not None and system.fingerprint == fingerprint:
+            return False
+        
+        print(f"Products table '{self.table_name}' changed, reloading recommendation index")
+        return reload_recommendation_system()
+    
+    def run(self):
+        """Poll until stopped"""
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.check_for_changes()
+            except Exception as e:
+                print(f"Error checking recommendation index for changes: {e}")
+    
+    def start(self):
+        """Start polling in a daemon thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name="recommendation-index-reloader", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop polling"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+recommendation_reloader = RecommendationIndexReloader()
+
+def start_recommendation_reloader():
+    """Start background hot-reload of the recommendation index (disabled when the interval is 0)"""
+    if recommendation_reloader.interval > 0:
+        recommendation_reloader.start()
+
+def stop_recommendation_reloader():
+    """Stop background hot-reload of the recommendation index"""
+    recommendation_reloader.stop()
 
 def get_skincare_recommendations(input_ingredients: List[str], 
                                 skin_type: str,
@@ -398,22 +1073,20 @@ def get_skincare_recommendations(input_ingredients: List[str],
     Returns:
         Dictionary containing recommendations
     """
-    global recommendation_system
-    
     # Try to initialize if not already done
-    if recommendation_system is None:
-        if not initialize_recommendation_system():
-            return {
-                'recommendations': [],
-                'total_found': 0,
-                'total_safe': 0,
-                'skin_type': skin_type,
-                'recommendation_count': 0,
-                'error': 'Recommendation system could not be initialized'
-            }
+    system = get_recommendation_system()
+    if system is None:
+        return {
+            'recommendations': [],
+            'total_found': 0,
+            'total_safe': 0,
+            'skin_type': skin_type,
+            'recommendation_count': 0,
+            'error': 'Recommendation system could not be initialized'
+        }
     
     try:
-        return recommendation_system.get_ingredient_based_recommendations(
+        return system.get_ingredient_based_recommendations(
             input_ingredients,
             skin_type,
             top_k
@@ -430,42 +1103,196 @@ def get_skincare_recommendations(input_ingredients: List[str],
             'error': str(e)
         }
 
-def get_skin_type_recommendations(skin_type: str, top_k: int = 5) -> Dict:
+def get_skincare_recommendations_for_skin_types(input_ingredients: List[str],
+                                                skin_types: List[str],
+                                                top_k: int = 5) -> Dict[str, Dict]:
+    """
+    Wrapper function to get skincare recommendations for several skin types at once
+    
+    Args:
+        input_ingredients: List of ingredients from scanned product
+        skin_types: Skin types to recommend for
+        top_k: Number of recommendations to return per skin type
+        
+    Returns:
+        Dictionary of skin type -> recommendations
+    """
+    # Try to initialize if not already done
+    system = get_recommendation_system()
+    if system is None:
+        return {
+            skin_type: {
+                'recommendations': [],
+                'total_found': 0,
+                'total_safe': 0,
+                'skin_type': skin_type,
+                'recommendation_count': 0,
+                'error': 'Recommendation system could not be initialized'
+            }
+            for skin_type in skin_types
+        }
+    
+    try:
+        return system.get_recommendations_for_skin_types(
+            input_ingredients,
+            skin_types,
+            top_k
+        )
+        
+    except Exception as e:
+        print(f"Error in get_skincare_recommendations_for_skin_types: {e}")
+        return {
+            skin_type: {
+                'recommendations': [],
+                'total_found': 0,
+                'total_safe': 0,
+                'skin_type': skin_type,
+                'recommendation_count': 0,
+                'error': str(e)
+            }
+            for skin_type in skin_types
+        }
+
+def get_skin_type_recommendations(skin_type: str, top_k: int = 5, cursor: int = 0) -> Dict:
     """
     Wrapper function to get skincare recommendations based on skin type
     
     Args:
         skin_type: User's skin type
         top_k: Number of recommendations to return
+        cursor: Position in the ranking to start from
         
     Returns:
         Dictionary containing recommendations
     """
-    global recommendation_system
+    # Try to initialize if not already done
+    system = get_recommendation_system()
+    if system is None:
+        return {
+            'recommendations': [],
+            'total_found': 0,
+            'skin_type': skin_type,
+            'recommendation_count': 0,
+            'error': 'Recommendation system could not be initialized'
+        }
+    
+    try:
+        return system.get_skin_type_recommendations(
+            skin_type,
+            top_k,
+            cursor
+        )
+        
+    except Exception as e:
+        print(f"Error in get_skin_type_recommendations: {e}")
+        return {
+            'recommendations': [],
+            'total_found': 0,
+            'skin_type': skin_type,
+            'recommendation_count': 0,
+            'error': str(e)
+        }
+
+def get_batch_skincare_recommendations(items: List[Dict], top_k: int = 5) -> List[Dict]:
+    """
+    Wrapper function to get skincare recommendations for many products at once
     
+    Args:
+        items: List of {'ingredients': List[str], 'skin_type': str}
+        top_k: Number of recommendations to return per item
+        
+    Returns:
+        List of dictionaries containing recommendations, in request order
+    """
     # Try to initialize if not already done
-    if recommendation_system is None:
-        if not initialize_recommendation_system():
-            return {
+    system = get_recommendation_system()
+    if system is None:
+        return [
+            {
                 'recommendations': [],
                 'total_found': 0,
-                'skin_type': skin_type,
+                'total_safe': 0,
+                'skin_type': item.get('skin_type'),
                 'recommendation_count': 0,
                 'error': 'Recommendation system could not be initialized'
             }
+            for item in items
+        ]
     
     try:
-        return recommendation_system.get_skin_type_recommendations(
+        return system.get_batch_ingredient_based_recommendations(
+            items,
+            top_k
+        )
+        
+    except Exception as e:
+        print(f"Error in get_batch_skincare_recommendations: {e}")
+        return [
+            {
+                'recommendations': [],
+                'total_found': 0,
+                'total_safe': 0,
+                'skin_type': item.get('skin_type'),
+                'recommendation_count': 0,
+                'error': str(e)
+            }
+            for item in items
+        ]
+
+def get_similar_catalog_products(product_id: Optional[int] = None,
+                                 product_link: Optional[str] = None,
+                                 skin_type: Optional[str] = None,
+                                 top_k: int = 10) -> Dict:
+    """
+    Wrapper function to get the catalog products most similar to a catalog product
+    
+    Args:
+        product_id: Product id as returned in recommendations
+        product_link: Product link (used when product_id is not given)
+        skin_type: Optional skin type; products unsafe for it are skipped
+        top_k: Number of recommendations to return
+        
+    Returns:
+        Dictionary containing the source product and recommendations
+    """
+    # Try to initialize if not already done
+    system = get_recommendation_system()
+    if system is None:
+        return {
+            'source_product': None,
+            'recommendations': [],
+            'total_found': 0,
+            'total_safe': 0,
+            'skin_type': skin_type,
+            'recommendation_count': 0,
+            'error': 'Recommendation system could not be initialized'
+        }
+    
+    try:
+        return system.get_similar_catalog_products(
+            product_id,
+            product_link,
             skin_type,
             top_k
         )
         
     except Exception as e:
-        print(f"Error in get_skin_type_recommendations: {e}")
+        print(f"Error in get_similar_catalog_products: {e}")
         return {
+            'source_product': None,
             'recommendations': [],
             'total_found': 0,
+            'total_safe': 0,
             'skin_type': skin_type,
             'recommendation_count': 0,
             'error': str(e)
-        }
\ No newline at end of file
+        }
+
+def get_recommendation_cache_stats() -> Dict:
+    """
+    Get hit/miss counters and usage of the recommendation result cache
+    
+    Returns:
+        Dictionary containing cache statistics
+    """
+    return recommendation_cache.stats()
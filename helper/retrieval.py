@@ -0,0 +1,470 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.sparse import csr_matrix
+from typing import Optional, Tuple
+
+# Matrices shared with neighbor table worker processes (set by _init_neighbor_worker)
+_neighbor_matrix = None
+_neighbor_postings = None
+
+
+def select_top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Select positions of the top_k highest scores, ordered best first
+
+    Uses a partial selection (argpartition) so only the selected slice is sorted.
+    Ties are broken by position, so the selection does not depend on how the
+    partition happens to order equal scores.
+
+    Args:
+        scores: 1-D array of scores
+        top_k: Number of positions to select
+
+    Returns:
+        Array of positions into scores, sorted by descending score
+    """
+    if top_k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    if top_k < len(scores):
+        threshold = scores[np.argpartition(-scores, top_k - 1)[top_k - 1]]
+        above = np.flatnonzero(scores > threshold)
+        # Of the scores equal to the cut-off, keep the first positions
+        ties = np.flatnonzero(scores == threshold)[:top_k - len(above)]
+        selected = np.sort(np.concatenate([above, ties]))
+    else:
+        selected = np.arange(len(scores))
+
+    return selected[np.argsort(-scores[selected], kind='stable')]
+
+
+def select_top_k_rows(similarity: csr_matrix, top_k: Optional[int]) -> csr_matrix:
+    """
+    Keep only the top_k highest scores of each row of a sparse score matrix
+
+    Args:
+        similarity: (queries x products) CSR matrix of scores
+        top_k: Scores kept per row (None keeps every score)
+
+    Returns:
+        CSR matrix with at most top_k scores per row and sorted indices
+    """
+    row_counts = np.diff(similarity.indptr)
+    if top_k is None or len(row_counts) == 0 or row_counts.max() <= top_k:
+        return similarity
+
+    rows = []
+    for row in range(similarity.shape[0]):
+        start, end = similarity.indptr[row], similarity.indptr[row + 1]
+        candidates, scores = similarity.indices[start:end], similarity.data[start:end]
+        order = np.sort(select_top_k(scores, top_k))
+        rows.append((candidates[order], scores[order]))
+
+    indptr = np.concatenate([[0], np.cumsum([len(candidates) for candidates, _ in rows])])
+    indices = np.concatenate([candidates for candidates, _ in rows])
+    data = np.concatenate([scores for _, scores in rows])
+    return csr_matrix((data, indices, indptr), shape=similarity.shape)
+
+
+class InvertedIndex:
+    """
+    Term -> posting list index built from a fitted TF-IDF matrix
+
+    Rows of the TF-IDF matrix are L2-normalized by the vectorizer, so the dot
+    product between a query vector and a product row is their cosine similarity.
+    Scoring only walks the posting lists of the query's terms, so the cost of a
+    query scales with the number of postings it touches, not with catalog size.
+    """
+
+    def __init__(self, tfidf_matrix: csr_matrix):
+        """
+        Build posting lists from a (products x terms) TF-IDF matrix
+
+        Args:
+            tfidf_matrix: Fitted TF-IDF matrix, one row per product
+        """
+        # Transposing a CSR matrix gives (terms x products); in CSR form each
+        # row is then the posting list of one term
+        postings = csr_matrix(tfidf_matrix).T.tocsr()
+        postings.sort_indices()
+        self.set_postings(postings)
+
+    @classmethod
+    def from_postings(cls, postings: csr_matrix) -> 'InvertedIndex':
+        """
+        Wrap already built posting lists, e.g. memory-mapped from an index artifact
+
+        Args:
+            postings: (terms x products) CSR matrix with sorted indices
+        """
+        index = cls.__new__(cls)
+        index.set_postings(postings)
+        return index
+
+    def set_postings(self, postings: csr_matrix):
+        """Use a (terms x products) CSR matrix as the posting lists"""
+        self.n_terms = postings.shape[0]
+        self.n_products = postings.shape[1]
+        self.postings = postings
+        self.indptr = postings.indptr
+        self.indices = postings.indices
+        self.data = postings.data
+
+    def score(self, query_vector) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score every product that shares at least one term with the query
+
+        Args:
+            query_vector: (1 x terms) sparse vector from the fitted vectorizer
+
+        Returns:
+            Tuple of (product row indices, cosine similarity scores)
+        """
+        query = csr_matrix(query_vector)
+        terms = query.indices
+        weights = query.data
+
+        if len(terms) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        starts = self.indptr[terms]
+        ends = self.indptr[terms + 1]
+
+        rows = np.concatenate([self.indices[s:e] for s, e in zip(starts, ends)])
+        values = np.concatenate([
+            self.data[s:e] * w for s, e, w in zip(starts, ends, weights)
+        ])
+
+        if len(rows) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        # Sum the partial dot products of each product across the query terms
+        candidates, inverse = np.unique(rows, return_inverse=True)
+        scores = np.bincount(inverse, weights=values)
+
+        return candidates.astype(np.int64), scores
+
+    def score_batch(self, query_matrix, top_k: Optional[int] = None, min_score: float = 0.0,
+                    mask: Optional[np.ndarray] = None) -> Tuple[csr_matrix, np.ndarray, np.ndarray]:
+        """
+        Score many queries at once with a single sparse-by-sparse product
+
+        Args:
+            query_matrix: (queries x terms) sparse matrix from the fitted vectorizer
+            top_k: Candidates kept per query (None keeps every match)
+            min_score: Minimum similarity score of a kept candidate
+            mask: Optional boolean array over products; False rows are not kept
+
+        Returns:
+            Tuple of a (queries x products) CSR matrix holding, per query, the
+            top_k cosine similarities of at least min_score among the masked
+            products, the number of products of each query reaching min_score,
+            and how many of those pass the mask
+        """
+        similarity = (csr_matrix(query_matrix) @ self.postings).tocsr()
+        similarity.data[similarity.data < min_score] = 0
+        similarity.eliminate_zeros()
+        total_found = np.diff(similarity.indptr)
+
+        if mask is not None:
+            similarity.data[~mask[similarity.indices]] = 0
+            similarity.eliminate_zeros()
+        similarity.sort_indices()
+
+        return select_top_k_rows(similarity, top_k), total_found, np.diff(similarity.indptr)
+
+    def search(self, query_vector, top_k: int,
+               min_score: float = 0.0,
+               mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the top_k most similar products for a query vector
+
+        Args:
+            query_vector: (1 x terms) sparse vector from the fitted vectorizer
+            top_k: Number of products to return
+            min_score: Minimum similarity score for a product to be returned
+            mask: Optional boolean array over products; False rows are skipped
+
+        Returns:
+            Tuple of (product row indices, scores) sorted by descending score
+        """
+        candidates, scores = self.score(query_vector)
+
+        keep = scores >= min_score
+        if mask is not None:
+            keep &= mask[candidates]
+        candidates, scores = candidates[keep], scores[keep]
+
+        order = select_top_k(scores, top_k)
+        return candidates[order], scores[order]
+
+
+class LowRankIndex:
+    """
+    Dense low-rank (LSA) embedding index over a TF-IDF matrix
+
+    Products are projected with a truncated SVD into a compact float32 matrix
+    with unit-length rows. A query is projected the same way and scored
+    against the whole catalog with a single BLAS matrix-vector product.
+    Scores are cosine similarities in the latent space, which approximate
+    the exact TF-IDF similarities.
+    """
+
+    def __init__(self, components: np.ndarray, embeddings: np.ndarray):
+        """
+        Args:
+            components: (dimensions x terms) float32 SVD projection
+            embeddings: (products x dimensions) float32 L2-normalized product embeddings
+        """
+        self.components = components
+        self.embeddings = embeddings
+        self.n_products = embeddings.shape[0]
+        self.dimensions = embeddings.shape[1]
+
+    @classmethod
+    def fit(cls, tfidf_matrix: csr_matrix, dimensions: int = 128,
+            random_state: int = 42) -> 'LowRankIndex':
+        """
+        Fit the projection on a (products x terms) TF-IDF matrix
+
+        Args:
+            tfidf_matrix: Fitted TF-IDF matrix, one row per product
+            dimensions: Number of latent dimensions (capped below the number of terms)
+            random_state: Seed of the randomized SVD
+        """
+        from sklearn.decomposition import TruncatedSVD
+
+        dimensions = max(1, min(dimensions, tfidf_matrix.shape[1] - 1))
+        svd = TruncatedSVD(n_components=dimensions, random_state=random_state)
+        embeddings = svd.fit_transform(tfidf_matrix)
+
+        components = np.ascontiguousarray(svd.components_, dtype=np.float32)
+        return cls(components, cls.normalize(np.ascontiguousarray(embeddings, dtype=np.float32)))
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize rows in place, leaving all-zero rows at zero"""
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def project(self, query_matrix) -> np.ndarray:
+        """Project (queries x terms) TF-IDF vectors to L2-normalized float32 embeddings"""
+        queries = np.asarray(csr_matrix(query_matrix) @ self.components.T, dtype=np.float32)
+        return self.normalize(np.ascontiguousarray(queries))
+
+    def score(self, query_vector) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score every product against the query
+
+        Args:
+            query_vector: (1 x terms) sparse vector from the fitted vectorizer
+
+        Returns:
+            Tuple of (product row indices, latent cosine similarity scores)
+            for products with a positive score
+        """
+        query = self.project(query_vector)[0]
+        if not query.any():
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        scores = self.embeddings @ query
+        candidates = np.flatnonzero(scores > 0)
+        return candidates, scores[candidates].astype(np.float64)
+
+    def score_batch(self, query_matrix, top_k: Optional[int] = None, min_score: float = 0.0,
+                    mask: Optional[np.ndarray] = None,
+                    chunk_size: int = 32) -> Tuple[csr_matrix, np.ndarray, np.ndarray]:
+        """
+        Score many queries at once with matrix-matrix products
+
+        Each dense (chunk x products) score block is reduced to its top_k
+        candidates per query with a partial selection (argpartition) before
+        the next block is scored, so memory stays at one block plus
+        queries x top_k results instead of a full queries x products matrix.
+
+        Args:
+            query_matrix: (queries x terms) sparse matrix from the fitted vectorizer
+            top_k: Candidates kept per query (None keeps every positive score)
+            min_score: Minimum similarity score of a kept candidate
+            mask: Optional boolean array over products; False rows are not kept
+            chunk_size: Number of queries scored per dense product
+
+        Returns:
+            Tuple of a (queries x products) CSR matrix holding, per query, the
+            top_k positive latent cosine similarities of at least min_score
+            among the masked products, the number of products of each query
+            reaching min_score, and how many of those pass the mask
+        """
+        queries = self.project(query_matrix)
+        keep_count = self.n_products if top_k is None else max(0, min(top_k, self.n_products))
+
+        indices, data, row_counts, total_found, total_kept = [], [], [], [], []
+        for start in range(0, len(queries), chunk_size):
+            scores = queries[start:start + chunk_size] @ self.embeddings.T
+            relevant = (scores > 0) & (scores >= min_score)
+            total_found.append(relevant.sum(axis=1))
+            if mask is not None:
+                relevant &= mask
+            total_kept.append(relevant.sum(axis=1))
+
+            if keep_count == 0:
+                relevant[:] = False
+            elif keep_count < self.n_products:
+                # Products that cannot be kept never win the selection
+                scores[~relevant] = -np.inf
+                threshold = -np.partition(-scores, keep_count - 1, axis=1)[:, keep_count - 1:keep_count]
+                above = scores > threshold
+                # Of the scores equal to the cut-off, keep the first positions, like select_top_k
+                ties = scores == threshold
+                ties &= np.cumsum(ties, axis=1, dtype=np.int32) <= keep_count - above.sum(axis=1, keepdims=True)
+                relevant &= above | ties
+
+            # Row-major nonzero positions are already CSR ordered
+            rows, columns = np.nonzero(relevant)
+            indices.append(columns)
+            data.append(scores[rows, columns].astype(np.float64))
+            row_counts.append(relevant.sum(axis=1))
+
+        if not indices:
+            empty = np.empty(0, dtype=np.int64)
+            return csr_matrix((0, self.n_products)), empty, empty
+
+        indptr = np.concatenate([[0], np.cumsum(np.concatenate(row_counts))])
+        similarity = csr_matrix(
+            (np.concatenate(data), np.concatenate(indices), indptr), shape=(len(queries), self.n_products)
+        )
+        return similarity, np.concatenate(total_found), np.concatenate(total_kept)
+
+    def search(self, query_vector, top_k: int,
+               min_score: float = 0.0,
+               mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the top_k most similar products for a query vector
+
+        Args:
+            query_vector: (1 x terms) sparse vector from the fitted vectorizer
+            top_k: Number of products to return
+            min_score: Minimum similarity score for a product to be returned
+            mask: Optional boolean array over products; False rows are skipped
+
+        Returns:
+            Tuple of (product row indices, scores) sorted by descending score
+        """
+        candidates, scores = self.score(query_vector)
+
+        keep = scores >= min_score
+        if mask is not None:
+            keep &= mask[candidates]
+        candidates, scores = candidates[keep], scores[keep]
+
+        order = select_top_k(scores, top_k)
+        return candidates[order], scores[order]
+
+
+def recall_at_k(exact_index, approximate_index, query_matrix, top_k: int = 10) -> float:
+    """
+    Measure how many of the exact top_k products an approximate index also returns
+
+    Args:
+        exact_index: Index returning exact similarities (e.g. InvertedIndex)
+        approximate_index: Index to evaluate (e.g. LowRankIndex)
+        query_matrix: (queries x terms) sparse matrix from the fitted vectorizer
+        top_k: Number of products compared per query
+
+    Returns:
+        Mean recall@k over the queries with at least one exact match
+    """
+    query_matrix = csr_matrix(query_matrix)
+    recalls = []
+    for row in range(query_matrix.shape[0]):
+        exact, _ = exact_index.search(query_matrix[row], top_k)
+        if len(exact) == 0:
+            continue
+        approximate, _ = approximate_index.search(query_matrix[row], top_k)
+        recalls.append(len(np.intersect1d(exact, approximate)) / len(exact))
+
+    return float(np.mean(recalls)) if recalls else 0.0
+
+
+def _init_neighbor_worker(tfidf_matrix: csr_matrix, postings: csr_matrix):
+    """Keep the matrices in the worker process so chunks are sent as row ranges only"""
+    global _neighbor_matrix, _neighbor_postings
+    _neighbor_matrix = tfidf_matrix
+    _neighbor_postings = postings
+
+
+def _compute_neighbor_chunk(start: int, end: int, n_neighbors: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the nearest neighbors of products start..end-1
+
+    Returns:
+        Tuple of ((end - start) x n_neighbors) neighbor rows padded with -1,
+        and their similarity scores padded with 0
+    """
+    similarity = (_neighbor_matrix[start:end] @ _neighbor_postings).tocsr()
+
+    neighbor_rows = np.full((end - start, n_neighbors), -1, dtype=np.int32)
+    neighbor_scores = np.zeros((end - start, n_neighbors), dtype=np.float32)
+
+    for offset in range(end - start):
+        row_start, row_end = similarity.indptr[offset], similarity.indptr[offset + 1]
+        candidates = similarity.indices[row_start:row_end]
+        scores = similarity.data[row_start:row_end]
+
+        # A product is not its own neighbor
+        keep = (candidates != start + offset) & (scores > 0)
+        candidates, scores = candidates[keep], scores[keep]
+
+        order = select_top_k(scores, n_neighbors)
+        neighbor_rows[offset, :len(order)] = candidates[order]
+        neighbor_scores[offset, :len(order)] = scores[order]
+
+    return neighbor_rows, neighbor_scores
+
+
+def compute_neighbor_table(tfidf_matrix: csr_matrix, postings: csr_matrix,
+                           n_neighbors: int = 50, chunk_size: int = 512,
+                           workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Precompute the most similar products of every product in the catalog
+
+    The catalog is scored against itself in chunks of rows, each chunk with a
+    single sparse-by-sparse product, so memory stays bounded by chunk_size
+    rows of similarities. Chunks are spread over a process pool.
+
+    Args:
+        tfidf_matrix: (products x terms) L2-normalized TF-IDF matrix
+        postings: (terms x products) inverted index of tfidf_matrix
+        n_neighbors: Number of neighbors kept per product
+        chunk_size: Number of products scored per sparse product
+        workers: Number of worker processes (None for one per CPU, 1 to run in-process)
+
+    Returns:
+        Tuple of (products x n_neighbors) int32 neighbor rows sorted by
+        descending similarity and padded with -1, and their float32 scores
+    """
+    tfidf_matrix = csr_matrix(tfidf_matrix)
+    n_products = tfidf_matrix.shape[0]
+    chunks = [(start, min(start + chunk_size, n_products)) for start in range(0, n_products, chunk_size)]
+
+    if workers == 1 or len(chunks) <= 1:
+        _init_neighbor_worker(tfidf_matrix, postings)
+        try:
+            results = [_compute_neighbor_chunk(start, end, n_neighbors) for start, end in chunks]
+        finally:
+            _init_neighbor_worker(None, None)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_neighbor_worker,
+                                 initargs=(tfidf_matrix, postings)) as executor:
+            results = list(executor.map(
+                _compute_neighbor_chunk,
+                [start for start, _ in chunks],
+                [end for _, end in chunks],
+                [n_neighbors] * len(chunks)
+            ))
+
+    if not results:
+        return np.empty((0, n_neighbors), dtype=np.int32), np.empty((0, n_neighbors), dtype=np.float32)
+
+    return np.vstack([rows for rows, _ in results]), np.vstack([scores for _, scores in results])
@@ -0,0 +1,258 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from helper.cache import LRUCache
+from helper.matcher import IngredientMatcher, get_base_name
+
+UTILS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "utils")
+
+# Avoid lists and search-term aliases of every skin type
+INGREDIENT_RULES_PATH = os.getenv("INGREDIENT_RULES_PATH", os.path.join(UTILS_DIR, "rules.json"))
+
+# Explanation of every avoid-list entry, by skin type
+INGREDIENT_DETAILS_PATH = os.getenv("INGREDIENT_DETAILS_PATH", os.path.join(UTILS_DIR, "details.json"))
+
+# Seconds between checks of the rule files for changes (0 disables hot reload)
+INGREDIENT_RULES_RELOAD_INTERVAL = int(os.getenv("INGREDIENT_RULES_RELOAD_INTERVAL", "10"))
+
+# Skin type value -> key of its explanations in the details file
+DETAILS_KEYS = {
+    "oily": "oily",
+    "dry": "dry",
+    "normal": "normal",
+    "acne": "acne_prone",
+    "sensitive": "sensitive"
+}
+
+DEFAULT_REASON = "Tidak cocok untuk jenis kulit ini berdasarkan penelitian dermatologis."
+
+
+class IngredientRules:
+    """
+    Compiled snapshot of the ingredient rules
+
+    A snapshot is never modified after it is built; a rule change produces a
+    new snapshot, so a request holding one sees a consistent set of avoid
+    lists, explanations and matcher.
+    """
+
+    def __init__(self, avoid_lists: Dict[str, List[str]], aliases: Dict[str, List[str]],
+                 details: Dict[str, Dict[str, str]], checksum: str):
+        """
+        Args:
+            avoid_lists: Skin type value -> avoid-list entries
+            aliases: Name -> search terms used to expand the entries
+            details: Details key -> entry name -> explanation
+            checksum: SHA-256 of the rule files the snapshot was compiled from
+        """
+        self.avoid_lists = avoid_lists
+        self.aliases = aliases
+        self.details = details
+        self.checksum = checksum
+        self.matcher = IngredientMatcher(avoid_lists, aliases)
+        self.custom_matchers = LRUCache(max_entries=32, size_of=lambda matcher: 0)
+
+    def get_avoid_list(self, skin_type: str) -> List[str]:
+        """Get the avoid list of a skin type value (empty for unknown skin types)"""
+        return self.avoid_lists.get(skin_type, [])
+
+    def get_reason(self, entry: str, skin_type: str) -> str:
+        """
+        Get the explanation of why an avoid-list entry is harmful for a skin type
+
+        Details are keyed by the entry name without qualifiers, e.g. "Retinol"
+        for "Retinol (tanpa moisturizer)", or by its first slash-separated part.
+        """
+        skin_details = self.details.get(DETAILS_KEYS.get(skin_type, skin_type), {})
+        base_name = get_base_name(entry)
+        reason = (skin_details.get(entry)
+                  or skin_details.get(base_name)
+                  or skin_details.get(base_name.split('/')[0].strip()))
+        return reason or DEFAULT_REASON
+
+    def get_custom_matcher(self, entries: Tuple[str, ...]) -> IngredientMatcher:
+        """Compile (once per snapshot) a matcher for an avoid list that is not one of the rule lists"""
+        matcher = self.custom_matchers.get(entries)
+        if matcher is None:
+            matcher = IngredientMatcher({"custom": list(entries)}, self.aliases)
+            self.custom_matchers.set(entries, matcher)
+        return matcher
+
+
+def rules_checksum(rules_data: bytes, details_data: Optional[bytes]) -> str:
+    """Get the SHA-256 checksum identifying the contents of the rule files"""
+    return hashlib.sha256(rules_data + b"\0" + (details_data or b"")).hexdigest()
+
+
+def compile_rules(rules_data: bytes, details_data: Optional[bytes]) -> IngredientRules:
+    """
+    Parse and compile the contents of the rule files
+
+    Args:
+        rules_data: Contents of the rules file
+        details_data: Contents of the details file (None if it does not exist)
+
+    Returns:
+        Compiled rules
+
+    Raises:
+        ValueError: If a file is not valid JSON or the avoid lists are malformed
+    """
+    rules = json.loads(rules_data.decode('utf-8'))
+    details = json.loads(details_data.decode('utf-8')) if details_data is not None else {}
+
+    avoid_lists = rules.get("avoid") if isinstance(rules, dict) else None
+    if not isinstance(avoid_lists, dict) or not avoid_lists:
+        raise ValueError("rules file has no 'avoid' object")
+    for skin_type, entries in avoid_lists.items():
+        if not isinstance(entries, list) or not all(isinstance(entry, str) for entry in entries):
+            raise ValueError(f"avoid list of '{skin_type}' must be a list of strings")
+
+    aliases = rules.get("aliases", {})
+    if not isinstance(aliases, dict) or not all(isinstance(terms, list) for terms in aliases.values()):
+        raise ValueError("'aliases' must map names to lists of search terms")
+    if not isinstance(details, dict):
+        raise ValueError("details file must be a JSON object")
+
+    return IngredientRules(avoid_lists, aliases, details, rules_checksum(rules_data, details_data))
+
+
+class RuleStore:
+    """
+    File-backed store of the compiled ingredient rules
+
+    A background thread watches the rule files and swaps in a recompiled
+    snapshot when their content changes. Files that fail to parse are
+    reported and the previous snapshot stays active.
+    """
+
+    def __init__(self, rules_path: str = INGREDIENT_RULES_PATH, details_path: str = INGREDIENT_DETAILS_PATH,
+                 interval: int = INGREDIENT_RULES_RELOAD_INTERVAL):
+        """
+        Args:
+            rules_path: Path of the JSON file with the avoid lists and aliases
+            details_path: Path of the JSON file with the entry explanations
+            interval: Seconds between checks of the files for changes
+        """
+        self.rules_path = rules_path
+        self.details_path = details_path
+        self.interval = interval
+        self._rules: Optional[IngredientRules] = None
+        self._file_state = None
+        self._load_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def current(self) -> IngredientRules:
+        """Get the active rules snapshot, loading the files on first use"""
+        rules = self._rules
+        if rules is None:
+            with self._load_lock:
+                if self._rules is None:
+                    self.load()
+                rules = self._rules
+        return rules
+
+    def get_file_state(self) -> tuple:
+        """Get the (inode, size, mtime) of each rule file, None for missing files"""
+        state = []
+        for path in (self.rules_path, self.details_path):
+            try:
+                stat = os.stat(path)
+                state.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                state.append(None)
+        return tuple(state)
+
+    def load(self) -> bool:
+        """
+        Read and compile the rule files, swapping in the result if the content changed
+
+        Returns:
+            True if a new snapshot was swapped in
+
+        Raises:
+            OSError: If the rules file cannot be read
+            ValueError: If the rule files are malformed
+        """
+        file_state = self.get_file_state()
+
+        with open(self.rules_path, 'rb') as f:
+            rules_data = f.read()
+        try:
+            with open(self.details_path, 'rb') as f:
+                details_data = f.read()
+        except FileNotFoundError:
+            details_data = None
+
+        self._file_state = file_state
+        if self._rules is not None and self._rules.checksum == rules_checksum(rules_data, details_data):
+            return False
+
+        rules = compile_rules(rules_data, details_data)
+        # A single reference assignment, so readers see either the old or the new snapshot
+        self._rules = rules
+        print(f"Loaded ingredient rules {rules.checksum[:12]} "
+              f"({sum(len(entries) for entries in rules.avoid_lists.values())} entries)")
+        return True
+
+    def reload_if_changed(self) -> bool:
+        """
+        Recompile the rules if the rule files changed since the last load
+
+        Returns:
+            True if a new snapshot was swapped in
+        """
+        if self.get_file_state() == self._file_state:
+            return False
+
+        with self._load_lock:
+            try:
+                return self.load()
+            except Exception as e:
+                # Remember the broken files so the error is reported once per change
+                self._file_state = self.get_file_state()
+                active = self._rules.checksum[:12] if self._rules is not None else "none"
+                print(f"Error reloading ingredient rules, keeping {active}: {e}")
+                return False
+
+    def run(self):
+        """Poll until stopped"""
+        while not self._stop_event.wait(self.interval):
+            self.reload_if_changed()
+
+    def start(self):
+        """Start watching the rule files in a daemon thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name="ingredient-rules-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching the rule files"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+rule_store = RuleStore()
+
+def get_rules() -> IngredientRules:
+    """Get the active ingredient rules snapshot"""
+    return rule_store.current
+
+def start_rule_watcher():
+    """Start background hot reload of the ingredient rules (disabled when the interval is 0)"""
+    if rule_store.interval > 0:
+        rule_store.start()
+
+def stop_rule_watcher():
+    """Stop background hot reload of the ingredient rules"""
+    rule_store.stop()
@@ -0,0 +1,149 @@
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from helper.rules import get_rules
+from utils.database import read_sql
+
+# Companion table of the products table holding per-product, per-skin-type verdicts
+PRODUCT_SAFETY_TABLE = "product_safety"
+
+# Products analyzed per worker task
+SAFETY_CHUNK_SIZE = 500
+
+
+def analyze_ingredients_chunk(texts: List[str]) -> List[dict]:
+    """Scan ingredient texts once each, returning skin type -> harmful entries per text"""
+    matcher = get_rules().matcher
+    return [matcher.scan(str(text)) for text in texts]
+
+
+def get_ingredient_texts(ingredients) -> List[str]:
+    """Get the ingredients texts verdicts are computed from, with missing values as ''"""
+    return [text if isinstance(text, str) else '' for text in ingredients]
+
+
+def catalog_checksum(product_ids, ingredients) -> str:
+    """
+    Checksum the product ids and ingredients texts verdicts are computed from
+
+    Product ids are reassigned on every reseed, so stored verdicts are only
+    valid for the catalog whose checksum they record.
+
+    Args:
+        product_ids: Product id of each product
+        ingredients: Ingredients text of each product
+
+    Returns:
+        SHA-256 hex digest
+    """
+    digest = hashlib.sha256()
+    for product_id, text in zip(product_ids, get_ingredient_texts(ingredients)):
+        digest.update(f"{int(product_id)}\0{text}\0".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def compute_product_safety(product_ids, ingredients, workers: Optional[int] = None,
+                           chunk_size: int = SAFETY_CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Compute the harmful ingredients and safe flag of every product for every skin type
+
+    Chunks of the catalog are scanned in a process pool. Every row records
+    the checksums of the ingredient rules and of the catalog it was computed with.
+
+    Args:
+        product_ids: Product id of each product
+        ingredients: Ingredients text of each product
+        workers: Number of worker processes (None for one per CPU, 1 to run in-process)
+        chunk_size: Number of products per worker task
+
+    Returns:
+        DataFrame with one row per product and skin type: product_id, skin_type,
+        is_safe, harmful_count, harmful_ingredients (JSON list), rules_checksum
+        and catalog_checksum
+    """
+    rules = get_rules()
+    product_ids = list(product_ids)
+    texts = get_ingredient_texts(ingredients)
+    catalog = catalog_checksum(product_ids, texts)
+    chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+
+    if workers == 1 or len(chunks) <= 1:
+        results = [analyze_ingredients_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(analyze_ingredients_chunk, chunks))
+
+    rows = []
+    matches_iter = (matches for chunk in results for matches in chunk)
+    for product_id, matches in zip(product_ids, matches_iter):
+        for skin_type in rules.avoid_lists:
+            harmful = matches.get(skin_type, [])
+            rows.append({
+                'product_id': int(product_id),
+                'skin_type': skin_type,
+                'is_safe': len(harmful) == 0,
+                'harmful_count': len(harmful),
+                'harmful_ingredients': json.dumps(harmful, ensure_ascii=False),
+                'rules_checksum': rules.checksum,
+                'catalog_checksum': catalog,
+            })
+
+    return pd.DataFrame(rows, columns=['product_id', 'skin_type', 'is_safe', 'harmful_count',
+                                       'harmful_ingredients', 'rules_checksum', 'catalog_checksum'])
+
+
+def safety_bits_from_verdicts(verdicts: pd.DataFrame, product_ids, skin_types: List[str]) -> Optional[np.ndarray]:
+    """
+    Build per-product safety bitmasks from stored verdicts
+
+    Args:
+        verdicts: Rows with product_id, skin_type and is_safe
+        product_ids: Product id of each index row
+        skin_types: Skin types in bitmask order
+
+    Returns:
+        uint8 array with bit i set when the product is unsafe for skin_types[i],
+        or None if the verdicts do not cover every product and skin type
+    """
+    rows = pd.Index(product_ids).get_indexer(verdicts['product_id'])
+    skin_type_positions = pd.Index(skin_types).get_indexer(verdicts['skin_type'])
+
+    covered = (rows >= 0) & (skin_type_positions >= 0)
+    if covered.sum() != len(product_ids) * len(skin_types):
+        return None
+
+    unsafe = covered & ~verdicts['is_safe'].astype(bool).to_numpy()
+    safety_bits = np.zeros(len(product_ids), dtype=np.uint8)
+    np.bitwise_or.at(safety_bits, rows[unsafe], (1 << skin_type_positions[unsafe]).astype(np.uint8))
+    return safety_bits
+
+
+def load_safety_bits(product_ids, skin_types: List[str], rules_checksum: str,
+                     products_checksum: str) -> Optional[np.ndarray]:
+    """
+    Read the safety bitmasks of products from the product_safety table
+
+    Args:
+        product_ids: Product id of each index row
+        skin_types: Skin types in bitmask order
+        rules_checksum: Checksum of the ingredient rules the verdicts must have been computed with
+        products_checksum: catalog_checksum of the whole products table the verdicts must have been computed for
+
+    Returns:
+        uint8 safety bitmasks, or None if the table is missing, incomplete or
+        computed with other rules or for another catalog
+    """
+    verdicts = read_sql(
+        f"SELECT product_id, skin_type, is_safe FROM {PRODUCT_SAFETY_TABLE} "
+        "WHERE rules_checksum = :rules_checksum AND catalog_checksum = :catalog_checksum",
+        {'rules_checksum': rules_checksum, 'catalog_checksum': products_checksum}
+    )
+    if verdicts is None or verdicts.empty:
+        return None
+
+    return safety_bits_from_verdicts(verdicts, product_ids, skin_types)
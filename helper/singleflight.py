@@ -0,0 +1,54 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one in-flight computation
+
+    The first caller for a key starts the computation as a task; callers
+    arriving while it runs wait on the same task and receive its result or
+    exception. The key is released once the task finishes, so later calls
+    compute afresh (caches behind the computation serve those).
+
+    The task is shielded from its callers: a client disconnecting cancels
+    only its own wait, not the computation the others are waiting on.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run function for key, or wait on the run already in flight for it
+
+        Args:
+            key: Identity of the computation, e.g. an image hash
+            function: Coroutine function performing the computation
+
+        Returns:
+            Result of the computation
+        """
+        self.calls += 1
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(function())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done, key=key: self._release(key, done))
+        else:
+            self.shared += 1
+
+        return await asyncio.shield(task)
+
+    def _release(self, key: Hashable, task: asyncio.Task):
+        """Forget a finished task, marking its exception retrieved in case every caller went away"""
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Get the number of calls, calls served by another call's run, and runs in flight"""
+        return {'calls': self.calls, 'shared': self.shared, 'in_flight': len(self._tasks)}
@@ -2,8 +2,23 @@ import os
 import re
 import glob
 import pandas as pd
+from sqlalchemy import String, Text, text
 from utils.database import engine, connect_to_db
 
+# Paths where raw files might be, relative to the repository root
+RAW_CSV_PATTERNS = [
+    "collecting-dataset/data/raw_data/raw_*.csv",
+    "collecting-dataset/data/raw_*.csv",
+    "collecting-dataset/raw_*.csv"
+]
+
+def find_raw_csv_files(root_dir: str = ".") -> list:
+    """Find the raw product CSVs under root_dir, sorted and without duplicates"""
+    all_files = []
+    for pattern in RAW_CSV_PATTERNS:
+        all_files.extend(glob.glob(os.path.join(root_dir, pattern)))
+    return sorted(set(all_files))
+
 def clean_extracted_text(raw_text) -> str:
     """Clean markdown, extra spaces, and newlines from description"""
     if pd.isna(raw_text) or raw_text is None:
@@ -40,19 +55,7 @@ def load_and_transform_raw_csvs():
     """Find and combine all raw product CSVs, then transform them"""
     print("Mencari file raw CSV...")
     
-    # Paths where raw files might be
-    raw_paths = [
-        "collecting-dataset/data/raw_data/raw_*.csv",
-        "collecting-dataset/data/raw_*.csv",
-        "collecting-dataset/raw_*.csv"
-    ]
-    
-    all_files = []
-    for path in raw_paths:
-        all_files.extend(glob.glob(path))
-        
-    # Remove duplicates if any
-    all_files = list(set(all_files))
+    all_files = find_raw_csv_files()
     
     if not all_files:
         print("❌ Tidak ditemukan file raw CSV (raw_*.csv) untuk diproses.")
@@ -121,6 +124,9 @@ def main():
     # 'Title' -> 'title', 'Image URL' -> 'image_url', dst.
     df.columns = [col.lower().replace(' ', '_') for col in df.columns]
     
+    # Index baris dipakai sebagai product_id yang menghubungkan tabel produk dan tabel keamanan
+    df = df.reset_index(drop=True)
+    
     # 4. Upload ke database (tabel 'products')
     table_name = "products"
     try:
@@ -128,19 +134,56 @@ def main():
         print(f"Mengunggah {len(df)} produk ke tabel '{table_name}'...")
         
         # Simpan ke SQL
-        df.to_sql(table_name, con=engine, if_exists='replace', index=False)
+        df.to_sql(table_name, con=engine, if_exists='replace', index=True, index_label='product_id')
         print(f"✓ Berhasil mengunggah data! Tabel '{table_name}' siap digunakan.")
         
         # Jalankan test query sederhana
         with engine.connect() as conn:
-            # Import text from sqlalchemy for raw SQL text execution in sqlalchemy 2.0+
-            from sqlalchemy import text
             result = conn.execute(text(f"SELECT COUNT(*) FROM {table_name}"))
             count = result.scalar()
             print(f"✓ Verifikasi database: Ada {count} baris di tabel '{table_name}'.")
             
     except Exception as e:
         print(f"❌ Terjadi kesalahan saat menulis ke database: {e}")
+        return
+
+    # 5. Hitung verdict keamanan tiap produk untuk semua tipe kulit agar tidak dihitung ulang per request
+    from helper.safety import PRODUCT_SAFETY_TABLE, compute_product_safety
+    try:
+        print(f"\n=== Menghitung Keamanan Produk ===")
+        safety_df = compute_product_safety(df.index, df['ingredients'])
+        safety_df.to_sql(
+            PRODUCT_SAFETY_TABLE, con=engine, if_exists='replace', index=False, chunksize=10000,
+            dtype={'skin_type': String(16), 'harmful_ingredients': Text(), 'rules_checksum': String(64),
+                   'catalog_checksum': String(64)}
+        )
+        
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX idx_{PRODUCT_SAFETY_TABLE}_product ON {PRODUCT_SAFETY_TABLE} (product_id, skin_type)"))
+            conn.execute(text(f"CREATE INDEX idx_{PRODUCT_SAFETY_TABLE}_skin_type ON {PRODUCT_SAFETY_TABLE} (skin_type, is_safe)"))
+        
+        unsafe_count = int((~safety_df['is_safe']).sum())
+        print(f"✓ Tabel '{PRODUCT_SAFETY_TABLE}' siap ({len(safety_df)} verdict, {unsafe_count} tidak aman).")
+    except Exception as e:
+        print(f"❌ Gagal menghitung keamanan produk: {e}")
+        # Verdict lama milik katalog sebelumnya tidak boleh tertinggal di samping produk baru
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {PRODUCT_SAFETY_TABLE}"))
+            print(f"⚠️ Tabel '{PRODUCT_SAFETY_TABLE}' dihapus; index akan menghitung keamanan sendiri.")
+        except Exception as drop_error:
+            print(f"❌ Gagal menghapus tabel '{PRODUCT_SAFETY_TABLE}': {drop_error}")
+            print("❌ Seed dibatalkan agar verdict lama tidak dipakai untuk katalog baru.")
+            return
+
+    # 6. Bangun artifact index rekomendasi agar worker tidak perlu fit ulang TF-IDF saat start
+    try:
+        print(f"\n=== Membangun Index Rekomendasi ===")
+        from helper.recommendations import SkinCareRecommendationSystem
+        system = SkinCareRecommendationSystem(table_name)
+        print(f"✓ Index rekomendasi siap ({system.tfidf_matrix.shape[0]} produk).")
+    except Exception as e:
+        print(f"❌ Gagal membangun index rekomendasi: {e}")
 
 if __name__ == "__main__":
     main()
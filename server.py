@@ -1,30 +1,61 @@
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Body, File, UploadFile, Form
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from helper.educations import get_educations_details, get_educations_list
 from helper.news import get_news, get_news_list
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import List, Dict, Any, Optional
 from google import genai
 from enum import Enum
+from contextlib import asynccontextmanager
 import os
+import asyncio
 
 from helper import (
-    get_image_from_url, extract_text_from_image, 
+    get_image_from_url_async, extract_ingredients_from_image_async, 
     clean_extracted_text, extract_ingredients_section, find_harmful_ingredients_with_details, 
+    find_harmful_ingredients_for_all_skin_types,
     parse_ingredients_to_list, get_ingredients_to_avoid, load_resnet_skin_classifier, 
     get_skin_type_label_mapping, predict_skin_type_from_image
 )
 
-from helper.recommendations import get_skincare_recommendations
+from helper.recommendations import (
+    get_skincare_recommendations, get_skincare_recommendations_for_skin_types,
+    get_batch_skincare_recommendations, get_similar_catalog_products,
+    get_recommendation_cache_stats, get_recommendation_system, start_recommendation_reloader, stop_recommendation_reloader
+)
+from helper.rules import start_rule_watcher, stop_rule_watcher
+from helper.extraction_cache import extraction_cache
+from helper.gemini import GeminiClient
+from helper.extraction import (
+    EXTRACTION_BACKEND, INGREDIENTS_NOT_FOUND, SCAN_MAX_IMAGES, ExtractedIngredients,
+    create_extraction_backend, merge_extractions
+)
+from helper.functions import get_image_digest
+from helper.singleflight import SingleFlight
 
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build or map the recommendation index before serving instead of on the first scan
+    await asyncio.to_thread(get_recommendation_system)
+    # Rebuild the recommendation index in the background when products change
+    start_recommendation_reloader()
+    # Recompile the ingredient rules in the background when the rule files change
+    start_rule_watcher()
+    yield
+    stop_rule_watcher()
+    stop_recommendation_reloader()
+
+
 app = FastAPI(
     title="SkinSight API", 
     description="API for skincare recommendations",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -53,6 +84,7 @@ class SkinType(str, Enum):
 # =====================================================================
 
 class ProductRecommendation(BaseModel):
+    product_id: Optional[int] = Field(None, description="ID produk di katalog rekomendasi (untuk /similar-products)")
     product_name: str = Field(..., description="Nama produk rekomendasi")
     product_image: str = Field(..., description="URL gambar produk")
     product_link: str = Field(..., description="Link produk/sumber")
@@ -67,18 +99,74 @@ class ReadIngredientsRecommendations(BaseModel):
     products: List[ProductRecommendation] = Field(default=[], description="Daftar rekomendasi produk yang aman")
     recommendation_count: int = Field(default=0, description="Jumlah produk rekomendasi")
 
+class SkinTypeVerdict(BaseModel):
+    skin_type: SkinType = Field(..., description="Tipe kulit")
+    harmful_ingredients_found: List[HarmfulIngredientDetail] = Field(..., description="Detail bahan berbahaya untuk tipe kulit ini")
+    is_safe: bool = Field(..., description="Apakah produk aman untuk tipe kulit ini")
+    total_harmful_ingredients: int = Field(..., description="Total bahan berbahaya untuk tipe kulit ini")
+    recommendations: ReadIngredientsRecommendations = Field(..., description="Rekomendasi produk yang aman untuk tipe kulit ini")
+
 class ReadIngredientsResponse(BaseModel):
     extracted_ingredients: List[str] = Field(..., description="Daftar kandungan bahan yang berhasil diekstrak")
     harmful_ingredients_found: List[HarmfulIngredientDetail] = Field(..., description="Detail bahan berbahaya yang ditemukan")
     is_safe: bool = Field(..., description="Apakah produk aman untuk tipe kulit yang dipilih")
     total_harmful_ingredients: int = Field(..., description="Total bahan berbahaya yang ditemukan")
     recommendations: ReadIngredientsRecommendations = Field(..., description="Rekomendasi produk dengan kandungan serupa yang aman")
+    skin_type_verdicts: Optional[List[SkinTypeVerdict]] = Field(None, description="Hasil analisis untuk semua tipe kulit (jika all_skin_types=true)")
+
+class ScanIngredientsEvent(BaseModel):
+    extracted_ingredients: List[str] = Field(..., description="Daftar kandungan bahan yang berhasil diekstrak")
+
+class ScanVerdictEvent(BaseModel):
+    harmful_ingredients_found: List[HarmfulIngredientDetail] = Field(..., description="Detail bahan berbahaya yang ditemukan")
+    is_safe: bool = Field(..., description="Apakah produk aman untuk tipe kulit yang dipilih")
+    total_harmful_ingredients: int = Field(..., description="Total bahan berbahaya yang ditemukan")
+
+class ScanRecommendationsEvent(BaseModel):
+    recommendations: ReadIngredientsRecommendations = Field(..., description="Rekomendasi produk dengan kandungan serupa yang aman")
+
+class ScanErrorEvent(BaseModel):
+    detail: str = Field(..., description="Pesan error tahap yang gagal")
+
+class AnalyzeIngredientsRequest(BaseModel):
+    text: Optional[str] = Field(None, description="Teks kandungan bahan produk")
+    texts: Optional[List[str]] = Field(None, max_length=300, description="Daftar teks kandungan bahan (maksimal 300)")
+    skin_type: SkinType = Field(..., description="Tipe kulit user")
+    top_k: int = Field(default=5, ge=1, le=20, description="Jumlah rekomendasi per produk (1-20)")
+
+    @model_validator(mode="after")
+    def check_single_or_bulk(self) -> "AnalyzeIngredientsRequest":
+        """Reject requests sending both text and texts instead of silently ignoring one"""
+        if self.text is not None and self.texts is not None:
+            raise ValueError("Gunakan text atau texts, tidak keduanya.")
+        return self
+
+class AnalyzeIngredientsResponse(BaseModel):
+    results: List[ReadIngredientsResponse] = Field(..., description="Hasil analisis sesuai urutan teks pada request")
+
+class BatchRecommendationItem(BaseModel):
+    ingredients: List[str] = Field(..., description="Daftar kandungan bahan produk")
+    skin_type: SkinType = Field(..., description="Tipe kulit user")
+
+class BatchRecommendationsRequest(BaseModel):
+    items: List[BatchRecommendationItem] = Field(..., min_length=1, max_length=100, description="Daftar produk yang ingin dicek (maksimal 100)")
+    top_k: int = Field(default=5, ge=1, le=20, description="Jumlah rekomendasi per produk (1-20)")
+
+class BatchRecommendationResult(ReadIngredientsRecommendations):
+    skin_type: SkinType = Field(..., description="Tipe kulit")
+    total_found: int = Field(default=0, description="Total produk dengan kandungan serupa")
+    total_safe: int = Field(default=0, description="Total produk serupa yang aman untuk tipe kulit")
+
+class BatchRecommendationsResponse(BaseModel):
+    results: List[BatchRecommendationResult] = Field(..., description="Hasil rekomendasi sesuai urutan produk pada request")
 
 class RecommendationsRequest(BaseModel):
     skin_type: SkinType = Field(..., description="Tipe kulit user")
     top_k: int = Field(default=10, ge=1, le=20, description="Jumlah rekomendasi yang ingin ditampilkan (1-20)")
+    cursor: int = Field(default=0, ge=0, description="Posisi awal halaman rekomendasi (gunakan next_cursor dari respons sebelumnya)")
 
 class SkinTypeRecommendation(BaseModel):
+    product_id: Optional[int] = Field(None, description="ID produk di katalog rekomendasi (untuk /similar-products)")
     product_name: str = Field(..., description="Nama produk")
     product_image: str = Field(..., description="URL gambar produk")
     product_link: str = Field(..., description="Link produk/sumber")
@@ -90,6 +178,44 @@ class RecommendationsResponse(BaseModel):
     total_found: int = Field(..., description="Total rekomendasi yang ditemukan")
     skin_type: SkinType = Field(..., description="Tipe kulit")
     recommendation_count: int = Field(..., description="Jumlah rekomendasi yang dikembalikan")
+    next_cursor: Optional[int] = Field(None, description="Cursor untuk halaman berikutnya (null jika sudah habis)")
+
+class SimilarProductsRequest(BaseModel):
+    product_id: Optional[int] = Field(None, ge=0, description="ID produk dari hasil rekomendasi")
+    product_link: Optional[str] = Field(None, description="Link produk (alternatif product_id)")
+    skin_type: Optional[SkinType] = Field(None, description="Tipe kulit user (opsional, produk yang tidak aman dilewati)")
+    top_k: int = Field(default=10, ge=1, le=20, description="Jumlah rekomendasi yang ingin ditampilkan (1-20)")
+
+class CatalogProduct(BaseModel):
+    product_id: int = Field(..., description="ID produk di katalog rekomendasi")
+    product_name: str = Field(..., description="Nama produk")
+    product_image: str = Field(..., description="URL gambar produk")
+    product_link: str = Field(..., description="Link produk/sumber")
+    price: str = Field(..., description="Harga produk")
+
+class SimilarProductsResponse(BaseModel):
+    source_product: CatalogProduct = Field(..., description="Produk yang dicari alternatifnya")
+    recommendations: List[ProductRecommendation] = Field(..., description="Daftar produk dengan kandungan serupa")
+    total_found: int = Field(..., description="Total produk serupa yang ditemukan")
+    total_safe: int = Field(..., description="Total produk serupa yang aman untuk tipe kulit")
+    skin_type: Optional[SkinType] = Field(None, description="Tipe kulit")
+    recommendation_count: int = Field(..., description="Jumlah rekomendasi yang dikembalikan")
+
+class CacheStatsResponse(BaseModel):
+    hits: int = Field(..., description="Jumlah permintaan yang dilayani dari cache")
+    misses: int = Field(..., description="Jumlah permintaan yang tidak ada di cache")
+    hit_rate: float = Field(..., description="Rasio cache hit")
+    evictions: int = Field(..., description="Jumlah entri yang dikeluarkan dari cache")
+    entries: int = Field(..., description="Jumlah entri di cache saat ini")
+    bytes: int = Field(..., description="Perkiraan ukuran cache saat ini (byte)")
+    max_entries: int = Field(..., description="Batas jumlah entri cache")
+    max_bytes: int = Field(..., description="Batas ukuran cache (byte)")
+
+class ExtractionCacheStatsResponse(CacheStatsResponse):
+    disk_hits: int = Field(..., description="Jumlah ekstraksi yang dilayani dari cache disk")
+    perceptual_hits: int = Field(..., description="Jumlah ekstraksi yang dilayani dari gambar yang hampir identik")
+    extractions: int = Field(..., description="Jumlah gambar yang benar-benar diekstraksi oleh backend")
+    backend: Dict[str, Any] = Field(..., description="Backend ekstraksi aktif beserta statistiknya")
 
 class PredictSkinResponse(BaseModel):
     dry: float = Field(..., description="Persentase probabilitas tipe kulit kering")
@@ -170,6 +296,10 @@ class EducationDetailResponse(BaseModel):
 # =====================================================================
 
 client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+# Async access to Gemini with concurrency limits, timeouts, retries and a circuit breaker
+gemini = GeminiClient(client)
+# Ingredients text extraction: Gemini, local OCR or the router between them (EXTRACTION_BACKEND)
+extraction_backend = create_extraction_backend(EXTRACTION_BACKEND, gemini)
 
 # Load model and preprocessing transform
 model, transform = load_resnet_skin_classifier()
@@ -184,11 +314,175 @@ def index():
 
 
 # === Read Ingredients Endpoint ===
+def simplify_recommendations(full_recommendations: Dict[str, Any]) -> Dict[str, Any]:
+    """Simplify a recommendation result to the fields of ReadIngredientsRecommendations"""
+    simplified_recommendations = []
+    for rec in full_recommendations.get('recommendations', []):
+        simplified_recommendations.append({
+            'product_id': rec.get('product_id'),
+            'product_name': rec.get('product_name', 'Unknown'),
+            'product_image': rec.get('product_image', 'Unknown'),
+            'product_link': rec.get('product_link', 'Unknown'),
+            'price': rec.get('price', 'Unknown'),
+            'similarity_score': rec.get('similarity_score', 0.0)
+        })
+    
+    return {
+        'products': simplified_recommendations,
+        'recommendation_count': len(simplified_recommendations)
+    }
+
+
+def get_scan_recommendations(ingredients_list: List[str], skin_type: SkinType) -> Dict[str, Any]:
+    """Get simplified content-based recommendations for scanned ingredients, empty if the recommender fails"""
+    try:
+        full_recommendations = get_skincare_recommendations(
+            input_ingredients=ingredients_list,
+            skin_type=skin_type,
+            top_k=5
+        )
+        return simplify_recommendations(full_recommendations)
+    except Exception as rec_error:
+        print(f"Recommendation error: {rec_error}")
+        return {
+            'products': [],
+            'recommendation_count': 0
+        }
+
+
+async def extract_image_ingredients(file: Optional[UploadFile] = None, image_url: Optional[str] = None) -> ExtractedIngredients:
+    """Extract the ingredients of one uploaded or linked image"""
+    if file:
+        # Read uploaded file as bytes
+        image_bytes = await file.read()
+    else:
+        # Get image from URL without blocking the event loop, shared with concurrent requests
+        image_bytes = await get_image_from_url_async(image_url)
+
+    return await extract_ingredients_from_image_async(image_bytes, extraction_backend)
+
+
+async def extract_scan_ingredients(files: List[UploadFile], image_urls: List[str]) -> ExtractedIngredients:
+    """
+    Extract and merge the ingredients of the photos of one product
+
+    Every photo is extracted concurrently (each with its own cache entry and
+    in-flight sharing), then the lists are merged and deduplicated so the
+    harmful ingredient check and the recommender run once per product.
+
+    Args:
+        files: Uploaded photos
+        image_urls: URLs of photos
+
+    Returns:
+        Merged extraction result
+
+    Raises:
+        HTTPException: 400 without an image or with more than SCAN_MAX_IMAGES,
+            or the extraction's errors
+    """
+    if not files and not image_urls:
+        raise HTTPException(status_code=400, detail="File gambar atau URL gambar diperlukan.")
+    if len(files) + len(image_urls) > SCAN_MAX_IMAGES:
+        raise HTTPException(status_code=400, detail=f"Maksimal {SCAN_MAX_IMAGES} gambar per scan.")
+
+    results = await asyncio.gather(
+        *[extract_image_ingredients(file=file) for file in files],
+        *[extract_image_ingredients(image_url=image_url) for image_url in image_urls]
+    )
+    return merge_extractions(list(results))
+
+
+def collect_scan_images(file: Optional[UploadFile], files: Optional[List[UploadFile]],
+                        image_url: Optional[str], image_urls: Optional[List[str]]) -> tuple:
+    """Combine the single and multiple image form fields into (files, image URLs)"""
+    all_files = ([file] if file else []) + [upload for upload in (files or []) if upload]
+    all_urls = ([image_url] if image_url else []) + [url for url in (image_urls or []) if url]
+    return all_files, all_urls
+
+
+def analyze_scan(extraction: ExtractedIngredients, skin_type: SkinType, all_skin_types: bool) -> Dict[str, Any]:
+    """
+    Find the harmful ingredients of a scanned product and recommend similar safe products
+
+    Runs the matcher and the recommender synchronously; the endpoints call it
+    in a worker thread.
+
+    Args:
+        extraction: Extraction result with ingredients found
+        skin_type: User's skin type
+        all_skin_types: Also analyze the product for every skin type
+
+    Returns:
+        ReadIngredientsResponse fields
+    """
+    # The extraction result is already a list; the matcher scans it joined into one text
+    ingredients_list = extraction.ingredients
+    extracted_text = extraction.text
+    
+    if all_skin_types:
+        # One matcher pass and one similarity scoring serve every skin type
+        harmful_by_skin_type = find_harmful_ingredients_for_all_skin_types(extracted_text)
+        try:
+            recommendations_by_skin_type = get_skincare_recommendations_for_skin_types(
+                input_ingredients=ingredients_list,
+                skin_types=[st.value for st in SkinType],
+                top_k=5
+            )
+        except Exception as rec_error:
+            print(f"Recommendation error: {rec_error}")
+            recommendations_by_skin_type = {}
+        
+        skin_type_verdicts = []
+        for st in SkinType:
+            harmful = harmful_by_skin_type.get(st.value, [])
+            skin_type_verdicts.append({
+                "skin_type": st,
+                "harmful_ingredients_found": harmful,
+                "is_safe": len(harmful) == 0,
+                "total_harmful_ingredients": len(harmful),
+                "recommendations": simplify_recommendations(recommendations_by_skin_type.get(st.value, {}))
+            })
+        
+        selected = next(verdict for verdict in skin_type_verdicts if verdict["skin_type"] == skin_type)
+        return {
+            "extracted_ingredients": ingredients_list,
+            "harmful_ingredients_found": selected["harmful_ingredients_found"],
+            "is_safe": selected["is_safe"],
+            "total_harmful_ingredients": selected["total_harmful_ingredients"],
+            "recommendations": selected["recommendations"],
+            "skin_type_verdicts": skin_type_verdicts
+        }
+    
+    # Get ingredients to avoid based on skin type
+    avoid_list = get_ingredients_to_avoid(skin_type)
+    
+    # Find harmful ingredients with detailed explanations
+    harmful_ingredients = find_harmful_ingredients_with_details(extracted_text, avoid_list, skin_type)
+
+    # Create recommendation
+    is_safe = len(harmful_ingredients) == 0
+    
+    # Get content-based recommendations based on detected ingredients
+    recommendations_result = get_scan_recommendations(ingredients_list, skin_type)
+    
+    return {
+        "extracted_ingredients": ingredients_list,
+        "harmful_ingredients_found": harmful_ingredients,
+        "is_safe": is_safe,
+        "total_harmful_ingredients": len(harmful_ingredients),
+        "recommendations": recommendations_result
+    }
+
+
 @app.post("/read-ingredients", response_model=ReadIngredientsResponse)
 async def read_ingredients(
     file: UploadFile = File(None),
     image_url: str = Form(None),
-    skin_type: SkinType = Form(...)
+    skin_type: SkinType = Form(...),
+    all_skin_types: bool = Form(False),
+    files: List[UploadFile] = File(None),
+    image_urls: List[str] = Form(None)
 ):
     """
     Scan skincare product image and analyze ingredients based on skin type
@@ -196,7 +490,10 @@ async def read_ingredients(
     Parameters:
         - file: Uploaded image file
         - image_url: URL to product image (alternative to file)
+        - files / image_urls: More photos of the same product (e.g. front and
+          back label); their ingredient lists are merged into one scan
         - skin_type: User's skin type (oily, dry, normal, acne, sensitive)
+        - all_skin_types: Also return the analysis for every skin type
         
     Returns:
         - Detected ingredients as list
@@ -204,32 +501,16 @@ async def read_ingredients(
         - List of harmful ingredients found with detailed reasons
         - Skin safety recommendation
         - Content-based product recommendations (simplified)
+        - Verdicts for every skin type when all_skin_types is set
     """
     try:
-        if not file and not image_url:
-            raise HTTPException(status_code=400, detail="File gambar atau URL gambar diperlukan.")
-        
-        # Extract text from image
-        if file:
-            # Read uploaded file as bytes
-            file_content = await file.read()
-            # Pass bytes directly, not BytesIO
-            extracted_text = extract_text_from_image(file_content, client)
-        else:   
-            # Get image from URL
-            image_bytes = get_image_from_url(image_url)
-            extracted_text = extract_text_from_image(image_bytes, client)
-            
-        if not extracted_text:
-            raise HTTPException(status_code=404, detail="Tidak ada teks yang ditemukan dalam gambar.")
-        
-        # Clean and extract ingredients section
-        extracted_text = clean_extracted_text(extracted_text)
+        # Extract ingredients from every photo of the product
+        extraction = await extract_scan_ingredients(*collect_scan_images(file, files, image_url, image_urls))
         
         # Check if ingredients not found
-        if extracted_text.lower() == 'ingredients not found' or (len(extracted_text.split()) < 3 and 'not' in extracted_text.lower()):
+        if not extraction.found:
             return {
-                "extracted_ingredients": ["ingredients not found"],
+                "extracted_ingredients": [INGREDIENTS_NOT_FOUND],
                 "harmful_ingredients_found": [],
                 "is_safe": False,
                 "total_harmful_ingredients": 0,
@@ -239,63 +520,103 @@ async def read_ingredients(
                 }
             }
             
-        # Parse ingredients into list
-        ingredients_list = parse_ingredients_to_list(extracted_text)
-        
-        # Get ingredients to avoid based on skin type
+        # Matching and similarity scoring are CPU-bound; keep them off the event loop
+        return await asyncio.to_thread(analyze_scan, extraction, skin_type, all_skin_types)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+
+
+def format_sse_event(event: str, payload: BaseModel) -> str:
+    """Format a model as one server-sent event"""
+    return f"event: {event}\ndata: {payload.model_dump_json()}\n\n"
+
+
+async def stream_scan_events(extraction: ExtractedIngredients, skin_type: SkinType):
+    """
+    Yield the stages of a scan as server-sent events, each as soon as it is ready
+
+    Events, in order: ingredients, verdict, recommendations, then done. The
+    recommender runs in a worker thread started before the harmful ingredient
+    check, so a slow recommender never holds back the verdict. A failing
+    stage is reported as an error event and ends the stream.
+    """
+    if not extraction.found:
+        yield format_sse_event("ingredients", ScanIngredientsEvent(extracted_ingredients=[INGREDIENTS_NOT_FOUND]))
+        yield format_sse_event("verdict", ScanVerdictEvent(harmful_ingredients_found=[], is_safe=False, total_harmful_ingredients=0))
+        yield format_sse_event("recommendations", ScanRecommendationsEvent(recommendations=ReadIngredientsRecommendations()))
+        yield "event: done\ndata: {}\n\n"
+        return
+
+    yield format_sse_event("ingredients", ScanIngredientsEvent(extracted_ingredients=extraction.ingredients))
+
+    recommendation_task = asyncio.ensure_future(
+        asyncio.to_thread(get_scan_recommendations, extraction.ingredients, skin_type)
+    )
+    try:
         avoid_list = get_ingredients_to_avoid(skin_type)
-        
-        # Find harmful ingredients with detailed explanations
-        harmful_ingredients = find_harmful_ingredients_with_details(extracted_text, avoid_list, skin_type)
+        harmful_ingredients = await asyncio.to_thread(
+            find_harmful_ingredients_with_details, extraction.text, avoid_list, skin_type
+        )
+        yield format_sse_event("verdict", ScanVerdictEvent(
+            harmful_ingredients_found=harmful_ingredients,
+            is_safe=len(harmful_ingredients) == 0,
+            total_harmful_ingredients=len(harmful_ingredients)
+        ))
+
+        recommendations_result = await recommendation_task
+        yield format_sse_event("recommendations", ScanRecommendationsEvent(recommendations=recommendations_result))
+        yield "event: done\ndata: {}\n\n"
+    except Exception as e:
+        yield format_sse_event("error", ScanErrorEvent(detail=f"Error processing image: {str(e)}"))
+    finally:
+        # The client went away or a stage failed; nobody waits for the recommendations anymore
+        recommendation_task.cancel()
+
 
-        # Create recommendation
-        is_safe = len(harmful_ingredients) == 0
+@app.post("/read-ingredients/stream")
+async def read_ingredients_stream(
+    file: UploadFile = File(None),
+    image_url: str = Form(None),
+    skin_type: SkinType = Form(...),
+    files: List[UploadFile] = File(None),
+    image_urls: List[str] = Form(None)
+):
+    """
+    Scan skincare product image, streaming each analysis stage as it finishes (server-sent events)
+    
+    Parameters:
+        - file: Uploaded image file
+        - image_url: URL to product image (alternative to file)
+        - files / image_urls: More photos of the same product, merged into one scan
+        - skin_type: User's skin type (oily, dry, normal, acne, sensitive)
         
-        # Get content-based recommendations
-        try:
-            # Get recommendations based on detected ingredients
-            full_recommendations = get_skincare_recommendations(
-                input_ingredients=ingredients_list,
-                skin_type=skin_type,
-                top_k=5
-            )
-            
-            # Simplify recommendations to only include product_name and similarity_score
-            simplified_recommendations = []
-            for rec in full_recommendations.get('recommendations', []):
-                simplified_recommendations.append({
-                    'product_name': rec.get('product_name', 'Unknown'),
-                    'product_image': rec.get('product_image', 'Unknown'),
-                    'product_link': rec.get('product_link', 'Unknown'),
-                    'price': rec.get('price', 'Unknown'),
-                    'similarity_score': rec.get('similarity_score', 0.0)
-                })
-            
-            recommendations_result = {
-                'products': simplified_recommendations,
-                'recommendation_count': len(simplified_recommendations)
-            }
-            
-        except Exception as rec_error:
-            print(f"Recommendation error: {rec_error}")
-            recommendations_result = {
-                'products': [],
-                'recommendation_count': 0
-            }
+    Returns:
+        text/event-stream with the events:
+        - ingredients: ScanIngredientsEvent, as soon as the extraction returns
+        - verdict: ScanVerdictEvent, harmful ingredients for the skin type
+        - recommendations: ScanRecommendationsEvent
+        - done, or error (ScanErrorEvent) if a later stage fails
         
-        return {
-            "extracted_ingredients": ingredients_list,
-            "harmful_ingredients_found": harmful_ingredients,
-            "is_safe": is_safe,
-            "total_harmful_ingredients": len(harmful_ingredients),
-            "recommendations": recommendations_result
-        }
-
+        Extraction errors are returned before the stream starts, with the
+        same status codes as /read-ingredients.
+    """
+    try:
+        extraction = await extract_scan_ingredients(*collect_scan_images(file, files, image_url, image_urls))
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
 
+    return StreamingResponse(
+        stream_scan_events(extraction, skin_type),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the events
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 
 # === New endpoint for getting recommendations only ===
 @app.post("/get-recommendations", response_model=RecommendationsResponse)
@@ -306,9 +627,11 @@ async def get_recommendations_only(request: RecommendationsRequest):
     Parameters:
         - skin_type: User's skin type
         - top_k: Number of recommendations to return
+        - cursor: Position to start from (next_cursor of the previous page)
         
     Returns:
         - Products suitable for the specified skin type
+        - Cursor for the next page
     """
     try:
         skin_type = request.skin_type
@@ -316,23 +639,233 @@ async def get_recommendations_only(request: RecommendationsRequest):
         
         # Get recommendations based on skin type
         from helper.recommendations import get_skin_type_recommendations
-        recommendations = get_skin_type_recommendations(
+        recommendations = await asyncio.to_thread(
+            get_skin_type_recommendations,
             skin_type,
-            max(1, min(top_k, 20))
+            max(1, min(top_k, 20)),
+            request.cursor
         )
         
         return {
             'recommendations': recommendations.get('recommendations', []),
             'total_found': recommendations.get('total_found', 0),
             'skin_type': skin_type,
-            'recommendation_count': recommendations.get('recommendation_count', 0)
+            'recommendation_count': recommendations.get('recommendation_count', 0),
+            'next_cursor': recommendations.get('next_cursor')
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting recommendations: {str(e)}")
 
 
+def analyze_ingredient_texts(texts: List[str], skin_type: SkinType, top_k: int) -> List[Dict[str, Any]]:
+    """
+    Analyze ingredient texts: parse them, find harmful ingredients and recommend safe products
+
+    Runs synchronously; the endpoint calls it in a worker thread.
+
+    Args:
+        texts: Ingredient texts, one per product
+        skin_type: User's skin type
+        top_k: Number of recommendations per product
+
+    Returns:
+        ReadIngredientsResponse fields per text, in order
+    """
+    avoid_list = get_ingredients_to_avoid(skin_type)
+    
+    analyses = []
+    for text in texts:
+        # Same cleaning as extracted text; keep only the ingredients section of product page text
+        cleaned_text = clean_extracted_text(text or '')
+        section = extract_ingredients_section(cleaned_text)
+        if section != "Ingredients tidak ditemukan.":
+            cleaned_text = section
+        
+        ingredients_list = parse_ingredients_to_list(cleaned_text)
+        analyses.append({
+            "ingredients_list": ingredients_list,
+            "harmful_ingredients": find_harmful_ingredients_with_details(cleaned_text, avoid_list, skin_type) if ingredients_list else []
+        })
+    
+    # Score every text with ingredients against the catalog in one batch
+    items = [
+        {'ingredients': analysis['ingredients_list'], 'skin_type': skin_type}
+        for analysis in analyses if analysis['ingredients_list']
+    ]
+    try:
+        batch_results = iter(get_batch_skincare_recommendations(items, top_k) if items else [])
+    except Exception as rec_error:
+        print(f"Recommendation error: {rec_error}")
+        batch_results = iter([{}] * len(items))
+    
+    results = []
+    for analysis in analyses:
+        if not analysis['ingredients_list']:
+            results.append({
+                "extracted_ingredients": [INGREDIENTS_NOT_FOUND],
+                "harmful_ingredients_found": [],
+                "is_safe": False,
+                "total_harmful_ingredients": 0,
+                "recommendations": {
+                    "products": [],
+                    "recommendation_count": 0
+                }
+            })
+            continue
+        
+        harmful_ingredients = analysis['harmful_ingredients']
+        results.append({
+            "extracted_ingredients": analysis['ingredients_list'],
+            "harmful_ingredients_found": harmful_ingredients,
+            "is_safe": len(harmful_ingredients) == 0,
+            "total_harmful_ingredients": len(harmful_ingredients),
+            "recommendations": simplify_recommendations(next(batch_results))
+        })
+    
+    return results
+
+
+# === Text-only ingredient analysis endpoint ===
+@app.post("/analyze-ingredients", response_model=AnalyzeIngredientsResponse)
+async def analyze_ingredients(request: AnalyzeIngredientsRequest):
+    """
+    Analyze ingredient text directly, without an image or Gemini extraction
+    
+    Parameters:
+        - text: Ingredient text of one product
+        - texts: Ingredient texts of many products (alternative to text)
+        - skin_type: User's skin type
+        - top_k: Number of recommendations per product
+        
+    Returns:
+        - Per text, in request order: parsed ingredients, harmful ingredients
+          with reasons, safety verdict and safe product recommendations
+    """
+    texts = [request.text] if request.text is not None else request.texts
+    if not texts:
+        raise HTTPException(status_code=400, detail="text atau texts diperlukan.")
+    
+    try:
+        # Up to 300 texts of matching and scoring; keep them off the event loop
+        results = await asyncio.to_thread(analyze_ingredient_texts, texts, request.skin_type, request.top_k)
+        return {'results': results}
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analyzing ingredients: {str(e)}")
+
+
+# === Batch recommendations endpoint ===
+@app.post("/batch-recommendations", response_model=BatchRecommendationsResponse)
+async def batch_recommendations(request: BatchRecommendationsRequest):
+    """
+    Get safe ingredient-based recommendations for many products in one call
+    
+    Parameters:
+        - items: List of ingredient lists with the skin type to check each against
+        - top_k: Number of recommendations per item
+        
+    Returns:
+        - Recommendations for each item, in request order
+    """
+    try:
+        # Scoring (and a first index build) is synchronous; keep it off the event loop
+        results = await asyncio.to_thread(
+            get_batch_skincare_recommendations,
+            [{'ingredients': item.ingredients, 'skin_type': item.skin_type} for item in request.items],
+            request.top_k
+        )
+        
+        return {
+            'results': [
+                {
+                    'products': [
+                        {
+                            'product_id': rec.get('product_id'),
+                            'product_name': rec.get('product_name', 'Unknown'),
+                            'product_image': rec.get('product_image', 'Unknown'),
+                            'product_link': rec.get('product_link', 'Unknown'),
+                            'price': rec.get('price', 'Unknown'),
+                            'similarity_score': rec.get('similarity_score', 0.0)
+                        }
+                        for rec in result.get('recommendations', [])
+                    ],
+                    'recommendation_count': result.get('recommendation_count', 0),
+                    'skin_type': item.skin_type,
+                    'total_found': result.get('total_found', 0),
+                    'total_safe': result.get('total_safe', 0)
+                }
+                for item, result in zip(request.items, results)
+            ]
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting batch recommendations: {str(e)}")
+
+
+# === Similar catalog products endpoint ===
+@app.post("/similar-products", response_model=SimilarProductsResponse)
+async def similar_products(request: SimilarProductsRequest):
+    """
+    Get alternatives to a catalog product from its precomputed neighbors
+    
+    Parameters:
+        - product_id: ID of the product (from a recommendation response)
+        - product_link: Link of the product (alternative to product_id)
+        - skin_type: Optional user's skin type; unsafe products are skipped
+        - top_k: Number of recommendations to return
+        
+    Returns:
+        - The source product
+        - Products with the most similar ingredients
+    """
+    if request.product_id is None and not request.product_link:
+        raise HTTPException(status_code=400, detail="product_id atau product_link diperlukan.")
+    
+    try:
+        result = await asyncio.to_thread(
+            get_similar_catalog_products,
+            product_id=request.product_id,
+            product_link=request.product_link,
+            skin_type=request.skin_type,
+            top_k=request.top_k
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting similar products: {str(e)}")
+    
+    if result.get('source_product') is None:
+        if result.get('error') == 'Product not found':
+            raise HTTPException(status_code=404, detail="Produk tidak ditemukan.")
+        raise HTTPException(status_code=500, detail=f"Error getting similar products: {result.get('error')}")
+    
+    return {
+        'source_product': result['source_product'],
+        'recommendations': result.get('recommendations', []),
+        'total_found': result.get('total_found', 0),
+        'total_safe': result.get('total_safe', 0),
+        'skin_type': request.skin_type,
+        'recommendation_count': result.get('recommendation_count', 0)
+    }
+
+
+# === Recommendation cache statistics endpoint ===
+@app.get("/recommendation-cache-stats", response_model=CacheStatsResponse)
+async def recommendation_cache_stats():
+    """Get hit/miss counters of the ingredient-based recommendation cache"""
+    return get_recommendation_cache_stats()
+
+
+# === Extraction cache statistics endpoint ===
+@app.get("/extraction-cache-stats", response_model=ExtractionCacheStatsResponse)
+async def extraction_cache_stats():
+    """Get hit/miss counters of the image text extraction cache and the extraction backend"""
+    return {**extraction_cache.stats(), 'backend': extraction_backend.stats()}
+
+
 # === Predict Endpoint ===
+# Concurrent predictions for the same image share one inference
+prediction_flight = SingleFlight()
+
 @app.post("/predict-skin", response_model=PredictSkinResponse)
 async def predict(
     file: UploadFile = File(None),
@@ -376,7 +909,7 @@ async def predict(
         else:
             try:
                 # Get image from URL with timeout and validation
-                image_bytes = get_image_from_url(image_url)
+                image_bytes = await get_image_from_url_async(image_url)
                 if not image_bytes:
                     raise HTTPException(
                         status_code=400,
@@ -389,7 +922,13 @@ async def predict(
                 )
         
         # Pass bytes directly for skin type prediction
-        result = predict_skin_type_from_image(image_bytes, model, transform, index_label)
+        # Inference runs in a worker thread so other requests keep being served,
+        # and concurrent requests for the same image share one inference
+        digest = await asyncio.to_thread(get_image_digest, image_bytes)
+        result = await prediction_flight.do(
+            digest,
+            lambda: asyncio.to_thread(predict_skin_type_from_image, image_bytes, model, transform, index_label)
+        )
         
         return result
 
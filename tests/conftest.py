@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from helper import recommendations
+from helper.recommendations import SkinCareRecommendationSystem
+
+CATALOG = [
+    ("Hydrating Toner", "Aqua, Glycerin, Niacinamide, Panthenol"),
+    ("Scented Toner", "Aqua, Glycerin, Niacinamide, Parfum"),
+    ("Barrier Cream", "Aqua, Glycerin, Ceramide NP, Dimethicone"),
+    ("Oil Cleanser", "Mineral Oil, Parfum, Tocopherol"),
+    ("Vitamin C Serum", "Aqua, Ascorbic Acid, Glycerin"),
+    ("Niacinamide Serum", "Aqua, Niacinamide, Zinc PCA, Glycerin"),
+    ("Gel Moisturizer", "Aqua, Glycerin, Sodium Hyaluronate, Panthenol"),
+    ("Calming Mist", "Aqua, Centella Asiatica Extract, Panthenol"),
+    ("Scented Lotion", "Aqua, Glycerin, Fragrance, Butyrospermum Parkii Butter"),
+    ("Unlisted Balm", ""),
+]
+
+
+def make_catalog(rows=CATALOG) -> pd.DataFrame:
+    """Build a products table like the one seed_db writes, without product_id"""
+    return pd.DataFrame({
+        'title': [title for title, _ in rows],
+        'ingredients': [ingredients for _, ingredients in rows],
+        'description': ["Cocok untuk kulit normal dan kulit kering" for _ in rows],
+        'image_url': [f"https://example.com/{i}.jpg" for i in range(len(rows))],
+        'price': ["Rp100.000" for _ in rows],
+        'link': [f"https://example.com/products/{i}" for i in range(len(rows))],
+    })
+
+
+@pytest.fixture
+def catalog_rows():
+    """(title, ingredients) of the test catalog, the last one without ingredients"""
+    return CATALOG
+
+
+@pytest.fixture
+def make_recommender(tmp_path):
+    """Build SkinCareRecommendationSystem instances over test catalogs, with an empty result cache"""
+    recommendations.recommendation_cache.clear()
+
+    def build(rows=CATALOG, **kwargs):
+        return SkinCareRecommendationSystem(df=make_catalog(rows), index_dir=str(tmp_path / "index"), **kwargs)
+
+    yield build
+    recommendations.recommendation_cache.clear()
@@ -0,0 +1,41 @@
+from helper.extraction import ExtractedIngredients, merge_extractions
+
+
+def extraction(*ingredients):
+    return ExtractedIngredients(found=bool(ingredients), ingredients=list(ingredients))
+
+
+def test_ingredients_are_cleaned():
+    result = ExtractedIngredients(found=True, ingredients=[' aqua ', 'GLYCERIN', ''])
+
+    assert result.ingredients == ['Aqua', 'Glycerin']
+    assert result.text == 'Aqua, Glycerin'
+
+
+def test_merge_keeps_photo_order_and_drops_duplicates():
+    merged = merge_extractions([
+        extraction('Aqua', 'Glycerin', 'Niacinamide'),
+        extraction('Niacinamide', 'Parfum', 'aqua'),
+    ])
+
+    assert merged.found
+    assert merged.ingredients == ['Aqua', 'Glycerin', 'Niacinamide', 'Parfum']
+
+
+def test_merge_skips_photos_without_ingredients():
+    merged = merge_extractions([extraction(), extraction('Aqua', 'Parfum'), extraction()])
+
+    assert merged.ingredients == ['Aqua', 'Parfum']
+
+
+def test_merge_of_photos_without_ingredients_is_not_found():
+    merged = merge_extractions([extraction(), extraction()])
+
+    assert not merged.found
+    assert merged.ingredients == []
+
+
+def test_merge_of_a_single_photo_returns_it():
+    single = extraction('Aqua')
+
+    assert merge_extractions([single]) is single
@@ -0,0 +1,133 @@
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from helper import extraction_cache as cache_module
+from helper.extraction_cache import ExtractionCache, compute_dhash
+
+NAMESPACE = "gemini-test"
+
+
+def make_image(size=(64, 64), format="PNG", quality=95):
+    """Encode a gradient with a bright square so the difference hash has structure"""
+    y, x = np.mgrid[0:64, 0:64]
+    pixels = ((x * 3 + y * 2) % 256).astype(np.uint8)
+    pixels[16:40, 20:44] = 255
+    image = Image.fromarray(pixels).convert("RGB").resize(size)
+
+    buffer = BytesIO()
+    image.save(buffer, format=format, **({'quality': quality} if format == "JPEG" else {}))
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now[0])
+    return now
+
+
+def test_result_is_served_from_memory_then_disk(tmp_path):
+    image = make_image()
+    cache = ExtractionCache(cache_dir=str(tmp_path))
+
+    key, dhash, text = cache.lookup(image, NAMESPACE)
+    assert text is None
+    cache.store(NAMESPACE, key, "aqua, glycerin", dhash)
+
+    assert cache.lookup(image, NAMESPACE)[2] == "aqua, glycerin"
+    assert cache.stats()['hits'] == 1
+
+    restarted = ExtractionCache(cache_dir=str(tmp_path))
+    assert restarted.lookup(image, NAMESPACE)[2] == "aqua, glycerin"
+    assert restarted.disk_hits == 1
+    assert restarted.lookup(image, NAMESPACE)[2] == "aqua, glycerin"
+    assert restarted.disk_hits == 1
+
+
+def test_namespaces_are_isolated(tmp_path):
+    image = make_image()
+    cache = ExtractionCache(cache_dir=str(tmp_path))
+    key, dhash, _ = cache.lookup(image, NAMESPACE)
+    cache.store(NAMESPACE, key, "aqua", dhash)
+
+    assert cache.lookup(image, "gemini-other-prompt")[2] is None
+
+
+def test_results_expire_after_ttl(tmp_path, clock):
+    image = make_image()
+    cache = ExtractionCache(cache_dir=str(tmp_path), ttl=60)
+    key, dhash, _ = cache.lookup(image, NAMESPACE)
+    cache.store(NAMESPACE, key, "aqua", dhash)
+
+    clock[0] += 59
+    assert cache.lookup(image, NAMESPACE)[2] == "aqua"
+
+    clock[0] += 2
+    assert cache.lookup(image, NAMESPACE)[2] is None
+    assert not cache.read_entry(NAMESPACE, key)
+    assert cache.get_disk_usage() == 0
+
+
+def test_expired_disk_entry_is_not_served_after_restart(tmp_path, clock):
+    image = make_image()
+    cache = ExtractionCache(cache_dir=str(tmp_path), ttl=60)
+    key, dhash, _ = cache.lookup(image, NAMESPACE)
+    cache.store(NAMESPACE, key, "aqua", dhash)
+
+    clock[0] += 61
+    restarted = ExtractionCache(cache_dir=str(tmp_path), ttl=60)
+
+    assert restarted.lookup(image, NAMESPACE)[2] is None
+    assert restarted.disk_hits == 0
+
+
+def test_resized_reencoded_image_is_a_perceptual_hit(tmp_path):
+    original = make_image()
+    reencoded = make_image(size=(96, 96), format="JPEG", quality=70)
+    assert compute_dhash(original) is not None
+    assert bin(compute_dhash(original) ^ compute_dhash(reencoded)).count("1") <= 4
+
+    cache = ExtractionCache(cache_dir=str(tmp_path), perceptual=True)
+    key, dhash, _ = cache.lookup(original, NAMESPACE)
+    cache.store(NAMESPACE, key, "aqua, niacinamide", dhash)
+
+    restarted = ExtractionCache(cache_dir=str(tmp_path), perceptual=True)
+    assert restarted.lookup(reencoded, NAMESPACE)[2] == "aqua, niacinamide"
+    assert restarted.perceptual_hits == 1
+    assert restarted.disk_hits == 0
+
+
+def test_perceptual_matching_is_off_by_default(tmp_path):
+    cache = ExtractionCache(cache_dir=str(tmp_path), perceptual=False)
+    key, dhash, _ = cache.lookup(make_image(), NAMESPACE)
+    assert dhash is None
+    cache.store(NAMESPACE, key, "aqua", dhash)
+
+    assert cache.lookup(make_image(size=(96, 96), format="JPEG"), NAMESPACE)[2] is None
+    assert cache.perceptual_hits == 0
+
+
+def test_uncached_results_still_count_as_extractions(tmp_path):
+    image = make_image()
+    cache = ExtractionCache(cache_dir=str(tmp_path))
+
+    key, dhash, _ = cache.lookup(image, NAMESPACE)
+    cache.store(NAMESPACE, key, "aqua", dhash, cache=False)
+    cache.store(NAMESPACE, key, "", dhash)
+
+    assert cache.lookup(image, NAMESPACE)[2] is None
+    assert cache.stats()['extractions'] == 2
+    assert cache.get_disk_usage() == 0
+
+
+def test_disk_tier_is_pruned_to_the_size_cap(tmp_path, clock):
+    cache = ExtractionCache(cache_dir=str(tmp_path), max_disk_bytes=400)
+    for i in range(10):
+        clock[0] += 1
+        cache.store(NAMESPACE, f"{i:064x}", "aqua, glycerin, niacinamide")
+
+    assert 0 < cache.get_disk_usage() <= 400
+    assert cache.read_entry(NAMESPACE, f"{9:064x}") is not None
@@ -0,0 +1,135 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from helper.gemini import CircuitBreaker, CircuitOpenError, GeminiClient
+
+
+def open_breaker(cooldown=0.05):
+    breaker = CircuitBreaker(threshold=2, cooldown=cooldown)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def wait_for_half_open(breaker):
+    time.sleep(breaker.cooldown + 0.01)
+    assert breaker.state == "half_open"
+
+
+def test_breaker_opens_at_threshold():
+    breaker = CircuitBreaker(threshold=2, cooldown=30)
+
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_lets_a_single_trial_through():
+    breaker = open_breaker()
+    wait_for_half_open(breaker)
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_failed_trial_reopens_the_circuit():
+    breaker = open_breaker()
+    wait_for_half_open(breaker)
+
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_released_trial_keeps_the_circuit_half_open():
+    breaker = open_breaker()
+    wait_for_half_open(breaker)
+
+    breaker.before_call()
+    breaker.release_trial()
+
+    assert breaker.state == "half_open"
+    assert breaker.failures == 2
+    breaker.before_call()
+
+
+class FakeModels:
+    def __init__(self, behavior):
+        self.behavior = behavior
+        self.calls = 0
+
+    async def generate_content(self, **kwargs):
+        self.calls += 1
+        return await self.behavior()
+
+
+def make_client(behavior, breaker):
+    models = FakeModels(behavior)
+    client = SimpleNamespace(aio=SimpleNamespace(models=models))
+    return GeminiClient(client, max_retries=0, breaker=breaker), models
+
+
+def test_cancelled_trial_releases_the_trial_slot():
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def run():
+        breaker = open_breaker()
+        wait_for_half_open(breaker)
+        client, _ = make_client(hang, breaker)
+
+        call = asyncio.create_task(client.generate_content(model='m'))
+        await asyncio.sleep(0.01)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        return breaker
+
+    breaker = asyncio.run(run())
+    assert breaker.state == "half_open"
+    breaker.before_call()
+
+
+def test_client_error_does_not_close_the_circuit():
+    async def bad_request():
+        raise ValueError("invalid image")
+
+    breaker = open_breaker()
+    wait_for_half_open(breaker)
+    client, _ = make_client(bad_request, breaker)
+
+    with pytest.raises(ValueError):
+        asyncio.run(client.generate_content(model='m'))
+
+    assert breaker.state == "half_open"
+    assert breaker.failures == 2
+
+
+def test_timeouts_are_retried_and_counted():
+    async def slow():
+        await asyncio.sleep(10)
+
+    breaker = CircuitBreaker(threshold=5, cooldown=30)
+    client, models = make_client(slow, breaker)
+    client.timeout = 0.01
+    client.max_retries = 1
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(client.generate_content(model='m'))
+
+    assert models.calls == 2
+    assert breaker.failures == 2
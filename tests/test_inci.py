@@ -0,0 +1,11 @@
+from helper.inci import canonicalize_ingredient, tokenize_ingredients
+
+
+def test_aliases_map_to_inci_names():
+    assert canonicalize_ingredient('water') == 'aqua'
+    assert canonicalize_ingredient('fragrance') == 'parfum'
+
+
+def test_vitamin_a_is_not_treated_as_retinol():
+    assert canonicalize_ingredient('vitamin a') == 'vitamin a'
+    assert tokenize_ingredients('aqua, vitamin a, glycerin') == ['aqua', 'vitamin a', 'glycerin']
@@ -0,0 +1,37 @@
+import json
+import os
+
+from helper.index_store import remove_stale_artifacts
+
+
+def make_artifact(index_dir, name, variant, mtime):
+    path = index_dir / name
+    path.mkdir()
+    manifest = {} if variant is None else {'variant': variant}
+    (path / 'manifest.json').write_text(json.dumps(manifest))
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_remove_stale_artifacts_keeps_previous_and_other_variants(tmp_path):
+    oldest = make_artifact(tmp_path, 'products-v8-a', 'sparse', 100)
+    previous = make_artifact(tmp_path, 'products-v8-b', 'sparse', 200)
+    lsa = make_artifact(tmp_path, 'products-v8-c', 'lsa-128', 50)
+    current = make_artifact(tmp_path, 'products-v8-d', 'sparse', 300)
+    other_table = make_artifact(tmp_path, 'reviews-v8-e', 'sparse', 10)
+
+    remove_stale_artifacts('products', str(current), 'sparse', str(tmp_path), keep=2)
+
+    assert not oldest.exists()
+    assert previous.exists() and current.exists()
+    assert lsa.exists() and other_table.exists()
+
+
+def test_remove_stale_artifacts_treats_unlabeled_artifacts_as_same_variant(tmp_path):
+    legacy = make_artifact(tmp_path, 'products-v7-a', None, 100)
+    current = make_artifact(tmp_path, 'products-v8-b', 'sparse', 200)
+
+    remove_stale_artifacts('products', str(current), 'sparse', str(tmp_path), keep=1)
+
+    assert not legacy.exists()
+    assert current.exists()
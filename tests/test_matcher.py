@@ -0,0 +1,48 @@
+from helper.matcher import IngredientMatcher, expand_entry
+from helper.ingredients import get_ingredients_avoid, get_ingredient_aliases
+
+
+def test_terms_match_whole_words_only():
+    matcher = IngredientMatcher({'sensitive': ['Ethanol', 'Silicone']})
+
+    assert matcher.scan('Aqua, Phenoxyethanol, Polysilicone-11') == {}
+    assert matcher.scan('Aqua, Ethanol, Glycerin') == {'sensitive': ['Ethanol']}
+
+
+def test_phenoxyethanol_does_not_reveal_ethanol_with_active_rules():
+    matcher = IngredientMatcher({'dry': get_ingredients_avoid('dry')}, get_ingredient_aliases())
+
+    assert 'Ethanol' not in matcher.scan('Water, Glycerin, Phenoxyethanol').get('dry', [])
+
+
+def test_parfum_maps_to_fragrance():
+    matcher = IngredientMatcher({'normal': get_ingredients_avoid('normal')}, get_ingredient_aliases())
+
+    assert matcher.scan('Aqua, Glycerin, Parfum') == {'normal': ['Fragrance']}
+
+
+def test_scan_ignores_case_and_punctuation():
+    matcher = IngredientMatcher({'oily': ['Alcohol Denat']})
+
+    assert matcher.scan('AQUA; ALCOHOL DENAT.') == {'oily': ['Alcohol Denat']}
+
+
+def test_parenthesized_members_are_searched():
+    assert expand_entry('Essential Oils (Tea Tree, Peppermint)') == ['essential oils', 'tea tree', 'peppermint']
+
+    matcher = IngredientMatcher({'normal': ['Essential Oils (Tea Tree, Peppermint)']})
+    assert matcher.scan('Aqua, Peppermint Oil') == {'normal': ['Essential Oils (Tea Tree, Peppermint)']}
+
+
+def test_parenthesized_qualifiers_are_dropped():
+    assert expand_entry('Retinol (tanpa moisturizer)') == ['retinol']
+    assert expand_entry('Salicylic Acid (dalam kadar tinggi)') == ['salicylic acid']
+
+    matcher = IngredientMatcher({'dry': ['Retinol (tanpa moisturizer)']})
+    assert matcher.scan('Aqua, Moisturizer') == {}
+    assert matcher.scan('Aqua, Retinol') == {'dry': ['Retinol (tanpa moisturizer)']}
+
+
+def test_slash_separated_names_and_aliases_expand():
+    assert expand_entry('AHA/BHA') == ['aha', 'bha']
+    assert expand_entry('Fragrance', {'Fragrance': ['Fragrance', 'Parfum']}) == ['fragrance', 'parfum']
@@ -0,0 +1,123 @@
+import pytest
+
+from helper import recommendations
+from helper.recommendations import recommendation_cache
+from helper.rules import get_rules
+
+QUERY = ["Aqua", "Glycerin", "Niacinamide"]
+
+
+def test_products_without_ingredients_are_not_indexed(make_recommender, catalog_rows):
+    system = make_recommender()
+
+    assert len(system.products) == len(catalog_rows) - 1
+
+
+def test_safe_mask_matches_the_ingredient_rules(make_recommender, catalog_rows):
+    system = make_recommender()
+    matcher = get_rules().matcher
+
+    for skin_type in ["normal", "oily", "sensitive"]:
+        mask = system.get_safe_mask(skin_type)
+        expected = [skin_type not in matcher.scan(ingredients) for _, ingredients in catalog_rows[:-1]]
+        assert mask.tolist() == expected
+
+    assert system.get_safe_mask("unknown") is None
+
+
+def test_recommendations_skip_products_unsafe_for_the_skin_type(make_recommender):
+    system = make_recommender()
+
+    result = system.get_ingredient_based_recommendations(QUERY, "normal", top_k=10)
+
+    names = [rec['product_name'] for rec in result['recommendations']]
+    assert "Hydrating Toner" in names
+    assert not {"Scented Toner", "Oil Cleanser", "Scented Lotion"} & set(names)
+    assert result['total_safe'] == len(names) < result['total_found']
+
+
+def test_top_k_is_filled_with_safe_products(make_recommender):
+    system = make_recommender()
+
+    result = system.get_ingredient_based_recommendations(QUERY, "normal", top_k=3)
+
+    assert result['recommendation_count'] == 3
+    assert system.get_safe_mask("normal")[[
+        system.find_product_row(rec['product_id']) for rec in result['recommendations']
+    ]].all()
+
+
+BATCH_ITEMS = [
+    {'ingredients': QUERY, 'skin_type': "normal"},
+    {'ingredients': ["Aqua", "Panthenol"], 'skin_type': "oily"},
+    {'ingredients': ["Parfum", "Aqua"], 'skin_type': "sensitive"},
+    {'ingredients': ["Glycerin", "Niacinamide", "Aqua"], 'skin_type': "normal"},
+    {'ingredients': ["Unknown Extract"], 'skin_type': "dry"},
+]
+
+
+def test_batch_results_equal_single_query_results(make_recommender):
+    system = make_recommender()
+
+    batch = system.get_batch_ingredient_based_recommendations(BATCH_ITEMS, top_k=3)
+
+    # Score the single queries instead of reading the batch's cached results
+    recommendation_cache.clear()
+    singles = [
+        system.get_ingredient_based_recommendations(item['ingredients'], item['skin_type'], top_k=3)
+        for item in BATCH_ITEMS
+    ]
+    assert batch == singles
+
+
+def test_lsa_batch_results_equal_single_query_results(make_recommender):
+    system = make_recommender(mode="lsa")
+
+    batch = system.get_batch_ingredient_based_recommendations(BATCH_ITEMS, top_k=3)
+
+    recommendation_cache.clear()
+    singles = [
+        system.get_ingredient_based_recommendations(item['ingredients'], item['skin_type'], top_k=3)
+        for item in BATCH_ITEMS
+    ]
+    # Matrix-matrix and matrix-vector float32 products may differ in the last bit
+    for batch_result, single_result in zip(batch, singles):
+        batch_recs, single_recs = batch_result['recommendations'], single_result['recommendations']
+        assert {**batch_result, 'recommendations': None} == {**single_result, 'recommendations': None}
+        assert [rec['product_id'] for rec in batch_recs] == [rec['product_id'] for rec in single_recs]
+        assert [rec['similarity_score'] for rec in batch_recs] == pytest.approx(
+            [rec['similarity_score'] for rec in single_recs], abs=1e-6
+        )
+
+
+
+def test_reload_swaps_the_index_and_invalidates_cached_results(make_recommender, catalog_rows, monkeypatch):
+    rows = list(catalog_rows)
+    monkeypatch.setattr(recommendations, 'recommendation_system', None)
+    monkeypatch.setattr(recommendations, 'SkinCareRecommendationSystem', lambda rebuild=False: make_recommender(rows))
+
+    before = recommendations.get_skincare_recommendations(QUERY, "normal", top_k=3)
+    assert recommendations.get_skincare_recommendations(QUERY, "normal", top_k=3) == before
+    assert recommendation_cache.stats()['entries'] == 1
+
+    rows[:] = [("Renamed " + title, ingredients) for title, ingredients in catalog_rows]
+    assert recommendations.reload_recommendation_system()
+
+    assert recommendation_cache.stats()['entries'] == 0
+    after = recommendations.get_skincare_recommendations(QUERY, "normal", top_k=3)
+    assert [rec['product_name'] for rec in after['recommendations']] == [
+        "Renamed " + rec['product_name'] for rec in before['recommendations']
+    ]
+
+
+def test_failed_reload_keeps_the_current_index(make_recommender, monkeypatch):
+    current = make_recommender()
+    monkeypatch.setattr(recommendations, 'recommendation_system', current)
+
+    def fail(rebuild=False):
+        raise ValueError("No data found in table 'products'")
+
+    monkeypatch.setattr(recommendations, 'SkinCareRecommendationSystem', fail)
+
+    assert not recommendations.reload_recommendation_system()
+    assert recommendations.get_recommendation_system() is current
@@ -0,0 +1,185 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+
+from helper.retrieval import InvertedIndex, LowRankIndex, select_top_k, select_top_k_rows
+
+
+def make_tfidf_matrix(n_products=60, n_terms=40, density=0.2, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.random((n_products, n_terms)) * (rng.random((n_products, n_terms)) < density)
+    return csr_matrix(normalize(values))
+
+
+def brute_force_scores(tfidf_matrix, query_matrix):
+    return (csr_matrix(query_matrix) @ tfidf_matrix.T).toarray()
+
+
+def test_select_top_k_orders_best_first():
+    scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3])
+
+    assert select_top_k(scores, 3).tolist() == [1, 3, 2]
+
+
+def test_select_top_k_breaks_ties_by_position():
+    scores = np.array([0.2, 0.5, 0.5, 0.9, 0.5, 0.5])
+
+    assert select_top_k(scores, 3).tolist() == [3, 1, 2]
+    assert select_top_k(scores, 5).tolist() == [3, 1, 2, 4, 5]
+
+
+def test_select_top_k_edge_cases():
+    scores = np.array([0.3, 0.1, 0.2])
+
+    assert select_top_k(scores, 0).tolist() == []
+    assert select_top_k(np.empty(0), 3).tolist() == []
+    assert select_top_k(scores, 10).tolist() == [0, 2, 1]
+
+
+def test_inverted_index_score_matches_brute_force_cosine():
+    tfidf_matrix = make_tfidf_matrix()
+    index = InvertedIndex(tfidf_matrix)
+
+    for row in range(10):
+        query = tfidf_matrix[row]
+        expected = brute_force_scores(tfidf_matrix, query)[0]
+
+        candidates, scores = index.score(query)
+
+        assert candidates.tolist() == np.flatnonzero(expected).tolist()
+        assert np.allclose(scores, expected[candidates])
+
+
+def test_inverted_index_search_returns_top_k_of_brute_force():
+    tfidf_matrix = make_tfidf_matrix()
+    index = InvertedIndex(tfidf_matrix)
+    query = tfidf_matrix[5]
+    expected = brute_force_scores(tfidf_matrix, query)[0]
+
+    rows, scores = index.search(query, top_k=5)
+
+    assert rows[0] == 5
+    assert rows.tolist() == np.argsort(-expected, kind='stable')[:5].tolist()
+    assert np.allclose(scores, expected[rows])
+
+
+def test_inverted_index_search_applies_min_score_and_mask():
+    tfidf_matrix = make_tfidf_matrix()
+    index = InvertedIndex(tfidf_matrix)
+    query = tfidf_matrix[5]
+    mask = np.ones(tfidf_matrix.shape[0], dtype=bool)
+    mask[5] = False
+
+    rows, scores = index.search(query, top_k=50, min_score=0.2, mask=mask)
+
+    assert 5 not in rows.tolist()
+    assert np.all(scores >= 0.2)
+
+
+def test_inverted_index_query_without_known_terms_scores_nothing():
+    index = InvertedIndex(make_tfidf_matrix())
+
+    candidates, scores = index.score(csr_matrix((1, 40)))
+
+    assert len(candidates) == 0 and len(scores) == 0
+
+
+def test_select_top_k_rows_keeps_top_k_per_row():
+    similarity = csr_matrix(np.array([
+        [0.1, 0.0, 0.4, 0.3],
+        [0.0, 0.2, 0.0, 0.0],
+    ]))
+
+    kept = select_top_k_rows(similarity, 2).toarray()
+
+    assert kept.tolist() == [[0.0, 0.0, 0.4, 0.3], [0.0, 0.2, 0.0, 0.0]]
+    assert select_top_k_rows(similarity, None) is similarity
+
+
+def test_inverted_index_score_batch_matches_brute_force_cosine():
+    tfidf_matrix = make_tfidf_matrix()
+    index = InvertedIndex(tfidf_matrix)
+    queries = tfidf_matrix[:8]
+
+    similarity, total_found, total_kept = index.score_batch(queries)
+
+    expected = brute_force_scores(tfidf_matrix, queries)
+    assert np.allclose(similarity.toarray(), expected)
+    assert total_found.tolist() == np.count_nonzero(expected, axis=1).tolist()
+    assert total_kept.tolist() == total_found.tolist()
+
+
+def test_inverted_index_score_batch_matches_search():
+    tfidf_matrix = make_tfidf_matrix()
+    index = InvertedIndex(tfidf_matrix)
+    queries = tfidf_matrix[:8]
+    mask = np.arange(tfidf_matrix.shape[0]) % 3 != 0
+
+    similarity, total_found, total_kept = index.score_batch(queries, top_k=4, min_score=0.1, mask=mask)
+
+    expected = brute_force_scores(tfidf_matrix, queries)
+    for query in range(8):
+        start, end = similarity.indptr[query], similarity.indptr[query + 1]
+        batch = sorted(zip(-similarity.data[start:end], similarity.indices[start:end]))
+        rows, scores = index.search(queries[query], top_k=4, min_score=0.1, mask=mask)
+        assert [row for _, row in batch] == rows.tolist()
+        assert np.allclose([-score for score, _ in batch], scores)
+
+        assert total_found[query] == np.count_nonzero(expected[query] >= 0.1)
+        assert total_kept[query] == np.count_nonzero((expected[query] >= 0.1) & mask)
+
+
+def make_low_rank_index(dimensions=8):
+    tfidf_matrix = make_tfidf_matrix(density=0.3)
+    return LowRankIndex.fit(tfidf_matrix, dimensions), tfidf_matrix
+
+
+def test_low_rank_embeddings_are_unit_length():
+    index, _ = make_low_rank_index()
+
+    norms = np.linalg.norm(index.embeddings, axis=1)
+    assert index.embeddings.dtype == np.float32
+    assert index.embeddings.shape == (60, 8)
+    assert np.allclose(norms[norms > 0], 1.0, atol=1e-5)
+
+
+def test_low_rank_search_matches_sorted_scores():
+    index, tfidf_matrix = make_low_rank_index()
+    query = tfidf_matrix[3]
+
+    candidates, scores = index.score(query)
+    rows, top_scores = index.search(query, top_k=5)
+
+    assert np.all(scores > 0)
+    assert rows.tolist() == candidates[np.argsort(-scores, kind='stable')[:5]].tolist()
+    assert rows[0] == 3
+    assert np.all(np.diff(top_scores) <= 0)
+
+
+def test_low_rank_score_batch_matches_search():
+    index, tfidf_matrix = make_low_rank_index()
+    queries = tfidf_matrix[:7]
+    mask = np.arange(index.n_products) % 3 != 0
+
+    similarity, total_found, total_kept = index.score_batch(queries, top_k=4, min_score=0.1, mask=mask, chunk_size=3)
+
+    assert similarity.shape == (7, index.n_products)
+    for query in range(7):
+        start, end = similarity.indptr[query], similarity.indptr[query + 1]
+        batch = sorted(zip(-similarity.data[start:end], similarity.indices[start:end]))
+        rows, scores = index.search(queries[query], top_k=4, min_score=0.1, mask=mask)
+        assert [row for _, row in batch] == rows.tolist()
+        assert np.allclose([-score for score, _ in batch], scores)
+
+        candidates, scores = index.score(queries[query])
+        assert total_found[query] == np.count_nonzero(scores >= 0.1)
+        assert total_kept[query] == np.count_nonzero((scores >= 0.1) & mask[candidates])
+
+
+def test_low_rank_score_batch_without_top_k_keeps_every_positive_score():
+    index, tfidf_matrix = make_low_rank_index()
+
+    similarity, total_found, _ = index.score_batch(tfidf_matrix[:2])
+
+    assert np.diff(similarity.indptr).tolist() == total_found.tolist()
+    assert np.all(similarity.data > 0)
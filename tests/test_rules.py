@@ -0,0 +1,75 @@
+import json
+import os
+
+import pytest
+
+from helper import rules
+from helper.ingredients import get_ingredients_avoid
+from helper.rules import RuleStore
+
+
+def write_rules(path, avoid, aliases=None, mtime=None):
+    path.write_text(json.dumps({'avoid': avoid, 'aliases': aliases or {}}))
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def rule_files(tmp_path):
+    rules_path, details_path = tmp_path / "rules.json", tmp_path / "details.json"
+    write_rules(rules_path, {'oily': ['Mineral Oil']}, mtime=1000)
+    details_path.write_text(json.dumps({'oily': {'Mineral Oil': 'Menyumbat pori.'}}))
+    return rules_path, details_path
+
+
+def test_rules_are_loaded_on_first_use(rule_files):
+    store = RuleStore(*map(str, rule_files), interval=0)
+
+    snapshot = store.current
+
+    assert snapshot.get_avoid_list('oily') == ['Mineral Oil']
+    assert snapshot.get_reason('Mineral Oil', 'oily') == 'Menyumbat pori.'
+    assert store.current is snapshot
+
+
+def test_changed_rule_files_swap_in_a_new_snapshot(rule_files):
+    rules_path, details_path = rule_files
+    store = RuleStore(str(rules_path), str(details_path), interval=0)
+    before = store.current
+    assert not store.reload_if_changed()
+
+    write_rules(rules_path, {'oily': ['Mineral Oil', 'Parfum']}, mtime=2000)
+
+    assert store.reload_if_changed()
+    assert store.current.get_avoid_list('oily') == ['Mineral Oil', 'Parfum']
+    assert store.current.matcher.scan('Aqua, Parfum') == {'oily': ['Parfum']}
+    assert store.current.checksum != before.checksum
+    # Snapshots held by in-flight requests are never modified
+    assert before.get_avoid_list('oily') == ['Mineral Oil']
+
+
+def test_broken_rule_files_keep_the_previous_snapshot(rule_files):
+    rules_path, details_path = rule_files
+    store = RuleStore(str(rules_path), str(details_path), interval=0)
+    before = store.current
+
+    rules_path.write_text('{"avoid": ')
+    os.utime(rules_path, (2000, 2000))
+    assert not store.reload_if_changed()
+    assert store.current is before
+
+    write_rules(rules_path, {'oily': ['Lanolin']}, mtime=3000)
+    assert store.reload_if_changed()
+    assert store.current.get_avoid_list('oily') == ['Lanolin']
+
+
+def test_avoid_lists_follow_the_active_rules(rule_files, monkeypatch):
+    rules_path, details_path = rule_files
+    store = RuleStore(str(rules_path), str(details_path), interval=0)
+    monkeypatch.setattr(rules, 'rule_store', store)
+    assert get_ingredients_avoid('oily') == ['Mineral Oil']
+
+    write_rules(rules_path, {'oily': ['Coconut Oil']}, mtime=2000)
+    store.reload_if_changed()
+
+    assert get_ingredients_avoid('oily') == ['Coconut Oil']
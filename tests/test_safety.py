@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from helper import safety
+from helper.safety import catalog_checksum, compute_product_safety, load_safety_bits, safety_bits_from_verdicts
+
+SKIN_TYPES = ['normal', 'dry']
+
+
+def test_verdicts_record_the_catalog_they_were_computed_for():
+    verdicts = compute_product_safety([0, 1], ['Aqua, Parfum', None], workers=1)
+
+    assert set(verdicts['catalog_checksum']) == {catalog_checksum([0, 1], ['Aqua, Parfum', ''])}
+
+
+def test_catalog_checksum_changes_when_ids_point_to_other_products():
+    assert catalog_checksum([0, 1], ['Aqua', 'Parfum']) != catalog_checksum([0, 1], ['Parfum', 'Aqua'])
+
+
+def test_safety_bits_from_verdicts():
+    verdicts = pd.DataFrame({
+        'product_id': [7, 7, 9, 9],
+        'skin_type': ['normal', 'dry', 'normal', 'dry'],
+        'is_safe': [True, False, False, False],
+    })
+
+    assert safety_bits_from_verdicts(verdicts, [9, 7], SKIN_TYPES).tolist() == [0b11, 0b10]
+    assert safety_bits_from_verdicts(verdicts, [7, 8], SKIN_TYPES) is None
+
+
+def test_load_safety_bits_requires_matching_rules_and_catalog(monkeypatch):
+    queries = []
+
+    def read_sql(query, params):
+        queries.append(params)
+        return pd.DataFrame({'product_id': [0, 0], 'skin_type': SKIN_TYPES, 'is_safe': [True, True]})
+
+    monkeypatch.setattr(safety, 'read_sql', read_sql)
+
+    bits = load_safety_bits(np.array([0]), SKIN_TYPES, 'rules', 'catalog')
+
+    assert bits.tolist() == [0]
+    assert queries == [{'rules_checksum': 'rules', 'catalog_checksum': 'catalog'}]
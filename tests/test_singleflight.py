@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from helper.singleflight import SingleFlight
+
+
+def make_counter(delay=0.01, error=None):
+    runs = []
+
+    async def compute():
+        runs.append(None)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return len(runs)
+
+    return compute, runs
+
+
+def test_concurrent_calls_for_a_key_share_one_run():
+    flight = SingleFlight()
+    compute, runs = make_counter()
+
+    async def run():
+        return await asyncio.gather(*(flight.do("image", compute) for _ in range(5)))
+
+    assert asyncio.run(run()) == [1] * 5
+    assert len(runs) == 1
+    assert flight.stats() == {'calls': 5, 'shared': 4, 'in_flight': 0}
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    compute, runs = make_counter()
+
+    async def run():
+        return await asyncio.gather(flight.do("a", compute), flight.do("b", compute))
+
+    asyncio.run(run())
+    assert len(runs) == 2
+    assert flight.stats()['shared'] == 0
+
+
+def test_error_is_raised_to_every_waiter():
+    flight = SingleFlight()
+    compute, runs = make_counter(error=ValueError("blurry"))
+
+    async def run():
+        return await asyncio.gather(*(flight.do("image", compute) for _ in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(runs) == 1
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_key_is_released_after_the_run_finishes():
+    flight = SingleFlight()
+    compute, runs = make_counter()
+
+    async def run():
+        first = await flight.do("image", compute)
+        second = await flight.do("image", compute)
+        return first, second
+
+    assert asyncio.run(run()) == (1, 2)
+    assert len(runs) == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_run():
+    flight = SingleFlight()
+    compute, runs = make_counter(delay=0.05)
+
+    async def run():
+        leaving = asyncio.create_task(flight.do("image", compute))
+        staying = asyncio.create_task(flight.do("image", compute))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        return await staying
+
+    assert asyncio.run(run()) == 1
+    assert len(runs) == 1
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 import pandas as pd
 
 from dotenv import load_dotenv
@@ -68,5 +68,55 @@ def read_table(table_name, limit=None):
     except Exception as e:
         print(f"Error reading from table '{table_name}': {e}")
         return None
+
+
+def get_table_checksum(table_name):
+    """
+    Get the content checksum of a table without reading its rows
+    
+    Parameters:
+    -----------
+    table_name : str
+        Name of the table to checksum
+    
+    Returns:
+    --------
+    str or None
+        Checksum reported by the database, or None if unavailable
+    """
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(text(f"CHECKSUM TABLE {table_name}")).fetchone()
+        
+        if row is None or row[1] is None:
+            return None
+        return str(row[1])
+    
+    except Exception as e:
+        print(f"Error getting checksum for table '{table_name}': {e}")
+        return None
+
+
+def read_sql(query, params=None):
+    """
+    Run a read-only SQL query and return the result as a DataFrame
+    
+    Parameters:
+    -----------
+    query : str
+        SQL query to run
+    params : dict, optional
+        Bound parameters of the query
     
+    Returns:
+    --------
+    pandas.DataFrame or None
+        DataFrame containing the query result, or None on failure
+    """
+    try:
+        with engine.connect() as conn:
+            return pd.read_sql(text(query), conn, params=params)
     
+    except Exception as e:
+        print(f"Error running query: {e}")
+        return None